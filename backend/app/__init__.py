@@ -2,20 +2,24 @@ import os
 from flask import Flask
 from flask_cors import CORS
 
+# Frontends allowed to call the API with credentials-free CORS
+ALLOWED_ORIGINS = [
+    "http://localhost:8080",
+    "http://localhost:3000",  # Added for React dev server
+    "https://resume-ai-rework.vercel.app",
+    "https://resumeai.live"
+]
+
 def create_app():
     app = Flask(__name__)
     
     # Configure CORS for your frontend
     CORS(app, resources={
         r"/*": {
-            "origins": [
-                "http://localhost:8080",
-                "http://localhost:3000",  # Added for React dev server
-                "https://resume-ai-rework.vercel.app",
-                "https://resumeai.live"
-            ],
+            "origins": ALLOWED_ORIGINS,
             "methods": ["GET", "POST", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization"]
+            "allow_headers": ["Content-Type", "Authorization", "If-None-Match"],
+            "expose_headers": ["ETag", "X-PDF-Cache", "Retry-After", "Location"]
         },
         r"/api/*": {"origins": "*"}
     })
@@ -40,4 +44,13 @@ def create_app():
     app.register_blueprint(gmail_routes)
     app.register_blueprint(ai_bp)
     
+    # Load the bundled PDF fonts now, so a missing bundle is reported at startup
+    from app.pdf_fonts import font_face_css
+    font_face_css()
+    
+    # Launch this worker's PDF browser in the background before the first export
+    from app.pdf_renderer import PDF_PREWARM, pdf_pool
+    if PDF_PREWARM:
+        pdf_pool.prewarm()
+    
     return app
\ No newline at end of file
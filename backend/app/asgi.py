@@ -0,0 +1,123 @@
+"""
+ASGI serving mode
+The builder assistant's SSE endpoints run natively on asyncio with AsyncGroq,
+and PDF job events poll the job table from the event loop, so an open
+stream costs a coroutine instead of a whole worker. Every other
+route is the unchanged Flask app, mounted through a WSGI adapter that runs
+it on a thread pool. Opt-in; the default deployment still serves main:app
+on gunicorn's sync workers.
+
+    gunicorn asgi:app -k uvicorn.workers.UvicornWorker
+"""
+import asyncio
+import logging
+import os
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+from app import ALLOWED_ORIGINS, create_app
+from app.routes.ai_assistant import (
+    SECTION_PROMPTS, SSE_HEADERS, SuggestionStream, ai_service, build_messages,
+    check_rate_limit, record_session_turn, resync_response, sse_event,
+)
+from app.conversation_sessions import SessionResyncRequired
+from app.pdf_jobs import pdf_jobs
+from app.routes.routes import PDF_JOBS_PATH, job_event
+
+logger = logging.getLogger(__name__)
+
+# Threads serving the mounted Flask routes (uploads, PDF export, Gmail)
+WSGI_THREADS = int(os.environ.get("WSGI_THREADS", 10))
+
+# Same policy Flask-CORS applies to /api/* in create_app
+CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
+
+
+async def assist_section(request: Request, section: str):
+    """Async twin of the /api/ai-assist/<section> Flask routes"""
+    prompt_class = SECTION_PROMPTS[section]
+    try:
+        data = await request.json()
+        user_message = data.get("user_message", "").strip()
+
+        if not user_message:
+            return JSONResponse({"error": "user_message is required"}, status_code=400, headers=CORS_HEADERS)
+
+        # Session store reads are SQLite; keep them off the event loop
+        session, messages = await asyncio.to_thread(build_messages, data, section)
+        session_id = data.get("session_id", "default")
+    except SessionResyncRequired:
+        body, status = resync_response()
+        return JSONResponse(body, status_code=status, headers=CORS_HEADERS)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500, headers=CORS_HEADERS)
+
+    async def generate():
+        try:
+            # SQLite transaction; keep it off the event loop
+            allowed, limit_info = await asyncio.to_thread(check_rate_limit, session_id, section)
+
+            if not allowed:
+                yield sse_event("error", limit_info["error"])
+                return
+
+            yield sse_event("rate_limit", limit_info)
+
+            suggestion_stream = SuggestionStream(prompt_class)
+            async for chunk in ai_service.astream_completion(messages):
+                for event in suggestion_stream.feed(chunk):
+                    yield event
+            final_events = suggestion_stream.finish()
+            yield await asyncio.to_thread(record_session_turn, session, messages, suggestion_stream)
+            for event in final_events:
+                yield event
+
+        except Exception as e:
+            yield sse_event("error", str(e))
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, **CORS_HEADERS},
+    )
+
+
+async def pdf_job_events(request: Request):
+    """Async twin of the Flask PDF job events route"""
+    job_id = request.path_params["job_id"]
+    # Same policy Flask-CORS applies to the export routes in create_app
+    origin = request.headers.get("origin")
+    cors = {"Access-Control-Allow-Origin": origin, "Vary": "Origin"} if origin in ALLOWED_ORIGINS else {}
+
+    async def generate():
+        async for status in pdf_jobs.awatch(job_id):
+            event, finished = job_event(status)
+            yield event
+            if finished:
+                return
+        yield sse_event("timeout")
+
+    return StreamingResponse(generate(), media_type="text/event-stream", headers={**SSE_HEADERS, **cors})
+
+
+def _section_endpoint(section: str):
+    async def endpoint(request: Request):
+        return await assist_section(request, section)
+    return endpoint
+
+
+def create_asgi_app(flask_app=None) -> Starlette:
+    """
+    Native async routes for the assistant and PDF job streams; everything else
+    (including CORS preflights for the assistant) falls through to the Flask app.
+    """
+    flask_app = flask_app or create_app()
+    routes = [
+        Route(f"/api/ai-assist/{section}", _section_endpoint(section), methods=["POST"])
+        for section in SECTION_PROMPTS
+    ]
+    routes.append(Route(PDF_JOBS_PATH + "/{job_id}/events", pdf_job_events, methods=["GET"]))
+    routes.append(Mount("/", app=WSGIMiddleware(flask_app, workers=WSGI_THREADS)))
+    return Starlette(routes=routes)
@@ -0,0 +1,329 @@
+"""
+Small caching primitives shared by the backend
+Bounded in-memory LRU tier (optionally with per-entry TTL) in front of an
+optional on-disk or SQLite tier that all gunicorn workers on a host can share
+"""
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Every named cache registers itself here so its counters can be reported
+_registry: Dict[str, "TieredCache"] = {}
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded LRU map with hit/miss/eviction counters.
+    Entries expire after ``ttl`` seconds when a TTL is given.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = None):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class DiskCache:
+    """
+    One file per key under a directory, written atomically so concurrent
+    workers never read a half-written entry. A TTL is applied to file age.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 2048, ttl: Optional[float] = None,
+                 dumps: Callable[[Any], bytes] = None,
+                 loads: Callable[[bytes], Any] = None):
+        self.directory = directory
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._dumps = dumps or (lambda value: json.dumps(value).encode("utf-8"))
+        self._loads = loads or (lambda raw: json.loads(raw.decode("utf-8")))
+        self._writes_since_prune = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            with open(self._path(key), "rb") as f:
+                if self.ttl and os.fstat(f.fileno()).st_mtime + self.ttl <= time.time():
+                    raise FileNotFoundError
+                value = self._loads(f.read())
+        except FileNotFoundError:
+            self.misses += 1
+            return default
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache entry {key}: {e}")
+            self.delete(key)
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(self._dumps(value))
+            os.replace(tmp_path, self._path(key))
+        except Exception as e:
+            logger.warning(f"Disk cache write failed for {key}: {e}")
+            return
+
+        self._writes_since_prune += 1
+        if self._writes_since_prune >= max(1, self.max_entries // 10):
+            self._writes_since_prune = 0
+            self._prune()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _prune(self) -> None:
+        """Drop the least recently written entries once over max_entries."""
+        try:
+            entries = [e for e in os.scandir(self.directory)
+                       if e.is_file() and not e.name.startswith(".tmp-")]
+        except FileNotFoundError:
+            return
+        overflow = len(entries) - self.max_entries
+        if overflow <= 0:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:overflow]:
+            self.delete(entry.name)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class SQLiteCache:
+    """
+    Persistent key/value tier in a local SQLite file with per-entry expiry.
+    WAL mode lets every worker process on the host read and write it.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl: Optional[float] = None,
+                 dumps: Callable[[Any], bytes] = None,
+                 loads: Callable[[bytes], Any] = None):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._dumps = dumps or (lambda value: json.dumps(value).encode("utf-8"))
+        self._loads = loads or (lambda raw: json.loads(raw.decode("utf-8")))
+        self._local = threading.local()
+        self._writes_since_prune = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL,"
+            " expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            now = time.time()
+            if row is None or (row[1] is not None and row[1] <= now):
+                self.misses += 1
+                return default
+            conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return self._loads(row[0])
+        except Exception as e:
+            logger.warning(f"SQLite cache read failed for {key}: {e}")
+            self.misses += 1
+            return default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, self._dumps(value), now + ttl if ttl else None, now),
+            )
+        except Exception as e:
+            logger.warning(f"SQLite cache write failed for {key}: {e}")
+            return
+
+        self._writes_since_prune += 1
+        if self._writes_since_prune >= max(1, self.max_entries // 10):
+            self._writes_since_prune = 0
+            self._prune()
+
+    def delete(self, key: str) -> None:
+        try:
+            self._connect().execute("DELETE FROM cache WHERE key = ?", (key,))
+        except Exception as e:
+            logger.warning(f"SQLite cache delete failed for {key}: {e}")
+
+    def _prune(self) -> None:
+        """Drop expired rows, then least recently used rows over max_entries."""
+        try:
+            conn = self._connect()
+            conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                         (time.time(),))
+            cursor = conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                " SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self.evictions += max(cursor.rowcount, 0)
+        except Exception as e:
+            logger.warning(f"SQLite cache prune failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class TieredCache:
+    """
+    Memory LRU in front of an optional shared tier: a directory of files
+    (``disk_dir``) or a SQLite file (``sqlite_path``).
+    """
+
+    def __init__(self, name: str, max_entries: int = 256, ttl: Optional[float] = None,
+                 disk_dir: Optional[str] = None, disk_max_entries: int = 2048,
+                 sqlite_path: Optional[str] = None,
+                 dumps: Callable[[Any], bytes] = None,
+                 loads: Callable[[bytes], Any] = None):
+        self.name = name
+        self.memory = LRUCache(max_entries, ttl)
+        if sqlite_path:
+            self.disk = SQLiteCache(sqlite_path, disk_max_entries, ttl, dumps, loads)
+        elif disk_dir:
+            self.disk = DiskCache(disk_dir, disk_max_entries, ttl, dumps, loads)
+        else:
+            self.disk = None
+        _registry[name] = self
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+                return value
+        return default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"memory": self.memory.stats()}
+        if self.disk is not None:
+            stats["disk"] = self.disk.stats()
+        return stats
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Counters for every named cache in this process."""
+    return {name: cache.stats() for name, cache in _registry.items()}
@@ -0,0 +1,125 @@
+"""
+Circuit breaker for the Groq gateway
+Trips when too many recent calls fail or are slow, so requests during an
+outage fail fast (and can be served by the local analyzer) instead of each
+one waiting out the same timeout.
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while the breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Closed -> open when, over the last ``window`` calls (and at least
+    ``min_calls``), the failure rate reaches ``failure_rate`` or the share of
+    calls slower than ``slow_call_seconds`` reaches ``slow_rate``. After
+    ``open_seconds`` one probe call is let through (half-open); its outcome
+    closes the breaker again or re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, window: int = 20, min_calls: int = 5,
+                 failure_rate: float = 0.5, slow_call_seconds: float = 30.0,
+                 slow_rate: float = 0.8, open_seconds: float = 30.0):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self._lock = threading.Lock()
+        # (failed, slow) per recent call
+        self._calls: deque = deque(maxlen=window)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        """True if a call may go out now; half-open admits a single probe."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def check(self) -> None:
+        if not self.allow_request():
+            raise CircuitOpenError(f"{self.name} circuit is open, failing fast")
+
+    def record_success(self, latency: float) -> None:
+        self._record(failed=False, slow=latency >= self.slow_call_seconds)
+
+    def record_failure(self) -> None:
+        self._record(failed=True, slow=False)
+
+    def release_probe(self) -> None:
+        """Let another probe through when the current one ended without an outcome."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _record(self, failed: bool, slow: bool) -> None:
+        with self._lock:
+            state = self._current_state()
+            if state == self.HALF_OPEN:
+                if failed or slow:
+                    self._open()
+                else:
+                    self._state = self.CLOSED
+                    self._calls.clear()
+                return
+            if state == self.OPEN:
+                # A call admitted before the breaker opened
+                return
+            self._calls.append((failed, slow))
+            if len(self._calls) < self.min_calls:
+                return
+            total = len(self._calls)
+            failures = sum(1 for f, _ in self._calls if f)
+            slow_calls = sum(1 for _, s in self._calls if s)
+            if failures / total >= self.failure_rate or slow_calls / total >= self.slow_rate:
+                self._open()
+
+    def _open(self) -> None:
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        self._calls.clear()
+        self.times_opened += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = len(self._calls)
+            return {
+                "state": self._current_state(),
+                "recent_calls": total,
+                "recent_failure_rate": round(sum(1 for f, _ in self._calls if f) / total, 4) if total else 0.0,
+                "recent_slow_rate": round(sum(1 for _, s in self._calls if s) / total, 4) if total else 0.0,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
@@ -0,0 +1,173 @@
+"""
+Token-budgeted context for assistant chats
+Conversation history is fitted into ASSISTANT_HISTORY_TOKENS on top of the
+system prompt and the new message, so the prompt no longer grows with how
+long the last few messages happened to be. The newest messages are kept
+verbatim while they fit; older ones are folded into a rolling summary
+instead of being dropped.
+The summary is extractive, so folding adds no extra model call before the
+first token. It keeps the user's own statements, numbers, names and what was
+already suggested, capped at ASSISTANT_SUMMARY_TOKENS, and each fold is
+cached because clients resending full history would otherwise redo it.
+"""
+import hashlib
+import json
+import os
+import re
+from collections import namedtuple
+from functools import lru_cache
+from typing import Dict, List, Sequence
+from app.cache import TieredCache
+from app.prompts.json_extraction import extract_suggestion
+from app.tokens import MESSAGE_OVERHEAD_TOKENS, count_message_tokens, count_tokens
+
+# History budget (recent messages plus summary), and the summary's share of it
+ASSISTANT_HISTORY_TOKENS = int(os.environ.get("ASSISTANT_HISTORY_TOKENS", 1200))
+ASSISTANT_SUMMARY_TOKENS = int(os.environ.get("ASSISTANT_SUMMARY_TOKENS", 300))
+# Longest single line taken from one message
+SUMMARY_LINE_CHARS = 200
+
+summary_cache = TieredCache(
+    "assistant_summaries",
+    max_entries=int(os.environ.get("ASSISTANT_SUMMARY_CACHE_SIZE", 1000)),
+    ttl=int(os.environ.get("ASSISTANT_SESSION_TTL", 2 * 60 * 60)),
+)
+
+ContextWindow = namedtuple("ContextWindow", ["messages", "history", "summary", "prompt_tokens", "folded"])
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+|\n+')
+_NUMBER = re.compile(r'\d+(?:[.,]\d+)?%?')
+_NAME = re.compile(r'(?<=\s)[A-Z][\w.+#-]*')
+_SUMMARY_HEADER = "Summary of the earlier conversation (older messages were condensed):"
+
+# The same history messages are costed again on every turn of a session
+_content_tokens = lru_cache(maxsize=4096)(count_tokens)
+
+
+def _item_label(item) -> str:
+    if isinstance(item, dict):
+        label = item.get('title') or item.get('position') or item.get('name') or item.get('category')
+        if item.get('company'):
+            label = f"{label} at {item['company']}" if label else item['company']
+        return str(label or '')
+    return str(item)
+
+
+def _suggestion_line(suggestion: Dict) -> str:
+    for key in ('projects', 'experiences', 'skills'):
+        items = suggestion.get(key)
+        if isinstance(items, list) and items:
+            labels = [label for label in map(_item_label, items) if label]
+            return f"Assistant suggested {key}: {', '.join(labels)}"[:SUMMARY_LINE_CHARS]
+    if suggestion.get('summary'):
+        return f"Assistant suggested a summary: {suggestion['summary']}"[:SUMMARY_LINE_CHARS]
+    return ""
+
+
+def _message_lines(message: Dict[str, str]) -> List[str]:
+    """Summary lines for one message: its sentences, and any suggestion it made."""
+    role = message.get('role', 'user')
+    content = message.get('content') or ''
+    lines = []
+    if role == 'assistant':
+        suggestion = extract_suggestion(content)
+        if suggestion is not None:
+            line = _suggestion_line(suggestion)
+            if line:
+                lines.append(line)
+            # Only the conversational text before the JSON
+            content = content[:content.find('{')]
+    prefix = "User" if role == 'user' else "Assistant"
+    for sentence in _SENTENCE_SPLIT.split(content):
+        sentence = sentence.strip()
+        if len(sentence) > 3:
+            lines.append(f"{prefix}: {sentence[:SUMMARY_LINE_CHARS]}")
+    return lines
+
+
+def _line_score(line: str) -> float:
+    """How much a line is worth keeping: the user's facts, numbers, names, past suggestions."""
+    score = 2.0 if line.startswith(("User:", "Assistant suggested")) else 0.0
+    score += min(len(_NUMBER.findall(line)), 3)
+    score += min(len(_NAME.findall(line)), 3) * 0.5
+    return score
+
+
+def roll_summary(summary: Sequence[str], folded: Sequence[Dict[str, str]],
+                 max_tokens: int = ASSISTANT_SUMMARY_TOKENS) -> List[str]:
+    """
+    Fold ``folded`` messages into the existing summary lines. When over
+    ``max_tokens``, the lowest-value lines go first (oldest on ties).
+    """
+    if not folded:
+        return list(summary)
+    key = hashlib.sha256(
+        json.dumps([list(summary), list(folded), max_tokens], sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    cached = summary_cache.get(key)
+    if cached is not None:
+        return cached
+
+    lines = list(summary)
+    for message in folded:
+        for line in _message_lines(message):
+            if line not in lines:
+                lines.append(line)
+
+    # "- " bullet and newline per line
+    costs = [count_tokens(line) + 2 for line in lines]
+    total = sum(costs)
+    if total > max_tokens:
+        # Drop cheapest-value lines first, keeping the rest in conversation order
+        order = sorted(range(len(lines)), key=lambda i: (_line_score(lines[i]), i))
+        dropped = set()
+        for index in order:
+            if total <= max_tokens:
+                break
+            dropped.add(index)
+            total -= costs[index]
+        lines = [line for i, line in enumerate(lines) if i not in dropped]
+
+    summary_cache.set(key, lines)
+    return lines
+
+
+def summary_message(summary: Sequence[str]) -> Dict[str, str]:
+    return {
+        "role": "system",
+        "content": _SUMMARY_HEADER + "\n" + "\n".join(f"- {line}" for line in summary),
+    }
+
+
+def fit_context(system_prompt: str, history: Sequence[Dict[str, str]], user_message: str,
+                summary: Sequence[str] = (), budget: int = ASSISTANT_HISTORY_TOKENS) -> ContextWindow:
+    """
+    Messages for one request with at most ``budget`` tokens of history and
+    summary. Returns the messages plus the history and summary left after
+    folding, so a session can keep them.
+    """
+    system = {"role": "system", "content": system_prompt}
+    user = {"role": "user", "content": user_message}
+    available = budget
+    summary_lines_budget = ASSISTANT_SUMMARY_TOKENS - count_tokens(_SUMMARY_HEADER) - MESSAGE_OVERHEAD_TOKENS
+    costs = [_content_tokens(m.get('content')) + MESSAGE_OVERHEAD_TOKENS for m in history]
+
+    def keep_from(reserve: int) -> int:
+        """Index of the oldest message kept when ``reserve`` tokens are held back."""
+        used, start = 0, len(history)
+        while start > 0 and used + costs[start - 1] <= available - reserve:
+            used += costs[start - 1]
+            start -= 1
+        return start
+
+    summary = list(summary)
+    start = keep_from(0 if not summary else ASSISTANT_SUMMARY_TOKENS)
+    if start and not summary:
+        # Something has to be folded, so room is needed for the summary
+        start = keep_from(ASSISTANT_SUMMARY_TOKENS)
+    folded = list(history[:start])
+    kept = list(history[start:])
+    summary = roll_summary(summary, folded, summary_lines_budget)
+
+    messages = [system] + ([summary_message(summary)] if summary else []) + kept + [user]
+    return ContextWindow(messages, kept, summary, count_message_tokens(messages), len(folded))
@@ -0,0 +1,181 @@
+"""
+Server-side conversation sessions for the builder assistant
+Each (session_id, section) keeps its recent history and the rendered system
+prompt, so a client only sends the new message plus the turn and context
+version it last saw. History older than the token budget or the
+per-session message cap is folded into a rolling summary (see
+context_budget). Sessions live in a bounded LRU with a TTL and can spill
+to a SQLite file (ASSISTANT_SESSION_DB) shared by every worker on the host.
+When the server copy is missing or stale, the client is asked to resend the
+full history and resume context once.
+"""
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+from app.cache import TieredCache
+from app.context_budget import fit_context, roll_summary
+
+SESSION_TTL = int(os.environ.get("ASSISTANT_SESSION_TTL", 2 * 60 * 60))
+# Messages kept verbatim per session; older ones are folded into the summary
+SESSION_HISTORY_MESSAGES = int(os.environ.get("ASSISTANT_SESSION_HISTORY", 8))
+
+session_cache = TieredCache(
+    "assistant_sessions",
+    max_entries=int(os.environ.get("ASSISTANT_SESSION_CACHE_SIZE", 1000)),
+    ttl=SESSION_TTL,
+    sqlite_path=os.environ.get("ASSISTANT_SESSION_DB") or None,
+    disk_max_entries=int(os.environ.get("ASSISTANT_SESSION_DB_SIZE", 20000)),
+)
+
+
+class SessionResyncRequired(Exception):
+    """The server has no usable copy of this session; the client must resend it."""
+
+
+def context_version(resume_context: Dict[str, Any]) -> str:
+    """Stable hash of a resume context, for clients that don't send their own version."""
+    encoded = json.dumps(resume_context or {}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+class ConversationSessions:
+    """
+    Session state is a plain dict: context_version, system_prompt, history
+    (at most SESSION_HISTORY_MESSAGES recent messages), summary (lines
+    condensed from older ones) and turns (a counter the client echoes back,
+    which also detects a stale copy in another worker).
+    """
+
+    def __init__(self, cache: TieredCache):
+        self.cache = cache
+        self._lock = threading.Lock()
+        self.resumed = 0
+        self.resyncs = 0
+        self.prompt_renders = 0
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.folded_messages = 0
+
+    @staticmethod
+    def key(session_id: str, section: str) -> str:
+        return f"{session_id}:{section}"
+
+    def _load(self, key: str, turn: Optional[int]) -> Optional[Dict[str, Any]]:
+        session = self.cache.memory.get(key)
+        if (session is None or session["turns"] != turn) and self.cache.disk is not None:
+            # Another worker may have recorded newer turns in the shared tier
+            shared = self.cache.disk.get(key)
+            if shared is not None:
+                self.cache.memory.set(key, shared)
+                session = shared
+        return session
+
+    def prepare(self, data: Dict[str, Any], section: str, prompt_class) -> Dict[str, Any]:
+        """
+        The session to answer ``data`` from. History comes from the server
+        copy when the client's turn matches, otherwise from the request's
+        conversation_history; the system prompt is reused while the context
+        version is unchanged and re-rendered when resume_context is sent.
+        Raises SessionResyncRequired when neither side has what's needed.
+        """
+        session_id = data.get('session_id') or 'default'
+        key = self.key(session_id, section)
+        turn = data.get('session_turn')
+        session = self._load(key, turn) if turn is not None else None
+
+        if session is not None and session["turns"] == turn:
+            history, summary, turns = session["history"], session.get("summary", []), session["turns"]
+        elif 'conversation_history' in data:
+            history = [
+                {"role": msg.get('role', 'user'), "content": msg.get('content', '')}
+                for msg in data.get('conversation_history') or []
+            ]
+            summary, turns = [], 0
+        else:
+            self._count(resyncs=1)
+            raise SessionResyncRequired(f"Session {session_id} is not available on the server")
+
+        if 'resume_context' in data:
+            resume_context = data.get('resume_context') or {}
+            version = data.get('context_version') or context_version(resume_context)
+            if session is not None and session["context_version"] == version:
+                system_prompt = session["system_prompt"]
+            else:
+                system_prompt = prompt_class.get_system_prompt(resume_context)
+                self._count(prompt_renders=1)
+        elif session is not None and session["context_version"] == data.get('context_version'):
+            version, system_prompt = session["context_version"], session["system_prompt"]
+        else:
+            self._count(resyncs=1)
+            raise SessionResyncRequired(f"Resume context for session {session_id} is out of date")
+
+        if session is not None and session["turns"] == turn:
+            self._count(resumed=1)
+        return {
+            "key": key,
+            "context_version": version,
+            "system_prompt": system_prompt,
+            "history": history,
+            "summary": summary,
+            "turns": turns,
+        }
+
+    def record_turn(self, session: Dict[str, Any], user_message: str, reply: str) -> Dict[str, Any]:
+        """Store the finished exchange; returns what the client should echo next time."""
+        history = session["history"] + [
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": reply},
+        ]
+        overflow = max(0, len(history) - SESSION_HISTORY_MESSAGES)
+        updated = {
+            **session,
+            "history": history[overflow:],
+            "summary": roll_summary(session["summary"], history[:overflow]),
+            "turns": session["turns"] + 1,
+        }
+        key = updated.pop("key")
+        self.cache.set(key, updated)
+        self._count(folded_messages=overflow)
+        return {"session_turn": updated["turns"], "context_version": updated["context_version"]}
+
+    def build_messages(self, session: Dict[str, Any], user_message: str) -> List[Dict[str, str]]:
+        """
+        System prompt, summary, recent history and the new user message,
+        fitted to the token budget. Messages folded to make room stay folded
+        in ``session`` so record_turn keeps them summarized.
+        """
+        window = fit_context(session["system_prompt"], session["history"], user_message, session["summary"])
+        session["history"], session["summary"] = window.history, window.summary
+        self._count(requests=1, prompt_tokens=window.prompt_tokens, folded_messages=window.folded)
+        return window.messages
+
+    def delete(self, session_id: str, section: str) -> None:
+        self.cache.delete(self.key(session_id, section))
+
+    def _count(self, **counts: int) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "resumed": self.resumed,
+                "resyncs": self.resyncs,
+                "prompt_renders": self.prompt_renders,
+                "folded_messages": self.folded_messages,
+                "avg_prompt_tokens": round(self.prompt_tokens / self.requests, 1) if self.requests else 0.0,
+            }
+
+
+conversation_sessions = ConversationSessions(session_cache)
+
+
+def build_session_messages(session: Dict[str, Any], user_message: str) -> List[Dict[str, str]]:
+    return conversation_sessions.build_messages(session, user_message)
+
+
+def get_session_stats() -> Dict[str, Any]:
+    return conversation_sessions.stats()
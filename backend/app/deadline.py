@@ -0,0 +1,136 @@
+"""
+End-to-end request deadlines
+Each route opens a deadline scope with its time budget; extraction, the rate
+limiter wait and the Groq request timeout all read the remaining budget from
+the current scope instead of using their own fixed timeouts.
+"""
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+# End-to-end budget per endpoint in seconds, overridable with
+# REQUEST_BUDGET_<NAME> (e.g. REQUEST_BUDGET_ANALYZE=45)
+REQUEST_BUDGETS = {
+    "analyze": 60,
+    "analyze_multiple_jobs": 110,
+    "project_highlights": 60,
+    "skills_only": 45,
+}
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out during ``stage``."""
+
+    def __init__(self, stage: str, message: str = None):
+        self.stage = stage
+        self.partial: Dict[str, Any] = {}
+        super().__init__(message or f"Request deadline exceeded during {stage}")
+
+
+class Deadline:
+    def __init__(self, budget: float, endpoint: str):
+        self.budget = budget
+        self.endpoint = endpoint
+        self.expires_at = time.monotonic() + budget
+        self.exceeded_stage: Optional[str] = None
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def exceeded(self, stage: str) -> DeadlineExceeded:
+        """Record that the budget ran out in ``stage`` and build the error to raise."""
+        if self.exceeded_stage is None:
+            self.exceeded_stage = stage
+            _stats.record_hit(self.endpoint, stage)
+        return DeadlineExceeded(stage)
+
+    def check(self, stage: str) -> None:
+        """Raise DeadlineExceeded if nothing is left for ``stage``."""
+        if self.expired():
+            raise self.exceeded(stage)
+
+
+class _DeadlineStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+
+    def _entry(self, endpoint: str) -> Dict[str, Any]:
+        return self._endpoints.setdefault(
+            endpoint, {"requests": 0, "deadline_hits": 0, "hits_by_stage": {}}
+        )
+
+    def record_request(self, endpoint: str) -> None:
+        with self._lock:
+            self._entry(endpoint)["requests"] += 1
+
+    def record_hit(self, endpoint: str, stage: str) -> None:
+        with self._lock:
+            entry = self._entry(endpoint)
+            entry["deadline_hits"] += 1
+            entry["hits_by_stage"][stage] = entry["hits_by_stage"].get(stage, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                endpoint: {
+                    **entry,
+                    "hit_rate": round(entry["deadline_hits"] / entry["requests"], 4)
+                    if entry["requests"] else 0.0,
+                    "hits_by_stage": dict(entry["hits_by_stage"]),
+                }
+                for endpoint, entry in self._endpoints.items()
+            }
+
+
+_stats = _DeadlineStats()
+_current: contextvars.ContextVar = contextvars.ContextVar("request_deadline", default=None)
+
+
+def get_request_budget(name: str) -> float:
+    return float(os.environ.get(f"REQUEST_BUDGET_{name.upper()}", REQUEST_BUDGETS[name]))
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def remaining_budget(default: Optional[float] = None) -> Optional[float]:
+    """Seconds left in the current scope, or ``default`` outside any scope."""
+    deadline = _current.get()
+    return deadline.remaining() if deadline is not None else default
+
+
+def bounded_timeout(timeout: float) -> float:
+    """``timeout`` clipped to whatever is left of the current deadline."""
+    deadline = _current.get()
+    return min(timeout, deadline.remaining()) if deadline is not None else timeout
+
+
+def check_deadline(stage: str) -> None:
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+@contextmanager
+def deadline_scope(name: str, budget: Optional[float] = None) -> Iterator[Deadline]:
+    """Open a deadline for endpoint ``name`` for the duration of the block."""
+    deadline = Deadline(budget if budget is not None else get_request_budget(name), name)
+    _stats.record_request(name)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def get_deadline_stats() -> Dict[str, Any]:
+    """Per-endpoint request counts and how often (and where) deadlines were hit."""
+    return _stats.snapshot()
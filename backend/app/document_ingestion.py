@@ -0,0 +1,109 @@
+"""
+In-memory document ingestion for resume uploads
+Parses PDF and DOCX straight from the uploaded bytes, no temp files, and
+caches the result by the SHA-256 of the upload
+"""
+import hashlib
+import io
+import os
+from typing import Any, Dict
+import fitz  # PyMuPDF
+from docx import Document
+from app.cache import TieredCache
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx')
+
+# Extracted text cache: memory LRU per worker, plus an optional directory
+# shared by every gunicorn worker on the host
+extraction_cache = TieredCache(
+    "extraction",
+    max_entries=int(os.environ.get("EXTRACTION_CACHE_SIZE", 256)),
+    disk_dir=os.environ.get("EXTRACTION_CACHE_DIR") or None,
+    disk_max_entries=int(os.environ.get("EXTRACTION_CACHE_DISK_SIZE", 4096)),
+)
+
+
+def get_extension(filename: str) -> str:
+    """Return the lower-cased extension of an uploaded filename."""
+    return os.path.splitext(filename or "")[-1].lower()
+
+
+def is_supported_file(filename: str) -> bool:
+    """Check the upload is a PDF or DOCX."""
+    return get_extension(filename) in SUPPORTED_EXTENSIONS
+
+
+def read_upload(file_storage) -> bytes:
+    """Read an uploaded werkzeug FileStorage fully into memory."""
+    file_storage.stream.seek(0)
+    return file_storage.read()
+
+
+def upload_hash(data: bytes) -> str:
+    """SHA-256 of the uploaded bytes, used as the content address."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _parse_pdf(data: bytes) -> Dict[str, Any]:
+    """Extract text and per-page metadata using PyMuPDF's stream open."""
+    pages = []
+    texts = []
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        for page in doc:
+            page_text = page.get_text("text")
+            texts.append(page_text + "\n")
+            pages.append({
+                "number": page.number + 1,
+                "chars": len(page_text),
+                "width": round(page.rect.width, 2),
+                "height": round(page.rect.height, 2),
+            })
+    return {"format": "pdf", "text": "".join(texts), "page_count": len(pages), "pages": pages}
+
+
+def _parse_docx(data: bytes) -> Dict[str, Any]:
+    """Extract text using python-docx over a BytesIO; DOCX has no fixed pages."""
+    doc = Document(io.BytesIO(data))
+    text = "\n".join(para.text for para in doc.paragraphs)
+    return {
+        "format": "docx",
+        "text": text,
+        "page_count": None,
+        "pages": [],
+        "paragraphs": len(doc.paragraphs),
+    }
+
+
+def extract_document(data: bytes, filename: str) -> Dict[str, Any]:
+    """
+    Extract text plus page metadata from uploaded bytes.
+    Identical uploads are served from the extraction cache.
+    """
+    extension = get_extension(filename)
+    if extension not in SUPPORTED_EXTENSIONS:
+        raise ValueError("Unsupported file format")
+
+    key = upload_hash(data)
+    cached = extraction_cache.get(key)
+    if cached is not None and cached.get("format") == extension[1:]:
+        return cached
+
+    document = _parse_pdf(data) if extension == ".pdf" else _parse_docx(data)
+    document["sha256"] = key
+    extraction_cache.set(key, document)
+    return document
+
+
+def extract_text_from_pdf_bytes(data: bytes) -> str:
+    """Extract plain text from PDF bytes."""
+    return _parse_pdf(data)["text"]
+
+
+def extract_text_from_docx_bytes(data: bytes) -> str:
+    """Extract plain text from DOCX bytes."""
+    return _parse_docx(data)["text"]
+
+
+def extract_text(data: bytes, filename: str) -> str:
+    """Extract resume text from uploaded bytes, dispatching on the file extension."""
+    return extract_document(data, filename)["text"]
@@ -9,7 +9,7 @@ from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import base64
 import re
-from groq import Groq
+from app.llm_gateway import chat_completion
 import time
 
 logger = logging.getLogger(__name__)
@@ -53,9 +53,9 @@ class GmailSyncService:
     ]
     
     def __init__(self, groq_api_key: str):
-        self.groq_client = Groq(api_key=groq_api_key)
+        # LLM calls go through the shared gateway client (app.llm_gateway)
+        self.groq_api_key = groq_api_key
         self.ai_call_count = 0  # Track API calls
-        self.last_ai_call_time = 0  # Track timing
         
     def build_gmail_service(self, credentials_dict):
         """Build Gmail API service from stored credentials_dict (Supabase)"""
@@ -266,14 +266,7 @@ class GmailSyncService:
     def _ai_classify_email(self, email: Dict[str, Any]) -> bool:
         """Use Groq LLM with rate limit handling"""
         try:
-            # Rate limiting: Wait between calls
-            current_time = time.time()
-            time_since_last_call = current_time - self.last_ai_call_time
-            
-            # Ensure at least 0.5 seconds between API calls
-            if time_since_last_call < 0.5:
-                time.sleep(0.5 - time_since_last_call)
-            
+            # Pacing comes from the gateway's shared RPM/TPM budget
             self.ai_call_count += 1
             logger.info(f"AI call #{self.ai_call_count}")
             
@@ -298,15 +291,13 @@ Body preview: {email['body'][:500]}
             max_retries = 3
             for attempt in range(max_retries):
                 try:
-                    response = self.groq_client.chat.completions.create(
+                    response = chat_completion(
                         model="llama-3.3-70b-versatile",
                         messages=[{"role": "user", "content": prompt}],
                         temperature=0.1,
                         max_tokens=10
                     )
                     
-                    self.last_ai_call_time = time.time()
-                    
                     result = response.choices[0].message.content.strip().upper()
                     is_job_email = 'YES' in result
                     
@@ -421,7 +412,7 @@ Platform detection:
 Respond ONLY with the JSON object, no additional text.
 """
             
-            response = self.groq_client.chat.completions.create(
+            response = chat_completion(
                 model="llama-3.3-70b-versatile",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.1,
@@ -1,19 +1,26 @@
 import os
 import re
 import json
+import hashlib
+import copy
+import contextvars
 import fitz  # PyMuPDF
 from docx import Document
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import time
 from dotenv import load_dotenv
-from groq import Groq
+from app.llm_gateway import CompletionResult, chat_completion, hedged_completion
+from app.circuit_breaker import CircuitOpenError
+from app.local_analyzer import analyze_resume_locally
+from app.json_repair import repair_json, repair_stats
+from app.document_ingestion import extract_document
+from app.cache import TieredCache
+from app.singleflight import SingleFlight
+from app.deadline import DeadlineExceeded, bounded_timeout, check_deadline, current_deadline, deadline_scope
 
 load_dotenv()
 
-# Global rate limiter
-_last_api_call_time = 0
-_min_seconds_between_calls = 1
-
 # Timeout configurations
 TIMEOUT_CONFIG = {
     "basic_extraction": 25,
@@ -22,12 +29,37 @@ TIMEOUT_CONFIG = {
     "complex_analysis": 60,
 }
 
+# Multi-job fan-out
+MULTI_JOB_CONCURRENCY = int(os.environ.get("MULTI_JOB_CONCURRENCY", 3))
+MULTI_JOB_TIMEOUT = int(os.environ.get("MULTI_JOB_TIMEOUT", TIMEOUT_CONFIG["complex_analysis"]))
+# "per_job" (one call per job) or "batched" (one call for all jobs)
+MULTI_JOB_MODE = os.environ.get("MULTI_JOB_MODE", "per_job")
+
 # Groq models (very fast!)
 GROQ_MODELS = [
     "llama-3.3-70b-versatile",  # Primary: Best balance of speed & quality (276 T/sec)
     "llama-3.1-8b-instant",      # Fallback: Ultra-fast for simple tasks
 ]
 
+# Analysis response cache. Calls run at temperature=0.0, so the same prompt
+# and model always produce the same answer.
+LLM_CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", 6 * 60 * 60))
+llm_cache = TieredCache(
+    "llm_analysis",
+    max_entries=int(os.environ.get("LLM_CACHE_SIZE", 512)),
+    ttl=LLM_CACHE_TTL,
+    sqlite_path=os.environ.get("LLM_CACHE_DB") or None,
+    disk_max_entries=int(os.environ.get("LLM_CACHE_DB_SIZE", 10000)),
+)
+
+def llm_cache_key(prompt: str, model: str) -> str:
+    """Hash of the whitespace-normalized prompt plus the model name."""
+    normalized = re.sub(r'\s+', ' ', prompt).strip()
+    return hashlib.sha256(f"{model}\n{normalized}".encode("utf-8")).hexdigest()
+
+# Identical analyses already in flight share one Groq call
+analysis_flights = SingleFlight()
+
 def get_optimal_timeout(has_job_info: bool, include_recommendations: bool, prompt_length: int) -> int:
     """Calculate optimal timeout based on analysis complexity."""
     if include_recommendations and has_job_info:
@@ -91,9 +123,15 @@ def preprocess_for_speed(resume_text: str, max_length: int = 3000) -> str:
     
     return text[:best_cut].strip() + "..."
 
-def create_optimized_prompt(resume_text: str, job_title: str = None, job_description: str = None) -> str:
-    """Create a streamlined, fast-processing prompt."""
-    resume_text = preprocess_for_speed(resume_text, 2500)
+def create_optimized_prompt(resume_text: str, job_title: str = None, job_description: str = None,
+                            resume_preprocessed: bool = False) -> str:
+    """Create a streamlined, fast-processing prompt.
+
+    Pass ``resume_preprocessed=True`` when the text already went through
+    ``preprocess_for_speed(text, 2500)`` (e.g. once for several jobs).
+    """
+    if not resume_preprocessed:
+        resume_text = preprocess_for_speed(resume_text, 2500)
     
     base_prompt = f"""You are an expert resume analyst with 10+ years of experience in technical recruitment and career counseling. Your task is to perform a comprehensive, detailed analysis of this resume assuming the candidate is a new grad applying for internship or junior roles.
 
@@ -205,18 +243,80 @@ Project Relevance:
     
     return base_prompt
 
-def call_groq_with_rate_limit(prompt: str, analysis_type: str = "basic") -> str:
-    """Call Groq API with proper rate limiting."""
+def create_batched_prompt(resume_text: str, jobs: Dict[str, Optional[str]],
+                          resume_preprocessed: bool = False) -> str:
+    """
+    One prompt carrying the resume once and asking for a job_match block per job.
+    The resume-level fields are shared; per-job fields go under "job_results".
+    """
+    base_prompt = create_optimized_prompt(resume_text, resume_preprocessed=resume_preprocessed)
     
-    global _last_api_call_time
-    
-    # Enforce rate limit
-    time_since_last_call = time.time() - _last_api_call_time
-    if time_since_last_call < _min_seconds_between_calls:
-        wait_time = _min_seconds_between_calls - time_since_last_call
-        print(f"⏱️  Rate limiting: waiting {wait_time:.1f}s...")
-        time.sleep(wait_time)
+    job_lines = []
+    for index, (job_title, job_description) in enumerate(jobs.items(), start=1):
+        line = f"{index}. JOB: {job_title}"
+        if job_description:
+            line += f"\n   DESCRIPTION: {preprocess_for_speed(job_description, 600)}"
+        job_lines.append(line)
+    job_list = "\n".join(job_lines)
+    job_keys = ", ".join(f'"{job_title}"' for job_title in jobs)
     
+    return base_prompt + f"""
+
+TARGET JOBS (analyze the SAME resume against EACH job):
+{job_list}
+
+For each job, determine its required skills (from the description if given, otherwise industry standards), then compare with the ALREADY EXTRACTED skills array:
+- matched_skills = required skills that ARE in the extracted skills
+- missing_skills = required skills NOT in the extracted skills
+- extra_skills = extracted skills that are bonus for this role
+
+Add this field to the JSON, with EXACTLY these keys: {job_keys}
+{{
+    "job_results": {{
+        "<job title>": {{
+            "job_match": {{
+                "job_title": "<job title>",
+                "required_skills": ["skill1", "skill2"],
+                "matched_skills": ["matched1"],
+                "missing_skills": ["missing1"],
+                "extra_skills": ["extra1"],
+                "skill_match_score": 75,
+                "avg_project_relevance": 75,
+                "overall_relevance_score": 80,
+                "overall_fit": "Strong Fit",
+                "project_relevance": {{
+                    "Project Name": {{
+                        "skills": ["tech1"],
+                        "matched_skills": ["matched1"],
+                        "matched_skills_count": 1,
+                        "relevance_score": 80,
+                        "relevance_label": "Highly Relevant"
+                    }}
+                }}
+            }},
+            "score": 85,
+            "matched_skills": {{"skill_name": 0.8}},
+            "missing_skills": {{"skill_name": 0.6}},
+            "recommendations": ["specific advice for this job"]
+        }}
+    }}
+}}
+
+Scoring Guidelines:
+- Strong Fit (80-100), Moderate Fit (50-79), Weak Fit (0-49)
+- "Highly Relevant" (80-100): 3+ matching core skills; "Somewhat Relevant" (40-79): 1-2; "Not Relevant" (0-39)"""
+
+def call_groq_with_rate_limit(prompt: str, analysis_type: str = "basic", max_tokens: int = 2000) -> str:
+    """Call Groq API with proper rate limiting."""
+    return _call_groq(prompt, analysis_type, max_tokens).content
+
+def _call_groq(prompt: str, analysis_type: str = "basic", max_tokens: int = 2000,
+               validate: Callable[[str], bool] = None) -> CompletionResult:
+    """
+    Call Groq, hedging a slow or failed primary model with the fallback model.
+    ``validate`` rejects replies that don't parse so the other model can win.
+    """
+    # Rate limiting is enforced by the gateway's shared RPM/TPM token buckets
     has_job_info = "JOB:" in prompt
     include_recommendations = "recommendations" in prompt
     optimal_timeout = get_optimal_timeout(has_job_info, include_recommendations, len(prompt))
@@ -225,30 +325,30 @@ def call_groq_with_rate_limit(prompt: str, analysis_type: str = "basic") -> str:
         print(f"📡 Calling Groq API (timeout: {optimal_timeout}s)...")
         start_time = time.time()
         
-        # Initialize Groq client
-        client = Groq(api_key=os.environ.get('GROQ_API_KEY'))
-        
-        # Make the API call
-        chat_completion = client.chat.completions.create(
+        # Make the API call on the shared keep-alive client (waits for RPM/TPM budget)
+        result = hedged_completion(
             messages=[
                 {
                     "role": "user",
                     "content": prompt,
                 }
             ],
-            model=GROQ_MODELS[0],
+            primary=GROQ_MODELS[0],
+            fallback=GROQ_MODELS[1],
+            validate=validate,
             temperature=0.0,
-            max_tokens=2000,
+            max_tokens=max_tokens,
+            timeout=bounded_timeout(optimal_timeout),
         )
         
-        response_text = chat_completion.choices[0].message.content
-        
-        if response_text:
+        if result.content:
             elapsed = time.time() - start_time
-            _last_api_call_time = time.time()
-            print(f"✓ Success in {elapsed:.1f}s")
-            return response_text
+            print(f"✓ Success in {elapsed:.1f}s ({result.model}{', hedged' if result.hedged else ''})")
+            return result
+        raise ValueError("Empty response from Groq")
             
+    except (DeadlineExceeded, CircuitOpenError):
+        raise
     except Exception as e:
         error_msg = str(e).lower()
         
@@ -263,7 +363,38 @@ def call_groq_with_rate_limit(prompt: str, analysis_type: str = "basic") -> str:
         # For other errors, raise immediately
         raise Exception(f"API call failed: {str(e)}")
 
-def parse_groq_response(response_text: str) -> Dict[str, Any]:
+def _load_analysis_json(response_text: str,
+                        record_stats: bool = True) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Decode the reply's JSON object. A reply that doesn't decode (cut off by
+    max_tokens, trailing commas) goes through the repair layer; returns the
+    object and the repair info, or raises ValueError if nothing is salvageable.
+    ``record_stats`` is off for replies already counted (cache hits).
+    """
+    json_start = response_text.find('{')
+    json_end = response_text.rfind('}') + 1
+    
+    if json_start != -1 and json_end > json_start:
+        try:
+            result = json.loads(response_text[json_start:json_end])
+            if isinstance(result, dict):
+                if record_stats:
+                    repair_stats.record("parsed")
+                return result, None
+        except json.JSONDecodeError:
+            pass
+    
+    result, repair = repair_json(response_text)
+    if not isinstance(result, dict) or not result:
+        if record_stats:
+            repair_stats.record("unrecoverable")
+        raise ValueError(f"No usable JSON object found ({repair.get('reason', 'not an object')})")
+    if record_stats:
+        repair_stats.record("repaired")
+        print(f"🩹 Repaired malformed JSON reply ({repair['strategy']})")
+    return result, repair
+
+def parse_groq_response(response_text: str, record_stats: bool = True) -> Dict[str, Any]:
     """Parse and validate Groq's JSON response."""
     try:
         response_text = response_text.strip()
@@ -273,14 +404,7 @@ def parse_groq_response(response_text: str) -> Dict[str, Any]:
             response_text = re.sub(r'^```(?:json)?\s*', '', response_text)
             response_text = re.sub(r'\s*```$', '', response_text)
         
-        json_start = response_text.find('{')
-        json_end = response_text.rfind('}') + 1
-        
-        if json_start == -1 or json_end == 0:
-            raise ValueError("No JSON object found")
-        
-        json_str = response_text[json_start:json_end]
-        result = json.loads(json_str)
+        result, repair = _load_analysis_json(response_text, record_stats)
         
         # Ensure required fields
         required_fields = {
@@ -299,10 +423,19 @@ def parse_groq_response(response_text: str) -> Dict[str, Any]:
             }
         }
         
+        recovered_fields = list(result)
         for field, default_value in required_fields.items():
             if field not in result:
                 result[field] = default_value
         
+        if repair is not None:
+            # Tell the client which parts of a cut-off reply survived
+            result["repair"] = {
+                **repair,
+                "missing_fields": [field for field in required_fields if field not in recovered_fields],
+                "recovered_fields": recovered_fields,
+            }
+        
         if not result.get("relevant_projects"):
             result["relevant_projects"] = result.get("projects", [])
         
@@ -331,6 +464,37 @@ def parse_groq_response(response_text: str) -> Dict[str, Any]:
         print(f"Response parsing error: {str(e)}")
         return create_comprehensive_fallback_analysis(response_text)
 
+def parse_batched_groq_response(response_text: str, job_titles: List[str],
+                                record_stats: bool = True) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Split a batched reply into the per-job result shape of parse_groq_response.
+    Returns None when the reply fails validation (caller falls back to per-job calls).
+    """
+    common = parse_groq_response(response_text, record_stats)
+    if "error" in common:
+        return None
+    
+    job_results = common.pop("job_results", None)
+    if not isinstance(job_results, dict):
+        return None
+    by_title = {str(title).strip().lower(): value for title, value in job_results.items()}
+    
+    results = {}
+    for job_title in job_titles:
+        job_result = by_title.get(job_title.strip().lower())
+        if not isinstance(job_result, dict):
+            return None
+        job_match = job_result.get("job_match")
+        if not isinstance(job_match, dict) or not isinstance(job_match.get("required_skills"), list):
+            return None
+        
+        result = copy.deepcopy(common)
+        result.update(copy.deepcopy(job_result))
+        result["job_match"]["job_title"] = job_title
+        result["target_job"] = job_title
+        results[job_title] = result
+    return results
+
 def create_comprehensive_fallback_analysis(text: str) -> Dict[str, Any]:
     """Create fallback analysis if parsing fails."""
     return {
@@ -351,85 +515,326 @@ def create_comprehensive_fallback_analysis(text: str) -> Dict[str, Any]:
         "raw_response": text[:300] if text else "No response"
     }
 
-def analyze_resume_with_groq(file_path: str, job_title: str = None, job_skills: List[str] = None, 
-                             job_description: str = None, profile: str = "general") -> Dict[str, Any]:
-    """Analyze resume using Groq API."""
+def _join_flight(key: str, fn):
+    """
+    Run ``fn`` via single-flight; waiters stop waiting when their own deadline
+    runs out. The leader running out of its deadline is not passed on: a
+    waiter with budget left takes over.
+    """
+    deadline = current_deadline()
     try:
-        print("🚀 Starting resume analysis with Groq...")
-        
-        if file_path.endswith(".pdf"):
-            text = extract_text_from_pdf(file_path)
-        elif file_path.endswith(".docx"):
-            text = extract_text_from_docx(file_path)
-        else:
-            raise ValueError("Unsupported file format")
-        
-        if not text.strip():
-            raise ValueError("No text extracted from file")
-        
-        print(f"📄 Extracted {len(text)} characters")
-        
-        prompt = create_optimized_prompt(text, job_title, job_description)
-        print(f"📝 Generated {len(prompt)} character prompt")
-        
-        analysis_type = "complex" if job_title and job_description else "basic"
-        
-        # Single API call
-        response_text = call_groq_with_rate_limit(prompt, analysis_type)
-        result = parse_groq_response(response_text)
-        
-        result["processing_info"] = {
-            "resume_length": len(text),
-            "prompt_length": len(prompt),
-            "analysis_type": analysis_type,
-            "timestamp": time.time(),
+        return analysis_flights.do(key, fn, timeout=deadline.remaining() if deadline else None,
+                                   retry_on=(DeadlineExceeded,))
+    except TimeoutError:
+        if deadline is None:
+            raise
+        raise deadline.exceeded("llm")
+
+def _fetch_analysis(prompt: str, cache_key: str, analysis_type: str) -> Dict[str, Any]:
+    """Call Groq, parse the reply and cache it if it parsed cleanly."""
+    parsed: Dict[str, Dict[str, Any]] = {}
+
+    def validate(text: str) -> bool:
+        # Kept, so the winning reply isn't parsed (and counted) a second time
+        parsed[text] = parse_groq_response(text)
+        return "error" not in parsed[text]
+
+    completion = _call_groq(prompt, analysis_type, validate=validate)
+    result = parsed.get(completion.content)
+    if result is None:
+        result = parse_groq_response(completion.content)
+    # Only complete primary-model answers are cached under the primary model's key
+    if "error" not in result and "repair" not in result and completion.model == GROQ_MODELS[0]:
+        llm_cache.set(cache_key, completion.content)
+    result.setdefault("processing_info", {})["model"] = completion.model
+    return result
+
+def create_error_analysis(error_msg: str) -> Dict[str, Any]:
+    """Empty analysis payload carrying an error message."""
+    return {
+        "skills": [],
+        "projects": [],
+        "projects_with_skills": {},
+        "quantifiable_impacts": {},
+        "relevant_projects": [],
+        "analysis": {
+            "total_skills_found": 0,
+            "total_projects": 0,
+            "relevant_projects": 0,
+            "skills_with_metrics": 0,
+            "achieved_score": 0,
+            "max_possible_score": 100
+        },
+        "error": error_msg,
+        "processing_info": {
+            "error_time": time.time(),
+            "analysis_type": "failed",
             "api": "groq"
         }
+    }
+
+def load_resume_document(file_path: str = None, file_bytes: bytes = None,
+                         filename: str = None) -> Dict[str, Any]:
+    """Extract resume text (and page metadata when available) from a path or uploaded bytes."""
+    check_deadline("extraction")
+    if file_bytes is not None:
+        document = extract_document(file_bytes, filename)
+    elif file_path and file_path.endswith(".pdf"):
+        document = {"text": extract_text_from_pdf(file_path)}
+    elif file_path and file_path.endswith(".docx"):
+        document = {"text": extract_text_from_docx(file_path)}
+    else:
+        raise ValueError("Unsupported file format")
+    
+    if not document["text"].strip():
+        raise ValueError("No text extracted from file")
+    check_deadline("extraction")
+    
+    print(f"📄 Extracted {len(document['text'])} characters")
+    return document
+
+def analyze_resume_text(text: str, job_title: str = None, job_description: str = None,
+                        use_cache: bool = True, resume_preprocessed: bool = False,
+                        document: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Run the Groq analysis on already-extracted resume text. Raises on failure."""
+    prompt = create_optimized_prompt(text, job_title, job_description, resume_preprocessed)
+    print(f"📝 Generated {len(prompt)} character prompt")
+    
+    analysis_type = "complex" if job_title and job_description else "basic"
+    
+    cache_key = llm_cache_key(prompt, GROQ_MODELS[0])
+    response_text = llm_cache.get(cache_key) if use_cache else None
+    cache_hit = response_text is not None
+    coalesced = False
+    
+    if cache_hit:
+        print("⚡ Served analysis from cache")
+        result = parse_groq_response(response_text, record_stats=False)
+    else:
+        # Single API call, shared with identical requests already in flight
+        shared_result, coalesced = _join_flight(
+            cache_key, lambda: _fetch_analysis(prompt, cache_key, analysis_type)
+        )
+        result = copy.deepcopy(shared_result)
+        if coalesced:
+            print("🔗 Joined identical in-flight analysis")
+    
+    # Cached replies always come from the primary model
+    model = result.get("processing_info", {}).get("model", GROQ_MODELS[0])
+    result["processing_info"] = {
+        "resume_length": len(text),
+        "prompt_length": len(prompt),
+        "analysis_type": analysis_type,
+        "page_count": document.get("page_count") if document else None,
+        "cache_hit": cache_hit,
+        "coalesced": coalesced,
+        "model": model,
+        "timestamp": time.time(),
+        "api": "groq"
+    }
+    return result
+
+def analyze_resume_with_groq(file_path: str = None, job_title: str = None, job_skills: List[str] = None, 
+                             job_description: str = None, profile: str = "general",
+                             file_bytes: bytes = None, filename: str = None,
+                             use_cache: bool = True, allow_degraded: bool = False) -> Dict[str, Any]:
+    """Analyze resume using Groq API.
+
+    Pass either ``file_path`` or the uploaded ``file_bytes`` with its ``filename``;
+    the in-memory path avoids writing uploads to disk. ``use_cache=False``
+    skips the response cache lookup (a fresh result still refreshes it).
+    With ``allow_degraded`` an open Groq circuit is answered by the local
+    rule-based analyzer (flagged ``degraded``) instead of an error payload.
+    """
+    document = None
+    try:
+        print("🚀 Starting resume analysis with Groq...")
+        
+        document = load_resume_document(file_path, file_bytes, filename)
+        result = analyze_resume_text(
+            document["text"], job_title, job_description, use_cache, document=document
+        )
         
         print("✅ Analysis completed")
         return result
         
+    except DeadlineExceeded as e:
+        print(f"⏱️  Analysis deadline exceeded during {e.stage}")
+        error = DeadlineExceeded(e.stage)
+        if document is not None:
+            error.partial = {
+                "resume_length": len(document["text"]),
+                "page_count": document.get("page_count"),
+            }
+        raise error from e
+    except CircuitOpenError as e:
+        if allow_degraded and document is not None:
+            print("🛟 Groq circuit open, serving local rule-based analysis")
+            return analyze_resume_locally(document["text"], job_title, job_description, reason="circuit_open")
+        print(f"❌ Analysis failed: {e}")
+        return create_error_analysis(str(e))
     except Exception as e:
         error_msg = str(e)
         print(f"❌ Analysis failed: {error_msg}")
-        
-        return {
-            "skills": [],
-            "projects": [],
-            "projects_with_skills": {},
-            "quantifiable_impacts": {},
-            "relevant_projects": [],
-            "analysis": {
-                "total_skills_found": 0,
-                "total_projects": 0,
-                "relevant_projects": 0,
-                "skills_with_metrics": 0,
-                "achieved_score": 0,
-                "max_possible_score": 100
-            },
-            "error": error_msg,
-            "processing_info": {
-                "error_time": time.time(),
-                "analysis_type": "failed",
-                "api": "groq"
-            }
+        return create_error_analysis(error_msg)
+
+def analyze_resume_for_jobs(text: str, jobs: Dict[str, Optional[str]], use_cache: bool = True,
+                            max_concurrency: int = None, job_timeout: float = None,
+                            document: Dict[str, Any] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Analyze one extracted resume against several jobs concurrently.
+
+    ``jobs`` maps job title to an optional job description. The resume is
+    preprocessed once; per-job Groq calls run on at most ``max_concurrency``
+    threads and each gets ``job_timeout`` seconds from when it starts.
+    Failed or timed-out jobs get an error payload, the rest still return.
+    When the request deadline runs out, unfinished jobs are reported as such.
+    """
+    max_concurrency = max(1, max_concurrency or MULTI_JOB_CONCURRENCY)
+    job_timeout = job_timeout or MULTI_JOB_TIMEOUT
+    resume_text = preprocess_for_speed(text, 2500)
+    
+    started_at: Dict[str, float] = {}
+    
+    def run_job(job: str) -> Dict[str, Any]:
+        started_at[job] = time.time()
+        # The job's own deadline (inside the request's), so a timed-out job
+        # stops waiting on budget and Groq instead of finishing in the background
+        with deadline_scope("job_analysis", bounded_timeout(job_timeout)):
+            return analyze_resume_text(
+                resume_text, job, jobs[job], use_cache,
+                resume_preprocessed=True, document=document
+            )
+    
+    deadline = current_deadline()
+    results: Dict[str, Dict[str, Any]] = {}
+    executor = ThreadPoolExecutor(max_workers=min(max_concurrency, len(jobs)),
+                                  thread_name_prefix="job-analysis")
+    try:
+        # Each job runs in a copy of this context so it sees the request deadline
+        futures = {
+            executor.submit(contextvars.copy_context().run, run_job, job): job
+            for job in jobs
+        }
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = futures[future]
+                try:
+                    results[job] = future.result()
+                    print(f"✅ Completed analysis for {job}")
+                except Exception as e:
+                    print(f"❌ Analysis failed for {job}: {e}")
+                    results[job] = create_error_analysis(f"Failed to analyze for {job}: {e}")
+            
+            if deadline is not None and pending and deadline.expired():
+                deadline.exceeded("job_fanout")
+                for future in pending:
+                    job = futures[future]
+                    future.cancel()
+                    results[job] = create_error_analysis(
+                        f"Failed to analyze for {job}: request deadline exceeded"
+                    )
+                break
+            
+            now = time.time()
+            for future in list(pending):
+                job = futures[future]
+                if job in started_at and now - started_at[job] > job_timeout:
+                    pending.discard(future)
+                    future.cancel()
+                    print(f"⏱️  Analysis for {job} timed out after {job_timeout}s")
+                    results[job] = create_error_analysis(
+                        f"Failed to analyze for {job}: timed out after {job_timeout}s"
+                    )
+    finally:
+        # Timed-out calls stop at their own deadline; don't hold the request for them
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    return {job: results[job] for job in jobs}
+
+def _fetch_batched_analysis(prompt: str, cache_key: str, job_titles: List[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Call Groq once for all jobs; cache the reply only if it validates."""
+    # Room for one job_match block per job on top of the shared fields
+    max_tokens = min(2000 + 700 * (len(job_titles) - 1), 8000)
+    parsed: Dict[str, Optional[Dict[str, Dict[str, Any]]]] = {}
+
+    def validate(text: str) -> bool:
+        parsed[text] = parse_batched_groq_response(text, job_titles)
+        return parsed[text] is not None
+
+    completion = _call_groq(prompt, "complex", max_tokens=max_tokens, validate=validate)
+    if completion.content in parsed:
+        results = parsed[completion.content]
+    else:
+        results = parse_batched_groq_response(completion.content, job_titles)
+    if results is not None and completion.model == GROQ_MODELS[0]:
+        llm_cache.set(cache_key, completion.content)
+    return results
+
+def analyze_resume_for_jobs_batched(text: str, jobs: Dict[str, Optional[str]], use_cache: bool = True,
+                                    document: Dict[str, Any] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Analyze one resume against several jobs in a single Groq call.
+    Falls back to analyze_resume_for_jobs when the batched reply fails validation.
+    """
+    job_titles = list(jobs)
+    resume_text = preprocess_for_speed(text, 2500)
+    prompt = create_batched_prompt(resume_text, jobs, resume_preprocessed=True)
+    print(f"📝 Generated {len(prompt)} character batched prompt for {len(job_titles)} jobs")
+    
+    cache_key = llm_cache_key(prompt, GROQ_MODELS[0])
+    response_text = llm_cache.get(cache_key) if use_cache else None
+    cache_hit = response_text is not None
+    coalesced = False
+    
+    try:
+        if cache_hit:
+            print("⚡ Served batched analysis from cache")
+            results = parse_batched_groq_response(response_text, job_titles, record_stats=False)
+        else:
+            shared_results, coalesced = _join_flight(
+                cache_key, lambda: _fetch_batched_analysis(prompt, cache_key, job_titles)
+            )
+            results = copy.deepcopy(shared_results)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        print(f"❌ Batched analysis failed: {e}")
+        results = None
+    
+    if results is None:
+        print("↩️  Batched output invalid, falling back to per-job analysis")
+        return analyze_resume_for_jobs(text, jobs, use_cache, document=document)
+    
+    for job_title, result in results.items():
+        result["processing_info"] = {
+            "resume_length": len(text),
+            "prompt_length": len(prompt),
+            "analysis_type": "batched",
+            "batch_size": len(job_titles),
+            "page_count": document.get("page_count") if document else None,
+            "cache_hit": cache_hit,
+            "coalesced": coalesced,
+            "timestamp": time.time(),
+            "api": "groq"
         }
+    return results
 
 def test_groq_connection() -> bool:
     """Test Groq API connection."""
     try:
         print("🔧 Testing Groq connection...")
         
-        client = Groq(api_key=os.environ.get('GROQ_API_KEY'))
-        
-        chat_completion = client.chat.completions.create(
+        completion = chat_completion(
             messages=[{"role": "user", "content": "Reply with just: 'OK'"}],
             model=GROQ_MODELS[0],
             temperature=0.0,
             max_tokens=10
         )
         
-        response_text = chat_completion.choices[0].message.content
+        response_text = completion.choices[0].message.content
         success = response_text and "ok" in response_text.lower()
         print(f"✅ Connection: {'PASSED' if success else 'FAILED'}")
         return success
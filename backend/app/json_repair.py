@@ -0,0 +1,163 @@
+"""
+JSON repair for truncated or malformed LLM output
+When a reply is cut off by max_tokens (or has trailing commas), the text is
+re-read once with string awareness. Everything up to the last complete value
+is kept and the open arrays/objects are closed. If nothing complete exists
+yet, the unterminated string is closed instead. Only when both fail does the
+caller give up.
+"""
+import json
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _scan(text: str):
+    """
+    One pass over ``text`` from its first '{' or '['. Returns the cleaned
+    characters (trailing commas dropped), the cut points after each complete
+    value as (length, closers), the open frames, whether the text ends inside
+    a value string, and whether the top-level value closed.
+    """
+    out: List[str] = []
+    cuts: List[Tuple[int, str]] = []
+    # Frames: [opener, expecting] with expecting in key/colon/value/comma
+    stack: List[List[str]] = []
+    in_string = escape = False
+    string_is_key = False
+    pending_comma = False
+    scalar = False
+
+    def value_done():
+        if stack:
+            stack[-1][1] = "comma"
+            cuts.append((len(out), "".join(_CLOSERS[frame[0]] for frame in reversed(stack))))
+
+    start = min((i for i in (text.find("{"), text.find("[")) if i != -1), default=-1)
+    if start == -1:
+        return out, cuts, stack, False, False
+    for char in text[start:]:
+        if in_string:
+            out.append(char)
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+                if string_is_key:
+                    stack[-1][1] = "colon"
+                else:
+                    value_done()
+            continue
+
+        if char in " \t\r\n":
+            if scalar:
+                scalar = False
+                value_done()
+            if not pending_comma:
+                out.append(char)
+            continue
+
+        if scalar and char in ",}]":
+            scalar = False
+            value_done()
+
+        if pending_comma:
+            pending_comma = False
+            if char not in "}]":
+                out.append(",")
+
+        if char == ",":
+            # Held back until we know it isn't trailing
+            pending_comma = True
+            if stack:
+                stack[-1][1] = "key" if stack[-1][0] == "{" else "value"
+            continue
+        if char in "{[":
+            out.append(char)
+            stack.append([char, "key" if char == "{" else "value"])
+        elif char in "}]":
+            if not stack:
+                break
+            out.append(_CLOSERS[stack.pop()[0]])
+            if not stack:
+                return out, cuts, stack, False, True
+            value_done()
+        elif char == '"':
+            out.append(char)
+            in_string = True
+            string_is_key = bool(stack) and stack[-1][0] == "{" and stack[-1][1] == "key"
+        elif char == ":":
+            out.append(char)
+            if stack:
+                stack[-1][1] = "value"
+        else:
+            # Number / true / false / null
+            out.append(char)
+            scalar = True
+    return out, cuts, stack, in_string and not string_is_key, False
+
+
+def repair_json(text: str) -> Tuple[Optional[Any], Dict[str, Any]]:
+    """
+    Best-effort decode of a truncated or malformed JSON reply.
+    Returns (value or None, info) where info has the strategy used.
+    """
+    out, cuts, stack, in_value_string, complete = _scan(text)
+    if not out:
+        return None, {"repaired": False, "reason": "no JSON found"}
+
+    candidates = []
+    if complete:
+        # Balanced already; only trailing commas (or trailing prose) to drop
+        candidates.append(("cleaned", "".join(out)))
+    else:
+        if cuts:
+            length, closers = cuts[-1]
+            candidates.append(("truncated_to_last_complete_value", "".join(out[:length]) + closers))
+        if in_value_string and stack:
+            closers = "".join(_CLOSERS[frame[0]] for frame in reversed(stack))
+            candidates.append(("closed_open_string", "".join(out) + '"' + closers))
+
+    for strategy, candidate in candidates:
+        try:
+            return json.loads(candidate), {"repaired": True, "strategy": strategy}
+        except json.JSONDecodeError:
+            continue
+    return None, {"repaired": False, "reason": "unrecoverable"}
+
+
+class RepairStats:
+    """How often replies needed repair and how often repair saved them."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.parsed = 0
+        self.repaired = 0
+        self.unrecoverable = 0
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            failures = self.repaired + self.unrecoverable
+            total = self.parsed + failures
+            return {
+                "parsed_cleanly": self.parsed,
+                "repaired": self.repaired,
+                "unrecoverable": self.unrecoverable,
+                # Share of all replies that would have failed without repair
+                "repair_rate": round(self.repaired / total, 4) if total else 0.0,
+                "repair_success_rate": round(self.repaired / failures, 4) if failures else 0.0,
+            }
+
+
+repair_stats = RepairStats()
+
+
+def get_repair_stats() -> Dict[str, Any]:
+    return repair_stats.snapshot()
@@ -0,0 +1,696 @@
+"""
+LLM gateway
+Owns one keep-alive Groq client per process, shared by the resume analyzer,
+the builder assistant and Gmail sync, plus an AsyncGroq client for the ASGI
+serving mode. Connection pool size, timeouts, retry
+policy, the shared RPM/TPM budget, request hedging, continuation of
+truncated replies and the circuit breaker are configured here and nowhere
+else.
+"""
+import asyncio
+import contextvars
+import os
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+import httpx
+from groq import (
+    AsyncGroq, Groq, DefaultAsyncHttpxClient, DefaultHttpxClient,
+    APIConnectionError, APIStatusError, InternalServerError,
+)
+from app.rate_limiter import TokenBucketLimiter, RateLimitExceeded, default_limiter_path
+from app.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.deadline import DeadlineExceeded, current_deadline
+from app.tokens import count_message_tokens, count_tokens
+
+# Connection pool / timeout / retry policy
+GROQ_POOL_SIZE = int(os.environ.get("GROQ_POOL_SIZE", 20))
+GROQ_KEEPALIVE_SECONDS = float(os.environ.get("GROQ_KEEPALIVE_SECONDS", 60))
+GROQ_CONNECT_TIMEOUT = float(os.environ.get("GROQ_CONNECT_TIMEOUT", 5))
+GROQ_READ_TIMEOUT = float(os.environ.get("GROQ_READ_TIMEOUT", 90))
+GROQ_MAX_RETRIES = int(os.environ.get("GROQ_MAX_RETRIES", 2))
+# One connection per concurrent stream, so the async pool is much larger
+GROQ_ASYNC_POOL_SIZE = int(os.environ.get("GROQ_ASYNC_POOL_SIZE", 500))
+
+# Groq budget per model, shared by every worker and caller on the host.
+# Defaults are Groq's published free-tier limits (requests, tokens per
+# minute); GROQ_RPM / GROQ_TPM override them for every model, e.g. on a
+# paid tier.
+GROQ_MODEL_LIMITS = {
+    "llama-3.3-70b-versatile": (30, 12000),
+    "llama-3.1-8b-instant": (30, 6000),
+}
+GROQ_RPM = int(os.environ.get("GROQ_RPM", 30))
+GROQ_TPM = int(os.environ.get("GROQ_TPM", 6000))
+GROQ_ACQUIRE_TIMEOUT = float(os.environ.get("GROQ_ACQUIRE_TIMEOUT", 20))
+# Output reserved for a call type until its real completion sizes are known
+GROQ_EXPECTED_OUTPUT_TOKENS = int(os.environ.get("GROQ_EXPECTED_OUTPUT_TOKENS", 600))
+GROQ_OUTPUT_PERCENTILE = float(os.environ.get("GROQ_OUTPUT_PERCENTILE", 90))
+GROQ_OUTPUT_MIN_SAMPLES = 5
+
+groq_limiter = TokenBucketLimiter(
+    os.environ.get("GROQ_LIMITER_DB") or default_limiter_path("resumeai-groq-limiter.db"),
+    requests_per_minute=GROQ_RPM,
+    tokens_per_minute=GROQ_TPM,
+    limits={} if "GROQ_RPM" in os.environ or "GROQ_TPM" in os.environ else GROQ_MODEL_LIMITS,
+)
+
+# Hedging: if the primary model hasn't answered by this percentile of its
+# observed latency, the fallback model is fired in parallel
+GROQ_HEDGE_ENABLED = os.environ.get("GROQ_HEDGE_ENABLED", "true").lower() in ("1", "true", "yes")
+GROQ_HEDGE_PERCENTILE = float(os.environ.get("GROQ_HEDGE_PERCENTILE", 95))
+GROQ_HEDGE_MIN_SAMPLES = int(os.environ.get("GROQ_HEDGE_MIN_SAMPLES", 20))
+GROQ_HEDGE_DEFAULT_DELAY = float(os.environ.get("GROQ_HEDGE_DEFAULT_DELAY", 10))
+
+# Circuit breaker: trips on the failure rate or slow-call rate of recent calls
+groq_breaker = CircuitBreaker(
+    "groq",
+    window=int(os.environ.get("GROQ_BREAKER_WINDOW", 20)),
+    min_calls=int(os.environ.get("GROQ_BREAKER_MIN_CALLS", 5)),
+    failure_rate=float(os.environ.get("GROQ_BREAKER_FAILURE_RATE", 0.5)),
+    slow_call_seconds=float(os.environ.get("GROQ_BREAKER_SLOW_CALL_SECONDS", 30)),
+    slow_rate=float(os.environ.get("GROQ_BREAKER_SLOW_RATE", 0.8)),
+    open_seconds=float(os.environ.get("GROQ_BREAKER_OPEN_SECONDS", 30)),
+)
+
+# Continuation: a reply cut off by max_tokens is resumed from where it
+# stopped (the partial output is sent back as an assistant prefill) up to
+# this many times, instead of being thrown away
+GROQ_MAX_CONTINUATIONS = int(os.environ.get("GROQ_MAX_CONTINUATIONS", 2))
+# Longest repeated seam trimmed when a continuation restates its prefix
+CONTINUATION_OVERLAP_WINDOW = 200
+
+CompletionResult = namedtuple(
+    "CompletionResult", ["content", "model", "finish_reason", "latency", "hedged", "continuations"],
+    defaults=(0,),
+)
+
+_client: Groq = None
+_client_pid: int = None
+_client_lock = threading.Lock()
+_async_client: AsyncGroq = None
+_async_client_loop = None
+
+
+def _build_client() -> Groq:
+    http_client = DefaultHttpxClient(
+        limits=httpx.Limits(
+            max_connections=GROQ_POOL_SIZE,
+            max_keepalive_connections=GROQ_POOL_SIZE,
+            keepalive_expiry=GROQ_KEEPALIVE_SECONDS,
+        ),
+        timeout=httpx.Timeout(GROQ_READ_TIMEOUT, connect=GROQ_CONNECT_TIMEOUT),
+    )
+    return Groq(
+        api_key=os.environ.get("GROQ_API_KEY"),
+        http_client=http_client,
+        max_retries=GROQ_MAX_RETRIES,
+        timeout=httpx.Timeout(GROQ_READ_TIMEOUT, connect=GROQ_CONNECT_TIMEOUT),
+    )
+
+
+def get_client() -> Groq:
+    """
+    The process-wide Groq client. Built lazily and rebuilt after a fork,
+    so gunicorn workers never share a connection pool with their master.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = _build_client()
+                _client_pid = pid
+    return _client
+
+
+def get_async_client() -> AsyncGroq:
+    """
+    The AsyncGroq client for the running event loop (one per ASGI worker).
+    Its connection pool is bound to the loop, so a new loop gets a new client.
+    """
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=GROQ_ASYNC_POOL_SIZE,
+                max_keepalive_connections=GROQ_POOL_SIZE,
+                keepalive_expiry=GROQ_KEEPALIVE_SECONDS,
+            ),
+            timeout=httpx.Timeout(GROQ_READ_TIMEOUT, connect=GROQ_CONNECT_TIMEOUT),
+        )
+        _async_client = AsyncGroq(
+            api_key=os.environ.get("GROQ_API_KEY"),
+            http_client=http_client,
+            max_retries=GROQ_MAX_RETRIES,
+            timeout=httpx.Timeout(GROQ_READ_TIMEOUT, connect=GROQ_CONNECT_TIMEOUT),
+        )
+        _async_client_loop = loop
+    return _async_client
+
+
+class OutputTracker:
+    """
+    Recent completion sizes per model and max_tokens (a stand-in for the
+    call type), so a reservation covers the output a call usually produces
+    rather than its ceiling.
+    """
+
+    def __init__(self, window: int = 100):
+        self._window = window
+        self._samples: Dict[Tuple[str, Optional[int]], deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, max_tokens: Optional[int], tokens: int) -> None:
+        with self._lock:
+            self._samples.setdefault((model, max_tokens), deque(maxlen=self._window)).append(tokens)
+
+    def expected(self, model: str, max_tokens: Optional[int]) -> int:
+        ceiling = max_tokens or 1024
+        with self._lock:
+            samples = sorted(self._samples.get((model, max_tokens), ()))
+        if len(samples) < GROQ_OUTPUT_MIN_SAMPLES:
+            return min(ceiling, GROQ_EXPECTED_OUTPUT_TOKENS)
+        index = min(len(samples) - 1, int(round(GROQ_OUTPUT_PERCENTILE / 100.0 * (len(samples) - 1))))
+        return min(ceiling, samples[index])
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            counts = {key: len(samples) for key, samples in self._samples.items()}
+        return {f"{model}:{max_tokens}": {"samples": count, "expected": self.expected(model, max_tokens)}
+                for (model, max_tokens), count in counts.items()}
+
+
+output_tracker = OutputTracker()
+
+
+def estimate_request_tokens(messages: List[Dict[str, str]], max_tokens: Optional[int], model: str) -> int:
+    """
+    Token reservation: prompt estimate plus the output this kind of call
+    usually produces. The difference to real usage is settled afterwards.
+    """
+    prompt_tokens = count_message_tokens(messages)
+    return prompt_tokens + output_tracker.expected(model, max_tokens)
+
+
+def _settle_tokens(model: str, max_tokens: Optional[int], reserved: int, usage) -> None:
+    """Return or charge the difference between the reservation and reported usage."""
+    output_tracker.record(model, max_tokens, usage.completion_tokens)
+    groq_limiter.adjust_tokens(reserved - usage.total_tokens, key=model)
+
+
+def _is_provider_failure(error: BaseException) -> bool:
+    """Errors that say Groq is down or saturated (as opposed to a bad request)."""
+    if isinstance(error, APIConnectionError):
+        return True
+    return isinstance(error, APIStatusError) and (error.status_code == 429 or error.status_code >= 500)
+
+
+def _record_stream_outcome(error: Optional[BaseException], finished: bool, latency: float) -> None:
+    """Outcome of a stream; one closed early (a cancelled hedge, a client gone) says nothing about Groq."""
+    if error is None and not finished:
+        groq_breaker.release_probe()
+    else:
+        _record_outcome(error, latency)
+
+
+def _record_outcome(error: Optional[BaseException], latency: float = 0.0) -> None:
+    """Feed one finished call to the breaker."""
+    if error is None or not _is_provider_failure(error):
+        if isinstance(error, (DeadlineExceeded, RateLimitExceeded)):
+            # The caller ran out of time, or our own budget ran out before
+            # anything was sent; says nothing about Groq's health
+            groq_breaker.release_probe()
+        else:
+            groq_breaker.record_success(latency)
+    else:
+        groq_breaker.record_failure()
+
+
+def _reconcile_stream(stream, model: str, max_tokens: Optional[int], reserved: int, start: float) -> Iterator:
+    """
+    Yield stream chunks, then settle the token reservation from reported usage
+    and record the call's outcome, timed to the end of the stream.
+    """
+    usage = None
+    error = None
+    finished = False
+    try:
+        for chunk in stream:
+            x_groq = getattr(chunk, "x_groq", None)
+            if x_groq is not None and getattr(x_groq, "usage", None) is not None:
+                usage = x_groq.usage
+            yield chunk
+        finished = True
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        # Closing the response aborts generation when the consumer stops early
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+        _record_stream_outcome(error, finished, time.monotonic() - start)
+        if usage is not None:
+            _settle_tokens(model, max_tokens, reserved, usage)
+
+
+def _create_within_deadline(deadline, messages: List[Dict[str, str]], model: str, **kwargs: Any):
+    """
+    Issue the request with its timeout clipped to the remaining budget. Retries
+    are done here rather than by the client so they never outlive the deadline.
+    """
+    client = get_client().with_options(max_retries=0)
+    requested_timeout = kwargs.pop("timeout", GROQ_READ_TIMEOUT)
+    for attempt in range(GROQ_MAX_RETRIES + 1):
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            raise deadline.exceeded("llm")
+        try:
+            return client.chat.completions.create(
+                messages=messages, model=model,
+                timeout=min(requested_timeout, remaining), **kwargs
+            )
+        except (APIConnectionError, InternalServerError) as e:
+            if deadline.expired():
+                raise deadline.exceeded("llm") from e
+            backoff = 0.5 * (2 ** attempt)
+            if attempt == GROQ_MAX_RETRIES or deadline.remaining() <= backoff + 1:
+                raise
+            time.sleep(backoff)
+
+
+def chat_completion(messages: List[Dict[str, str]], model: str,
+                    acquire_timeout: Optional[float] = None, **kwargs: Any):
+    """
+    Create a chat completion (or stream, with ``stream=True``) on the shared client.
+
+    Draws one request plus the estimated tokens from the host-wide budget for
+    ``model`` first, waiting at most ``acquire_timeout`` seconds (default
+    GROQ_ACQUIRE_TIMEOUT); raises RateLimitExceeded when it can't get them.
+    Inside a request deadline scope both the wait and the request timeout are
+    bounded by the remaining budget, and running out raises DeadlineExceeded.
+    Raises CircuitOpenError without calling Groq while the breaker is open.
+    """
+    groq_breaker.check()
+    deadline = current_deadline()
+    timeout = GROQ_ACQUIRE_TIMEOUT if acquire_timeout is None else acquire_timeout
+    deadline_bound = deadline is not None and deadline.remaining() < timeout
+    if deadline_bound:
+        timeout = deadline.remaining()
+
+    max_tokens = kwargs.get("max_tokens")
+    reserved = min(estimate_request_tokens(messages, max_tokens, model), groq_limiter.limits_for(model)[1])
+    if not groq_limiter.try_acquire(reserved, deadline=time.time() + timeout, key=model):
+        if deadline_bound:
+            error = deadline.exceeded("rate_limit")
+        else:
+            error = RateLimitExceeded(
+                f"Groq rate limit budget for {model} exhausted, retry shortly"
+            )
+        _record_outcome(error)
+        raise error
+
+    start = time.monotonic()
+    try:
+        if deadline is not None:
+            response = _create_within_deadline(deadline, messages, model, **kwargs)
+        else:
+            response = get_client().chat.completions.create(messages=messages, model=model, **kwargs)
+    except Exception as e:
+        # Nothing was generated; hand the reserved tokens back
+        groq_limiter.adjust_tokens(reserved, key=model)
+        _record_outcome(e)
+        raise
+    if kwargs.get("stream"):
+        # Recorded once the stream ends, so a mid-stream failure or a slow
+        # generation counts as that and nothing else
+        return _reconcile_stream(response, model, max_tokens, reserved, start)
+    _record_outcome(None, time.monotonic() - start)
+
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        _settle_tokens(model, max_tokens, reserved, usage)
+    return response
+
+
+async def _reconcile_async_stream(stream, model: str, max_tokens: Optional[int], reserved: int,
+                                  start: float) -> AsyncIterator:
+    """Async counterpart of _reconcile_stream."""
+    usage = None
+    error = None
+    finished = False
+    try:
+        async for chunk in stream:
+            x_groq = getattr(chunk, "x_groq", None)
+            if x_groq is not None and getattr(x_groq, "usage", None) is not None:
+                usage = x_groq.usage
+            yield chunk
+        finished = True
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        # Also runs when the client disconnects and the ASGI server cancels us
+        await stream.close()
+        _record_stream_outcome(error, finished, time.monotonic() - start)
+        if usage is not None:
+            await asyncio.to_thread(_settle_tokens, model, max_tokens, reserved, usage)
+
+
+async def async_chat_completion(messages: List[Dict[str, str]], model: str,
+                                acquire_timeout: Optional[float] = None, **kwargs: Any):
+    """
+    chat_completion for the ASGI app: same budget, breaker and usage
+    reconciliation, but waiting for budget and for Groq never blocks the
+    event loop. With ``stream=True`` returns an async iterator of chunks.
+    """
+    groq_breaker.check()
+    timeout = GROQ_ACQUIRE_TIMEOUT if acquire_timeout is None else acquire_timeout
+    max_tokens = kwargs.get("max_tokens")
+    reserved = min(estimate_request_tokens(messages, max_tokens, model), groq_limiter.limits_for(model)[1])
+    if not await groq_limiter.try_acquire_async(reserved, deadline=time.time() + timeout, key=model):
+        error = RateLimitExceeded(f"Groq rate limit budget for {model} exhausted, retry shortly")
+        _record_outcome(error)
+        raise error
+
+    start = time.monotonic()
+    try:
+        response = await get_async_client().chat.completions.create(
+            messages=messages, model=model, **kwargs
+        )
+    except BaseException as e:
+        await asyncio.to_thread(groq_limiter.adjust_tokens, reserved, model)
+        if isinstance(e, Exception):
+            _record_outcome(e)
+        raise
+    if kwargs.get("stream"):
+        return _reconcile_async_stream(response, model, max_tokens, reserved, start)
+    _record_outcome(None, time.monotonic() - start)
+
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        await asyncio.to_thread(_settle_tokens, model, max_tokens, reserved, usage)
+    return response
+
+
+def reset_client() -> None:
+    """Drop the shared client (e.g. after rotating GROQ_API_KEY)."""
+    global _client, _client_pid
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _client_pid = None
+
+
+class LatencyTracker:
+    """Recent completion latencies per model, for picking the hedge delay."""
+
+    def __init__(self, window: int = 200):
+        self._window = window
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(model, deque(maxlen=self._window)).append(seconds)
+
+    def percentile(self, model: str, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(model, ()))
+        if len(samples) < GROQ_HEDGE_MIN_SAMPLES:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            models = {model: sorted(samples) for model, samples in self._samples.items()}
+        return {
+            model: {
+                "samples": len(samples),
+                **{f"p{p}": round(samples[min(len(samples) - 1, int(round(p / 100.0 * (len(samples) - 1))))], 3)
+                   for p in (50, 95, 99)},
+            }
+            for model, samples in models.items() if samples
+        }
+
+
+class HedgeStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedges_fired = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self.primary_wins = 0
+        self.fallback_wins = 0
+        self.failures = 0
+        self.extra_tokens = 0
+
+    def add(self, **counts: int) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedges_fired": self.hedges_fired,
+                "hedge_wins": self.hedge_wins,
+                "hedge_win_rate": round(self.hedge_wins / self.hedges_fired, 4) if self.hedges_fired else 0.0,
+                "failovers": self.failovers,
+                "primary_wins": self.primary_wins,
+                "fallback_wins": self.fallback_wins,
+                "failures": self.failures,
+                # Tokens spent by latency-triggered hedge requests (the hedging overhead)
+                "extra_tokens": self.extra_tokens,
+            }
+
+
+class ContinuationStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.truncated = 0
+        self.continuations = 0
+        self.completed = 0
+        self.still_truncated = 0
+        self.tail_tokens = 0
+
+    def add(self, **counts: int) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_continuations": GROQ_MAX_CONTINUATIONS,
+                # Replies that hit max_tokens on their first pass
+                "truncated": self.truncated,
+                "continuations": self.continuations,
+                "completed": self.completed,
+                "still_truncated": self.still_truncated,
+                # Output tokens generated by continuations (vs. regenerating everything)
+                "tail_tokens": self.tail_tokens,
+            }
+
+
+latency_tracker = LatencyTracker()
+hedge_stats = HedgeStats()
+continuation_stats = ContinuationStats()
+
+
+def _stitch(partial: str, tail: str) -> str:
+    """Join a continuation onto its prefix, dropping a restated seam if the model repeated one."""
+    window = min(len(partial), len(tail), CONTINUATION_OVERLAP_WINDOW)
+    for size in range(window, 7, -1):
+        if tail.startswith(partial[-size:]):
+            return partial + tail[size:]
+    return partial + tail
+
+
+def _stream_text(messages: List[Dict[str, str]], model: str, cancel: threading.Event,
+                 kwargs: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+    """Stream one completion to the end (or until ``cancel``); returns (content, finish_reason)."""
+    parts: List[str] = []
+    finish_reason = None
+    stream = chat_completion(messages, model, stream=True, **kwargs)
+    try:
+        for chunk in stream:
+            if cancel.is_set():
+                break
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            if choice.delta.content:
+                parts.append(choice.delta.content)
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+    finally:
+        stream.close()
+    return "".join(parts), finish_reason
+
+
+def _stream_attempt(messages: List[Dict[str, str]], model: str, cancel: threading.Event,
+                    results: "queue.Queue", kwargs: Dict[str, Any], is_hedge: bool) -> None:
+    """
+    Run one streamed attempt, pushing (model, CompletionResult | None, error)
+    onto ``results``. Setting ``cancel`` closes the stream, which aborts
+    generation on Groq's side. A reply that stops on max_tokens is resumed up
+    to GROQ_MAX_CONTINUATIONS times and stitched together. Hedge attempts
+    record the tokens they spent.
+    """
+    start = time.monotonic()
+    prompt_tokens = count_message_tokens(messages)
+    content = ""
+    continuations = 0
+    try:
+        content, finish_reason = _stream_text(messages, model, cancel, kwargs)
+        if finish_reason == "length" and GROQ_MAX_CONTINUATIONS > 0:
+            continuation_stats.add(truncated=1)
+        while (finish_reason == "length" and continuations < GROQ_MAX_CONTINUATIONS
+               and content and not cancel.is_set()):
+            continuations += 1
+            # Only the missing tail is generated; the partial output comes back as prefill
+            tail, finish_reason = _stream_text(
+                messages + [{"role": "assistant", "content": content}], model, cancel, kwargs
+            )
+            continuation_stats.add(continuations=1, tail_tokens=count_tokens(tail))
+            content = _stitch(content, tail)
+        if continuations and not cancel.is_set():
+            continuation_stats.add(**({"still_truncated": 1} if finish_reason == "length" else {"completed": 1}))
+    except Exception as e:
+        if is_hedge:
+            hedge_stats.add(extra_tokens=prompt_tokens * (continuations + 1) + count_tokens(content))
+        results.put((model, None, e))
+        return
+
+    if is_hedge:
+        hedge_stats.add(extra_tokens=prompt_tokens * (continuations + 1) + count_tokens(content))
+    latency = time.monotonic() - start
+    # Cancelled attempts still count (as a lower bound) so the tail doesn't
+    # shrink just because slow requests get cut off
+    latency_tracker.record(model, latency)
+    if cancel.is_set():
+        results.put((model, None, None))
+        return
+    results.put((model, CompletionResult(content, model, finish_reason, latency, False, continuations), None))
+
+
+def hedged_completion(messages: List[Dict[str, str]], primary: str, fallback: Optional[str] = None,
+                      validate: Callable[[str], bool] = None, **kwargs: Any) -> CompletionResult:
+    """
+    Non-streaming completion with tail-latency hedging.
+
+    The primary model starts immediately. If it hasn't produced a valid
+    answer after the GROQ_HEDGE_PERCENTILE of its observed latency (or
+    GROQ_HEDGE_DEFAULT_DELAY until enough samples exist), or it fails, the
+    fallback model is fired too. The first result accepted by ``validate``
+    wins and the other request is cancelled.
+    """
+    hedge_stats.add(requests=1)
+    if fallback == primary:
+        fallback = None
+    if not GROQ_HEDGE_ENABLED or not fallback:
+        fallback_delay = None
+    else:
+        fallback_delay = latency_tracker.percentile(primary, GROQ_HEDGE_PERCENTILE) or GROQ_HEDGE_DEFAULT_DELAY
+
+    results: "queue.Queue" = queue.Queue()
+    cancels: Dict[str, threading.Event] = {}
+
+    def start(model: str, is_hedge: bool = False) -> None:
+        cancels[model] = threading.Event()
+        # Copy the context so the attempt runs under the caller's request deadline
+        context = contextvars.copy_context()
+        threading.Thread(
+            target=context.run,
+            args=(_stream_attempt, messages, model, cancels[model], results, kwargs, is_hedge),
+            name=f"llm-{model}", daemon=True,
+        ).start()
+
+    start(primary)
+    pending = 1
+    hedged = False
+    trigger = None
+    last_error: Optional[BaseException] = None
+    hedge_at = time.monotonic() + fallback_delay if fallback_delay is not None else None
+
+    while pending:
+        wait = None if hedge_at is None or hedged else max(0.0, hedge_at - time.monotonic())
+        deadline = current_deadline()
+        if deadline is not None:
+            wait = deadline.remaining() if wait is None else min(wait, deadline.remaining())
+        try:
+            model, result, error = results.get(timeout=wait)
+        except queue.Empty:
+            if deadline is not None and deadline.expired():
+                for cancel in cancels.values():
+                    cancel.set()
+                raise deadline.exceeded("llm")
+            if hedge_at is None or hedged or time.monotonic() < hedge_at:
+                # Woke for the deadline just before it expired
+                continue
+            if groq_breaker.state != CircuitBreaker.CLOSED:
+                # The primary is the half-open probe; a hedge would be refused
+                # and take the probe down with it
+                hedge_at = None
+                continue
+            # Primary is slow: hedge with the fallback model
+            hedged, trigger = True, "latency"
+            hedge_stats.add(hedges_fired=1)
+            start(fallback, is_hedge=True)
+            pending += 1
+            continue
+
+        pending -= 1
+        if isinstance(error, CircuitOpenError) and model != primary and pending:
+            # The breaker opened under the hedge; the primary may still answer
+            continue
+        if isinstance(error, (DeadlineExceeded, CircuitOpenError)):
+            for cancel in cancels.values():
+                cancel.set()
+            raise error
+        if result is not None and (validate is None or validate(result.content)):
+            for other, cancel in cancels.items():
+                if other != model:
+                    cancel.set()
+            if model == primary:
+                hedge_stats.add(primary_wins=1)
+            else:
+                hedge_stats.add(fallback_wins=1, hedge_wins=1 if trigger == "latency" else 0)
+            return result._replace(hedged=hedged)
+
+        last_error = error or last_error or ValueError(f"Invalid response from {model}")
+        if model == primary and fallback and fallback not in cancels:
+            # Primary failed outright: fall back immediately
+            print(f"Primary model failed, trying fallback: {last_error}")
+            hedged, trigger = True, "failure"
+            hedge_stats.add(failovers=1)
+            start(fallback)
+            pending += 1
+
+    hedge_stats.add(failures=1)
+    raise last_error
+
+
+def get_limiter_stats() -> Dict[str, Any]:
+    return {**groq_limiter.stats(), "expected_output": output_tracker.snapshot()}
+
+
+def get_breaker_stats() -> Dict[str, Any]:
+    return groq_breaker.stats()
+
+
+def get_hedge_stats() -> Dict[str, Any]:
+    return {**hedge_stats.snapshot(), "latency": latency_tracker.snapshot()}
+
+
+def get_continuation_stats() -> Dict[str, Any]:
+    return continuation_stats.snapshot()
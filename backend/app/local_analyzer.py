@@ -0,0 +1,262 @@
+"""
+Local rule-based resume analyzer
+Deterministic degraded-mode fallback used while the Groq circuit breaker is
+open: skill dictionary matching, project detection from the resume's project
+section and metric regexes. Produces the same payload shape as the Groq
+analysis, flagged with ``degraded: True``.
+"""
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Canonical skill name -> extra spellings matched case-insensitively
+SKILL_DICTIONARY: Dict[str, List[str]] = {
+    "Python": [], "Java": [], "JavaScript": ["js", "es6"], "TypeScript": ["ts"],
+    "C": [], "C++": ["cpp"], "C#": ["csharp"], "Go": ["golang"], "Rust": [],
+    "Ruby": [], "PHP": [], "Swift": [], "Kotlin": [], "Scala": [], "R": [],
+    "SQL": [], "Bash": ["shell scripting"], "MATLAB": [], "Dart": [],
+    "HTML": ["html5"], "CSS": ["css3"], "React": ["react.js", "reactjs"],
+    "Next.js": ["nextjs"], "Vue": ["vue.js", "vuejs"], "Angular": ["angularjs"],
+    "Svelte": [], "Redux": [], "Tailwind CSS": ["tailwind", "tailwindcss"],
+    "Bootstrap": [], "jQuery": [], "Node.js": ["node", "nodejs"],
+    "Express": ["express.js", "expressjs"], "Django": [], "Flask": [],
+    "FastAPI": [], "Spring Boot": ["spring"], "Ruby on Rails": ["rails"],
+    "ASP.NET": [".net", "dotnet"], "GraphQL": [], "REST APIs": ["rest", "restful", "rest api"],
+    "gRPC": [], "WebSockets": ["websocket", "socket.io"], "Flutter": [],
+    "React Native": [], "Android": [], "iOS": [],
+    "PostgreSQL": ["postgres"], "MySQL": [], "SQLite": [], "MongoDB": ["mongo"],
+    "Redis": [], "Cassandra": [], "DynamoDB": [], "Firebase": ["firestore"],
+    "Elasticsearch": [], "Supabase": [],
+    "AWS": ["amazon web services", "ec2", "s3", "lambda"], "GCP": ["google cloud"],
+    "Azure": [], "Docker": [], "Kubernetes": ["k8s"], "Terraform": [],
+    "Ansible": [], "Jenkins": [], "GitHub Actions": [], "CI/CD": [],
+    "Git": ["github", "gitlab"], "Linux": ["unix"], "Nginx": [],
+    "Kafka": [], "RabbitMQ": [], "Spark": ["pyspark"], "Hadoop": [], "Airflow": [],
+    "Machine Learning": ["ml"], "Deep Learning": [], "TensorFlow": [],
+    "PyTorch": [], "Keras": [], "scikit-learn": ["sklearn"], "Pandas": [],
+    "NumPy": [], "OpenCV": [], "NLP": ["natural language processing"],
+    "LLMs": ["llm", "large language models"], "LangChain": [],
+    "Computer Vision": [], "Tableau": [], "Power BI": [], "Excel": [],
+    "Jest": [], "Pytest": [], "Selenium": [], "Cypress": [], "JUnit": [],
+    "Figma": [], "Agile": ["scrum"], "Microservices": [],
+}
+
+# Skills commonly expected per role, used when no job description is given
+ROLE_SKILLS: Dict[str, List[str]] = {
+    "frontend": ["JavaScript", "TypeScript", "React", "HTML", "CSS", "Git", "REST APIs"],
+    "backend": ["Python", "Java", "SQL", "REST APIs", "Docker", "PostgreSQL", "Git"],
+    "full stack": ["JavaScript", "React", "Node.js", "SQL", "REST APIs", "Docker", "Git"],
+    "data": ["Python", "SQL", "Pandas", "NumPy", "Machine Learning", "Tableau"],
+    "machine learning": ["Python", "Machine Learning", "PyTorch", "TensorFlow", "scikit-learn", "NumPy"],
+    "devops": ["Linux", "Docker", "Kubernetes", "AWS", "Terraform", "CI/CD", "Bash"],
+    "mobile": ["Swift", "Kotlin", "React Native", "Flutter", "Android", "iOS"],
+    "software": ["Python", "Java", "JavaScript", "SQL", "Git", "REST APIs"],
+}
+
+PROJECT_HEADINGS = ("projects", "personal projects", "academic projects", "technical projects",
+                    "selected projects", "side projects")
+SECTION_HEADINGS = PROJECT_HEADINGS + (
+    "experience", "work experience", "professional experience", "education", "skills",
+    "technical skills", "certifications", "awards", "publications", "leadership",
+    "activities", "volunteer", "summary", "objective", "interests", "languages",
+)
+
+# Numbers that read as impact: percentages, multipliers, money, scaled counts
+METRIC_PATTERN = re.compile(
+    r"(\d[\d,.]*\s?%|\d[\d,.]*\s?x\b|\$\s?\d[\d,.]*\s?[kmb]?\b|\d[\d,.]*\s?[km]\+?\s|"
+    r"\b\d[\d,.]*\+?\s(?:users|requests|customers|downloads|transactions|records|"
+    r"ms|seconds|hours|queries|students|clients|images|documents|rows)\b)",
+    re.IGNORECASE,
+)
+BULLET_PATTERN = re.compile(r"^\s*[•●▪■◦\-*–]\s*")
+
+
+def _compile_skill_patterns() -> List[Tuple[str, re.Pattern]]:
+    patterns = []
+    for skill, aliases in SKILL_DICTIONARY.items():
+        names = sorted({skill.lower(), *aliases}, key=len, reverse=True)
+        alternation = "|".join(re.escape(name) for name in names)
+        # Custom boundaries so "C++", "C#" and ".NET" match but "C" doesn't match inside words
+        patterns.append((skill, re.compile(rf"(?<![\w+#.])(?:{alternation})(?![\w+#]|\.\w)", re.IGNORECASE)))
+    return patterns
+
+
+SKILL_PATTERNS = _compile_skill_patterns()
+
+
+def find_skills(text: str) -> List[str]:
+    """Dictionary skills mentioned in ``text``, in dictionary order."""
+    found = []
+    for skill, pattern in SKILL_PATTERNS:
+        # Single-letter languages are only trusted in comma/pipe separated lists
+        if len(skill) == 1:
+            if re.search(rf"(?:^|[,|/(])\s*{re.escape(skill)}\s*(?:$|[,|/)])", text, re.MULTILINE):
+                found.append(skill)
+        elif pattern.search(text):
+            found.append(skill)
+    return found
+
+
+def _heading(line: str) -> Optional[str]:
+    cleaned = re.sub(r"[^a-z ]", "", line.lower()).strip()
+    return cleaned if cleaned in SECTION_HEADINGS else None
+
+
+def detect_projects(text: str) -> Dict[str, List[str]]:
+    """
+    Project title -> its description lines, from the projects section. A
+    title is a non-bullet line; bullets and wrapped lines belong to it.
+    """
+    projects: Dict[str, List[str]] = {}
+    in_projects = False
+    current = None
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        heading = _heading(line)
+        if heading:
+            in_projects = heading in PROJECT_HEADINGS
+            current = None
+            continue
+        if not in_projects:
+            continue
+        if BULLET_PATTERN.match(line) and current:
+            projects[current].append(BULLET_PATTERN.sub("", line))
+        elif current and (line[0].islower() or len(line) > 90):
+            projects[current].append(line)
+        else:
+            # "Title | React, Node.js | 2024" -> "Title"
+            title = re.split(r"\s[|–—]\s|\s-\s|:\s", line)[0].strip(" :-|")
+            if not title or len(title) > 80:
+                continue
+            current = title
+            projects.setdefault(current, [line])
+    return projects
+
+
+def find_metrics(lines: List[str]) -> List[str]:
+    return [line for line in lines if METRIC_PATTERN.search(line)]
+
+
+def required_skills_for(job_title: str, job_description: str = None) -> List[str]:
+    if job_description:
+        skills = find_skills(job_description)
+        if skills:
+            return skills
+    title = (job_title or "").lower()
+    for role, skills in ROLE_SKILLS.items():
+        if role in title:
+            return list(skills)
+    return list(ROLE_SKILLS["software"])
+
+
+def _relevance_label(score: float) -> str:
+    if score >= 80:
+        return "Highly Relevant"
+    if score >= 40:
+        return "Somewhat Relevant"
+    return "Not Relevant"
+
+
+def _fit_label(score: float) -> str:
+    if score >= 80:
+        return "Strong Fit"
+    if score >= 50:
+        return "Moderate Fit"
+    return "Weak Fit"
+
+
+def analyze_resume_locally(text: str, job_title: str = None, job_description: str = None,
+                           reason: str = "llm_unavailable") -> Dict[str, Any]:
+    """Rule-based analysis in the Groq payload shape, flagged as degraded."""
+    skills = find_skills(text)
+    projects = detect_projects(text)
+    projects_with_skills = {name: find_skills("\n".join(lines)) for name, lines in projects.items()}
+    quantifiable_impacts = {
+        name: metrics for name, lines in projects.items() if (metrics := find_metrics(lines[1:] or lines))
+    }
+
+    result: Dict[str, Any] = {
+        "skills": skills,
+        "projects": list(projects),
+        "projects_with_skills": projects_with_skills,
+        "quantifiable_impacts": quantifiable_impacts,
+        "relevant_projects": list(projects),
+    }
+
+    if job_title:
+        required = required_skills_for(job_title, job_description)
+        required_lower = {skill.lower() for skill in required}
+        matched = [skill for skill in skills if skill.lower() in required_lower]
+        matched_lower = {skill.lower() for skill in matched}
+        missing = [skill for skill in required if skill.lower() not in matched_lower]
+        skill_match_score = round(len(matched) / len(required) * 100, 2) if required else 0
+
+        project_relevance = {}
+        for name, project_skills in projects_with_skills.items():
+            project_matched = [s for s in project_skills if s.lower() in required_lower]
+            score = min(100, len(project_matched) * 30)
+            project_relevance[name] = {
+                "skills": project_skills,
+                "matched_skills": project_matched,
+                "matched_skills_count": len(project_matched),
+                "relevance_score": score,
+                "relevance_label": _relevance_label(score),
+            }
+        result["relevant_projects"] = [
+            name for name, info in project_relevance.items() if info["matched_skills_count"] > 0
+        ]
+        avg_relevance = (
+            round(sum(info["relevance_score"] for info in project_relevance.values()) / len(project_relevance), 2)
+            if project_relevance else 0
+        )
+        overall = round(0.6 * skill_match_score + 0.4 * avg_relevance, 2)
+        result.update({
+            "job_match": {
+                "job_title": job_title,
+                "required_skills": required,
+                "matched_skills": matched,
+                "missing_skills": missing,
+                "extra_skills": [skill for skill in skills if skill.lower() not in required_lower],
+                "skill_match_score": skill_match_score,
+                "avg_project_relevance": avg_relevance,
+                "overall_relevance_score": overall,
+                "overall_fit": _fit_label(overall),
+                "project_relevance": project_relevance,
+            },
+            "target_job": job_title,
+            "score": overall,
+            "matched_skills": {skill: 1.0 for skill in matched},
+            "missing_skills": {skill: 1.0 for skill in missing},
+            "recommendations": (
+                [f"Learn missing skills: {', '.join(missing[:5])}"] if missing else []
+            ) + ["Detailed AI recommendations are temporarily unavailable; try again shortly."],
+        })
+
+    # Same scoring formula parse_groq_response applies to LLM output
+    total_projects = len(projects)
+    relevant = len(result["relevant_projects"])
+    achieved = 0
+    if total_projects:
+        project_score = relevant / total_projects * 40
+        metrics_score = min(len(quantifiable_impacts) / total_projects * 30, 30)
+        skills_score = min(len(skills) / 20 * 30, 30)
+        achieved = round(project_score + metrics_score + skills_score, 2)
+    result["analysis"] = {
+        "total_skills_found": len(skills),
+        "total_projects": total_projects,
+        "relevant_projects": relevant,
+        "skills_with_metrics": len(quantifiable_impacts),
+        "achieved_score": achieved,
+        "max_possible_score": 100,
+    }
+    result["degraded"] = True
+    result["processing_info"] = {
+        "resume_length": len(text),
+        "analysis_type": "local",
+        "degraded_reason": reason,
+        "timestamp": time.time(),
+        "api": "local",
+    }
+    return result
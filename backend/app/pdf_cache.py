@@ -0,0 +1,94 @@
+"""
+Content-addressed cache for exported PDFs
+The key is the SHA-256 of the exact page the renderer would print (the
+normalized html, css and layout settings as embedded in the export
+template) plus the page.pdf options, so any change to the document or the
+template produces a new key. The same key is the response's ETag: a client
+that sends it back in If-None-Match already has those bytes and gets a 304
+without a render. Concurrent requests for the same document share one
+render.
+"""
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+from app.cache import TieredCache
+from app.singleflight import SingleFlight
+
+# Rendered PDFs: memory LRU per worker (a resume is ~50-200 KB), plus an
+# optional directory shared by every gunicorn worker on the host
+pdf_cache = TieredCache(
+    "pdf",
+    max_entries=int(os.environ.get("PDF_CACHE_SIZE", 64)),
+    ttl=float(os.environ.get("PDF_CACHE_TTL", 24 * 3600)) or None,
+    disk_dir=os.environ.get("PDF_CACHE_DIR") or None,
+    disk_max_entries=int(os.environ.get("PDF_CACHE_DISK_SIZE", 1024)),
+    dumps=lambda value: value,
+    loads=lambda raw: raw,
+)
+pdf_flights = SingleFlight()
+
+
+def normalize_text(text: str) -> str:
+    """Line endings and trailing whitespace don't change the rendered page."""
+    lines = (text or "").replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def pdf_key(page_html: str, pdf_options: Dict[str, Any]) -> str:
+    """Content address of a render: the page as printed plus the page.pdf options."""
+    options = json.dumps(pdf_options, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{options}\n{page_html}".encode("utf-8")).hexdigest()
+
+
+class PdfCacheStats:
+    """Counts how /generate-pdf requests were answered."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.not_modified = 0
+        self.hits = 0
+        self.renders = 0
+        self.coalesced = 0
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self.not_modified + self.hits + self.renders + self.coalesced
+            return {
+                "not_modified": self.not_modified,
+                "hits": self.hits,
+                "renders": self.renders,
+                "coalesced": self.coalesced,
+                "render_avoided_rate": round(1 - self.renders / requests, 3) if requests else 0.0,
+                "in_flight": pdf_flights.in_flight(),
+            }
+
+
+pdf_cache_stats = PdfCacheStats()
+
+
+def cached_pdf(key: str, render: Callable[[], bytes]) -> Tuple[bytes, str]:
+    """PDF bytes for ``key`` and where they came from: 'hit', 'coalesced' or 'render'."""
+    pdf_bytes = pdf_cache.get(key)
+    if pdf_bytes is not None:
+        pdf_cache_stats.record("hits")
+        return pdf_bytes, "hit"
+
+    def render_and_store() -> bytes:
+        result = render()
+        pdf_cache.set(key, result)
+        return result
+
+    pdf_bytes, shared = pdf_flights.do(key, render_and_store)
+    pdf_cache_stats.record("coalesced" if shared else "renders")
+    return pdf_bytes, "coalesced" if shared else "render"
+
+
+def get_pdf_cache_stats() -> Dict[str, Any]:
+    return pdf_cache_stats.snapshot()
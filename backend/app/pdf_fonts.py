@@ -0,0 +1,224 @@
+"""
+Resume fonts for PDF export, bundled with the backend
+The font files live in PDF_FONT_DIR (app/fonts by default) with a
+manifest.json describing each face. They are read into memory once and
+served to the renderer's pages through request interception on a private
+origin, and requests to the CDN they came from are dropped, so a render
+never touches the network for fonts. Without a bundle (local runs, or a
+build that couldn't fetch them) pages @import the CDN stylesheet instead.
+Populate the directory at build time with:
+
+    python -m app.pdf_fonts [--strict]
+
+A failed download leaves the CDN fallback in place and doesn't fail the
+build unless --strict is given.
+"""
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from typing import Dict, List, Optional, Set
+from urllib.parse import urljoin
+
+logger = logging.getLogger(__name__)
+
+PDF_FONT_DIR = os.environ.get("PDF_FONT_DIR") or os.path.join(os.path.dirname(__file__), "fonts")
+# Never resolvable, so a font request can only be answered by the route handler
+FONT_ORIGIN = "https://resume-fonts.invalid"
+# Upstream of the stylesheet the PDF template used to @import
+FONT_SOURCES = ["https://cdn.jsdelivr.net/gh/vsalvino/computer-modern@main/fonts/serif.css"]
+# Font stylesheets and files under these prefixes are replaced by the bundle
+FONT_SOURCE_PREFIXES = tuple(urljoin(source, "./") for source in FONT_SOURCES)
+# Names the frontend uses for the same typeface
+FAMILY_ALIASES = {"Computer Modern Serif": ["CMU Serif"]}
+MANIFEST = "manifest.json"
+
+_FONT_TYPES = {".woff2": "font/woff2", ".woff": "font/woff", ".ttf": "font/ttf", ".otf": "font/otf"}
+
+_lock = threading.Lock()
+_faces: Optional[List[Dict[str, str]]] = None
+_files: Dict[str, bytes] = {}
+_css: str = ""
+_story_css: str = ""
+_story_families: Set[str] = set()
+
+
+def _font_face_rules(faces: List[Dict[str, str]], prefix: str, file_key: str = "file",
+                     format_key: str = "format") -> str:
+    rules = []
+    for face in faces:
+        if not face.get(file_key):
+            continue
+        for family in [face["family"]] + FAMILY_ALIASES.get(face["family"], []):
+            rules.append(
+                "@font-face {"
+                f" font-family: '{family}';"
+                f" src: url('{prefix}{face[file_key]}') format('{face[format_key]}');"
+                f" font-weight: {face['weight']}; font-style: {face['style']};"
+                " font-display: block; }"
+            )
+    return "\n".join(rules)
+
+
+def _load() -> None:
+    global _faces, _css, _story_css, _story_families
+    with _lock:
+        if _faces is not None:
+            return
+        faces: List[Dict[str, str]] = []
+        try:
+            with open(os.path.join(PDF_FONT_DIR, MANIFEST)) as f:
+                manifest = json.load(f)
+            for face in manifest:
+                with open(os.path.join(PDF_FONT_DIR, face["file"]), "rb") as f:
+                    _files[face["file"]] = f.read()
+                faces.append(face)
+                if face.get("story_file") and not os.path.exists(os.path.join(PDF_FONT_DIR, face["story_file"])):
+                    face.pop("story_file")
+        except FileNotFoundError:
+            logger.warning(f"No bundled PDF fonts in {PDF_FONT_DIR}; run `python -m app.pdf_fonts` at build time. "
+                           "Exports will load them from the CDN.")
+        except Exception as e:
+            logger.warning(f"Bundled PDF fonts unreadable ({e}); exports will load them from the CDN")
+            faces = []
+        if faces:
+            _css = _font_face_rules(faces, FONT_ORIGIN + "/")
+        else:
+            _css = "\n".join(f"@import url('{source}');" for source in FONT_SOURCES)
+        _story_css = _font_face_rules(faces, "", "story_file", "story_format")
+        _story_families = {family.lower() for face in faces if face.get("story_file")
+                           for family in [face["family"]] + FAMILY_ALIASES.get(face["family"], [])}
+        _faces = faces
+
+
+def font_face_css() -> str:
+    """
+    @font-face rules for every bundled face, or @imports of FONT_SOURCES when
+    none are installed. Either way it has to open the stylesheet.
+    """
+    _load()
+    return _css
+
+
+def story_font_css() -> str:
+    """The same faces for PyMuPDF's Story engine, with URLs relative to font_archive()."""
+    _load()
+    return _story_css
+
+
+def story_fonts_complete() -> bool:
+    """
+    Whether Story can load every bundled face: MuPDF reads TrueType/OpenType,
+    not web fonts. False with no bundle, where Story would substitute its own.
+    """
+    _load()
+    return bool(_faces) and all(face.get("story_file") for face in _faces)
+
+
+def story_font_families() -> Set[str]:
+    """Lower-cased family names (aliases included) that Story has a bundled face for."""
+    _load()
+    return _story_families
+
+
+def font_archive():
+    """fitz.Archive over the bundled font files, or None when none are installed."""
+    _load()
+    if not _faces:
+        return None
+    import fitz  # PyMuPDF
+    return fitz.Archive(PDF_FONT_DIR)
+
+
+def is_font_request(url: str) -> bool:
+    """Whether the renderer should intercept ``url``: a bundled file, or its upstream copy when bundled."""
+    if url.startswith(FONT_ORIGIN + "/"):
+        return True
+    _load()
+    return bool(_faces) and url.startswith(FONT_SOURCE_PREFIXES)
+
+
+def font_response(url: str) -> Optional[Dict[str, object]]:
+    """route.fulfill() arguments for a request to FONT_ORIGIN, or None if it isn't a bundled file."""
+    if not url.startswith(FONT_ORIGIN + "/"):
+        return None
+    _load()
+    name = url[len(FONT_ORIGIN) + 1:].split("?", 1)[0]
+    body = _files.get(name)
+    if body is None:
+        return None
+    content_type = _FONT_TYPES.get(os.path.splitext(name)[1], "application/octet-stream")
+    return {"status": 200, "body": body, "content_type": content_type,
+            "headers": {"Access-Control-Allow-Origin": "*", "Cache-Control": "max-age=31536000"}}
+
+
+def _parse_font_faces(css: str, base_url: str) -> List[Dict[str, str]]:
+    """family/weight/style, the best web-font URL and any TrueType/OpenType URL of each @font-face block."""
+    faces = []
+    for block in re.findall(r"@font-face\s*{(.*?)}", css, re.S):
+        family = re.search(r"font-family:\s*['\"]?([^;'\"]+)", block)
+        weight = re.search(r"font-weight:\s*([^;]+)", block)
+        style = re.search(r"font-style:\s*([^;]+)", block)
+        urls = re.findall(r"url\(['\"]?([^'\")]+)['\"]?\)", block)
+        found = {}
+        for ext, fmt in ((".woff2", "woff2"), (".woff", "woff"), (".ttf", "truetype"), (".otf", "opentype")):
+            url = next((u for u in urls if u.split("?")[0].split("#")[0].endswith(ext)), None)
+            if url:
+                found.setdefault("web", (urljoin(base_url, url.split("#")[0]), fmt))
+                if fmt in ("truetype", "opentype"):
+                    found.setdefault("story", (urljoin(base_url, url.split("#")[0]), fmt))
+        if family and found:
+            face = {
+                "family": family.group(1).strip(),
+                "weight": (weight.group(1).strip() if weight else "normal"),
+                "style": (style.group(1).strip() if style else "normal"),
+                "url": found["web"][0],
+                "format": found["web"][1],
+            }
+            if "story" in found:
+                face["story_url"], face["story_format"] = found["story"]
+            faces.append(face)
+    return faces
+
+
+def download_fonts(directory: str = PDF_FONT_DIR) -> List[Dict[str, str]]:
+    """Fetch every face referenced by FONT_SOURCES into ``directory`` and write the manifest."""
+    from urllib.request import urlopen
+
+    os.makedirs(directory, exist_ok=True)
+    manifest = []
+    for source in FONT_SOURCES:
+        with urlopen(source, timeout=30) as response:
+            css = response.read().decode("utf-8")
+        for face in _parse_font_faces(css, source):
+            for url_key, file_key in (("url", "file"), ("story_url", "story_file")):
+                url = face.pop(url_key, None)
+                if url is None:
+                    continue
+                file_name = os.path.basename(url.split("?")[0])
+                if file_name not in face.values():
+                    with urlopen(url, timeout=30) as response, open(os.path.join(directory, file_name), "wb") as f:
+                        f.write(response.read())
+                face[file_key] = file_name
+            manifest.append(face)
+            print(f"Bundled {face['family']} {face['weight']} {face['style']} -> {file_name}")
+    with open(os.path.join(directory, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+if __name__ == "__main__":
+    strict = "--strict" in sys.argv[1:]
+    args = [arg for arg in sys.argv[1:] if arg != "--strict"]
+    target = args[0] if args else PDF_FONT_DIR
+    try:
+        faces = download_fonts(target)
+        error = None if faces else "No font faces found in FONT_SOURCES"
+    except Exception as e:
+        error = f"Font download failed: {e}"
+    if error:
+        if strict:
+            sys.exit(error)
+        print(f"{error}; PDF exports will load fonts from the CDN", file=sys.stderr)
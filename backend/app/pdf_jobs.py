@@ -0,0 +1,395 @@
+"""
+Asynchronous PDF export jobs
+POST /generate-pdf/jobs answers at once with a job id instead of holding a
+request thread for the whole render. Each worker process runs jobs on its
+own small thread pool behind a bounded queue; when the queue is full the
+POST is refused with a Retry-After estimated from recent render times.
+
+Job state lives in a SQLite file and finished PDFs in a directory, both
+shared by every gunicorn worker on the host, so the status poll, the event
+stream and the download can land on any worker, not just the one that
+rendered. Renders go through the same content-addressed cache as
+/generate-pdf: a job for a document exported recently completes without a
+render, and a job for a document already queued or rendering gets that
+job's id back.
+
+Finished jobs and their PDFs are removed PDF_JOB_TTL seconds after they
+complete. Every worker process holds a lease in the same file, renewed by
+a heartbeat thread; a queued or running job whose worker process exited,
+or whose worker stopped renewing its lease (a reused pid, another host on
+the same volume), is reported as failed.
+"""
+import asyncio
+import logging
+import math
+import os
+import queue
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Tuple
+
+from app.pdf_cache import cached_pdf, pdf_cache
+
+logger = logging.getLogger(__name__)
+
+PDF_JOB_WORKERS = int(os.environ.get("PDF_JOB_WORKERS", 2))
+# Jobs waiting per worker process, not counting the ones rendering
+PDF_JOB_QUEUE_SIZE = int(os.environ.get("PDF_JOB_QUEUE_SIZE", 16))
+PDF_JOB_TTL = float(os.environ.get("PDF_JOB_TTL", 3600))
+PDF_JOB_DB = os.environ.get("PDF_JOB_DB") or os.path.join(tempfile.gettempdir(), "resumeai-pdf-jobs.db")
+PDF_JOB_DIR = os.environ.get("PDF_JOB_DIR") or os.path.join(tempfile.gettempdir(), "resumeai-pdf-jobs")
+# Longest an event stream stays open; the client reconnects or polls after that
+PDF_JOB_EVENTS_TIMEOUT = float(os.environ.get("PDF_JOB_EVENTS_TIMEOUT", 120))
+# A worker that hasn't renewed its lease for this long is considered gone
+PDF_JOB_WORKER_LEASE = float(os.environ.get("PDF_JOB_WORKER_LEASE", 30))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED = (DONE, FAILED)
+WATCH_INTERVAL = 0.25
+PRUNE_INTERVAL = 300
+RECENT_RENDERS = 200
+
+_JOB_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class PdfQueueFull(Exception):
+    """Raised when this worker's export queue has no room; retry after ``retry_after`` seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"PDF export queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _process_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class PdfJobQueue:
+    """Bounded per-process queue of export jobs, with job state shared through SQLite."""
+
+    def __init__(self, path: str, result_dir: str, workers: int = PDF_JOB_WORKERS,
+                 max_queued: int = PDF_JOB_QUEUE_SIZE, ttl: float = PDF_JOB_TTL):
+        self.path = path
+        self.result_dir = result_dir
+        self.workers = max(1, workers)
+        self.max_queued = max(1, max_queued)
+        self.ttl = ttl
+        self._local = threading.local()
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._queue: Optional[queue.Queue] = None
+        self._pid: Optional[int] = None
+        self._worker_id: Optional[str] = None
+        self._last_prune = 0.0
+        self.submitted = 0
+        self.deduplicated = 0
+        self.cache_hits = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.running = 0
+        self.total_wait_seconds = 0.0
+        self._render_seconds = deque(maxlen=RECENT_RENDERS)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        os.makedirs(result_dir, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, key TEXT NOT NULL, state TEXT NOT NULL, pid INTEGER NOT NULL,"
+            " created_at REAL NOT NULL, started_at REAL, finished_at REAL,"
+            " size INTEGER, source TEXT, error TEXT, worker TEXT)"
+        )
+        try:
+            conn.execute("ALTER TABLE jobs ADD COLUMN worker TEXT")
+        except sqlite3.OperationalError:
+            pass  # already there
+        conn.execute("CREATE TABLE IF NOT EXISTS workers (id TEXT PRIMARY KEY, pid INTEGER NOT NULL,"
+                     " renewed_at REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_by_key ON jobs (key)")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_by_state ON jobs (state, created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _ensure_started(self) -> queue.Queue:
+        # Threads don't survive a fork: every worker process starts its own
+        with self._start_lock:
+            if self._queue is None or self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.max_queued)
+                self._pid = os.getpid()
+                self._worker_id = uuid.uuid4().hex
+                self._renew_lease()
+                threading.Thread(target=self._heartbeat, args=(self._worker_id,), name="pdf-job-lease",
+                                 daemon=True).start()
+                for i in range(self.workers):
+                    threading.Thread(target=self._work, args=(self._queue,), name=f"pdf-job-{i}",
+                                     daemon=True).start()
+            return self._queue
+
+    def _renew_lease(self) -> None:
+        self._connect().execute("INSERT OR REPLACE INTO workers (id, pid, renewed_at) VALUES (?, ?, ?)",
+                                (self._worker_id, os.getpid(), time.time()))
+
+    def _heartbeat(self, worker_id: str) -> None:
+        while self._worker_id == worker_id:
+            time.sleep(PDF_JOB_WORKER_LEASE / 3)
+            try:
+                self._renew_lease()
+            except sqlite3.Error as e:
+                logger.warning(f"PDF job worker lease renewal failed: {e}")
+
+    def _worker_alive(self, row: sqlite3.Row) -> bool:
+        if not _process_alive(row["pid"]):
+            return False
+        worker = row["worker"]
+        if worker is None or (worker == self._worker_id and self._pid == os.getpid()):
+            return True
+        lease = self._connect().execute("SELECT renewed_at FROM workers WHERE id = ?", (worker,)).fetchone()
+        return lease is not None and time.time() - lease[0] < PDF_JOB_WORKER_LEASE
+
+    def result_path(self, job_id: str) -> str:
+        return os.path.join(self.result_dir, f"{job_id}.pdf")
+
+    def _write_result(self, job_id: str, pdf_bytes: bytes) -> None:
+        # Written aside and renamed, so a download never sees a partial file
+        tmp_path = f"{self.result_path(job_id)}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(pdf_bytes)
+        os.replace(tmp_path, self.result_path(job_id))
+
+    def _finish(self, job_id: str, state: str, size: Optional[int] = None, source: Optional[str] = None,
+                error: Optional[str] = None) -> None:
+        self._connect().execute(
+            "UPDATE jobs SET state = ?, finished_at = ?, size = ?, source = ?, error = ? WHERE id = ?",
+            (state, time.time(), size, source, error, job_id),
+        )
+
+    def submit(self, key: str, render: Callable[[], bytes]) -> Dict[str, Any]:
+        """
+        Queue a render of the document with content hash ``key`` and return the
+        job's status. Raises PdfQueueFull when this worker's queue is full.
+        """
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT * FROM jobs WHERE key = ? AND state != ? ORDER BY created_at DESC LIMIT 1", (key, FAILED)
+        ).fetchone()
+        if row is not None:
+            status = self._status(row)
+            if status is not None and status["state"] != FAILED:
+                with self._stats_lock:
+                    self.deduplicated += 1
+                return status
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        pdf_bytes = pdf_cache.get(key)
+        if pdf_bytes is not None:
+            self._write_result(job_id, pdf_bytes)
+            conn.execute(
+                "INSERT INTO jobs (id, key, state, pid, created_at, started_at, finished_at, size, source)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, key, DONE, os.getpid(), now, now, now, len(pdf_bytes), "hit"),
+            )
+            with self._stats_lock:
+                self.submitted += 1
+                self.cache_hits += 1
+            return self.status(job_id)
+
+        jobs = self._ensure_started()
+        conn.execute("INSERT INTO jobs (id, key, state, pid, worker, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                     (job_id, key, QUEUED, os.getpid(), self._worker_id, now))
+        try:
+            jobs.put_nowait((job_id, key, render, now))
+        except queue.Full:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            with self._stats_lock:
+                self.rejected += 1
+            raise PdfQueueFull(self.retry_after())
+        with self._stats_lock:
+            self.submitted += 1
+        return self.status(job_id)
+
+    def _work(self, jobs: queue.Queue) -> None:
+        while True:
+            job_id, key, render, enqueued = jobs.get()
+            started = time.time()
+            with self._stats_lock:
+                self.running += 1
+                self.total_wait_seconds += started - enqueued
+            try:
+                self._connect().execute("UPDATE jobs SET state = ?, started_at = ? WHERE id = ?",
+                                        (RUNNING, started, job_id))
+                pdf_bytes, source = cached_pdf(key, render)
+                self._write_result(job_id, pdf_bytes)
+                self._finish(job_id, DONE, size=len(pdf_bytes), source=source)
+                with self._stats_lock:
+                    self.completed += 1
+                    self._render_seconds.append(time.time() - started)
+            except Exception as e:
+                logger.warning(f"PDF export job {job_id} failed: {e}")
+                with self._stats_lock:
+                    self.failed += 1
+                try:
+                    self._finish(job_id, FAILED, error=str(e)[:500] or type(e).__name__)
+                except sqlite3.Error as db_error:
+                    logger.warning(f"Could not record PDF job failure: {db_error}")
+            finally:
+                with self._stats_lock:
+                    self.running -= 1
+                    prune = started - self._last_prune >= PRUNE_INTERVAL
+                    if prune:
+                        self._last_prune = started
+                jobs.task_done()
+            if prune:
+                self.prune()
+
+    def _status(self, row: sqlite3.Row) -> Optional[Dict[str, Any]]:
+        state, error = row["state"], row["error"]
+        if state in (QUEUED, RUNNING) and not self._worker_alive(row):
+            error = "The export worker exited before finishing this job"
+            self._finish(row["id"], FAILED, error=error)
+            state = FAILED
+        if state == DONE and not os.path.exists(self.result_path(row["id"])):
+            return None
+        status: Dict[str, Any] = {"job_id": row["id"], "state": state, "key": row["key"]}
+        if state == QUEUED:
+            ahead = self._connect().execute(
+                "SELECT COUNT(*) FROM jobs WHERE state = ? AND created_at < ?", (QUEUED, row["created_at"])
+            ).fetchone()[0]
+            status["position"] = ahead + 1
+        if row["started_at"] is not None:
+            status["wait_ms"] = round((row["started_at"] - row["created_at"]) * 1000, 1)
+        if state == DONE:
+            status["render_ms"] = round((row["finished_at"] - row["started_at"]) * 1000, 1)
+            status["size"] = row["size"]
+            status["source"] = row["source"]
+        if state == FAILED:
+            status["error"] = error
+        return status
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """The job's state, or None for an unknown or expired id."""
+        if not _JOB_ID.match(job_id or ""):
+            return None
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._status(row) if row is not None else None
+
+    def result(self, job_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Path of a finished job's PDF and its status, or None when there is no PDF (yet)."""
+        status = self.status(job_id)
+        if status is None or status["state"] != DONE:
+            return None
+        return self.result_path(job_id), status
+
+    def watch(self, job_id: str, timeout: float = PDF_JOB_EVENTS_TIMEOUT) -> Iterator[Optional[Dict[str, Any]]]:
+        """Yield the job's status each time it changes, until it finishes, disappears or ``timeout`` passes."""
+        deadline = time.time() + timeout
+        last = None
+        while True:
+            status = self.status(job_id)
+            if status != last:
+                yield status
+                last = status
+            if status is None or status["state"] in FINISHED or time.time() >= deadline:
+                return
+            time.sleep(WATCH_INTERVAL)
+
+    async def awatch(self, job_id: str,
+                     timeout: float = PDF_JOB_EVENTS_TIMEOUT) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """watch() for the event loop: the SQLite reads run on a thread."""
+        deadline = time.time() + timeout
+        last = None
+        while True:
+            status = await asyncio.to_thread(self.status, job_id)
+            if status != last:
+                yield status
+                last = status
+            if status is None or status["state"] in FINISHED or time.time() >= deadline:
+                return
+            await asyncio.sleep(WATCH_INTERVAL)
+
+    def _avg_render_seconds(self) -> float:
+        with self._stats_lock:
+            recent = list(self._render_seconds)
+        return sum(recent) / len(recent) if recent else 2.0
+
+    def retry_after(self) -> int:
+        """Seconds until this worker's queue is likely to have room again."""
+        return max(1, min(60, math.ceil(self._avg_render_seconds() / self.workers)))
+
+    def depth(self) -> int:
+        """Jobs waiting on every worker of the host."""
+        return self._connect().execute("SELECT COUNT(*) FROM jobs WHERE state = ?", (QUEUED,)).fetchone()[0]
+
+    def prune(self) -> int:
+        """Delete jobs (and PDFs) that finished more than ``ttl`` seconds ago."""
+        cutoff = time.time() - self.ttl
+        try:
+            conn = self._connect()
+            expired = [row[0] for row in conn.execute(
+                "SELECT id FROM jobs WHERE state IN (?, ?) AND finished_at < ?", (DONE, FAILED, cutoff))]
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in expired])
+            conn.execute("DELETE FROM workers WHERE renewed_at < ?", (cutoff,))
+        except sqlite3.Error as e:
+            logger.warning(f"PDF job prune failed: {e}")
+            return 0
+        for job_id in expired:
+            try:
+                os.remove(self.result_path(job_id))
+            except FileNotFoundError:
+                pass
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            host_queued = self.depth()
+        except sqlite3.Error:
+            host_queued = None
+        with self._stats_lock:
+            recent = sorted(self._render_seconds)
+            started = self.completed + self.failed + self.running
+            return {
+                "workers": self.workers,
+                "max_queued": self.max_queued,
+                "queued": self._queue.qsize() if self._queue is not None and self._pid == os.getpid() else 0,
+                "running": self.running,
+                "host_queued": host_queued,
+                "submitted": self.submitted,
+                "deduplicated": self.deduplicated,
+                "cache_hits": self.cache_hits,
+                "rejected": self.rejected,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_wait_ms": round(self.total_wait_seconds / started * 1000, 1) if started else 0.0,
+                "avg_render_ms": round(sum(recent) / len(recent) * 1000, 1) if recent else 0.0,
+                "p95_render_ms": round(recent[int(len(recent) * 0.95)] * 1000, 1) if recent else 0.0,
+            }
+
+
+pdf_jobs = PdfJobQueue(PDF_JOB_DB, PDF_JOB_DIR)
+
+
+def get_pdf_job_stats() -> Dict[str, Any]:
+    return pdf_jobs.stats()
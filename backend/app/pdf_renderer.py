@@ -0,0 +1,381 @@
+"""
+Pooled Chromium for PDF export
+One long-lived headless Chromium per worker, driven by async Playwright on a
+dedicated thread with its own event loop. Each render gets a fresh browser
+context (isolated cookies, storage and page state) instead of a fresh
+browser, so an export costs a page load rather than a browser launch.
+Callers on any thread (Flask request threads, the ASGI adapter pool) submit
+renders and block on the result.
+
+- At most PDF_MAX_CONCURRENCY renders run at once; the rest queue.
+- The browser is replaced after PDF_RECYCLE_AFTER renders, or once the
+  Chromium process tree grows past PDF_MAX_RSS_MB. In-flight renders finish
+  on the old browser before it closes.
+- A crashed or disconnected browser is relaunched, and the render that hit
+  the crash is retried once.
+- The browser is launched in the background at startup (PDF_PREWARM), so
+  the first export doesn't pay for it.
+- Pages never wait on the network for fonts: bundled fonts (app.pdf_fonts)
+  are served from memory by request interception and requests to the font
+  CDN they replace are aborted. Other assets (images, stylesheets in the
+  resume) load as usual. A render is ready to print once
+  document.fonts.ready resolves and the layout holds still for two frames.
+"""
+import asyncio
+import atexit
+import logging
+import os
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Dict, Optional
+
+from app.pdf_fonts import font_face_css, font_response, is_font_request
+
+logger = logging.getLogger(__name__)
+
+PDF_MAX_CONCURRENCY = int(os.environ.get("PDF_MAX_CONCURRENCY", 4))
+PDF_RECYCLE_AFTER = int(os.environ.get("PDF_RECYCLE_AFTER", 200))
+PDF_MAX_RSS_MB = float(os.environ.get("PDF_MAX_RSS_MB", 1024))
+PDF_RENDER_TIMEOUT = float(os.environ.get("PDF_RENDER_TIMEOUT", 60))
+# Upper bound on waiting for fonts and layout before printing anyway
+PDF_READY_TIMEOUT_MS = int(os.environ.get("PDF_READY_TIMEOUT_MS", 5000))
+PDF_PREWARM = os.environ.get("PDF_PREWARM", "true").lower() in ("1", "true", "yes")
+
+RSS_CHECK_EVERY = 10
+
+CHROMIUM_ARGS = ['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
+
+# Resolves once web fonts have loaded, images have decoded and the body's box
+# is unchanged across consecutive frames; the value is the frames it took
+WAIT_FOR_LAYOUT_JS = """async (maxFrames) => {
+  await document.fonts.ready;
+  await Promise.all(Array.from(document.images, img => img.complete ? null : img.decode().catch(() => null)));
+  const frame = () => new Promise(resolve => requestAnimationFrame(() => resolve()));
+  let last = null;
+  for (let i = 0; i < maxFrames; i++) {
+    await frame();
+    const box = document.body.getBoundingClientRect();
+    const current = `${box.width}x${box.height}:${document.fonts.status}`;
+    if (current === last && document.fonts.status === 'loaded') return i;
+    last = current;
+  }
+  return -1;
+}"""
+LAYOUT_MAX_FRAMES = 30
+
+
+class PdfRenderError(Exception):
+    """The page could not be rendered to PDF."""
+
+
+def _process_tree_rss(root_pid: int) -> int:
+    """RSS in bytes of every descendant of ``root_pid`` (the Playwright driver and Chromium). Linux only."""
+    children: Dict[int, list] = {}
+    rss: Dict[int, int] = {}
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    try:
+        pids = [int(name) for name in os.listdir("/proc") if name.isdigit()]
+    except OSError:
+        return 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        # fields[1] is ppid, fields[21] is rss in pages
+        children.setdefault(int(fields[1]), []).append(pid)
+        rss[pid] = int(fields[21]) * page_size
+    total, stack = 0, list(children.get(root_pid, ()))
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, ()))
+    return total
+
+
+class BrowserPool:
+    """Owns the render thread, its event loop, the Playwright driver and the current browser."""
+
+    def __init__(self, max_concurrency: int = PDF_MAX_CONCURRENCY, recycle_after: int = PDF_RECYCLE_AFTER,
+                 max_rss_mb: float = PDF_MAX_RSS_MB):
+        self.max_concurrency = max(1, max_concurrency)
+        self.recycle_after = max(1, recycle_after)
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._pid = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._playwright = None
+        self._browser = None
+        self._browser_renders = 0
+        self._in_flight: Dict[Any, int] = {}
+        self._launch_lock: Optional[asyncio.Lock] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.renders = 0
+        self.failures = 0
+        self.launches = 0
+        self.crashes = 0
+        self.recycles = {"renders": 0, "rss": 0}
+        self.queued = 0
+        self.active = 0
+        self.total_render_seconds = 0.0
+        self.total_queue_seconds = 0.0
+        self.total_ready_seconds = 0.0
+        self.ready_timeouts = 0
+        self.blocked_requests = 0
+
+    # -- thread / loop management -------------------------------------------------
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        """Start the render thread in this process (again after a fork)."""
+        if self._pid == os.getpid() and self._loop is not None:
+            return self._loop
+        with self._start_lock:
+            if self._pid != os.getpid() or self._loop is None:
+                # State inherited from a parent process belongs to its thread
+                self._playwright = self._browser = None
+                self._in_flight = {}
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    self._launch_lock = asyncio.Lock()
+                    self._slots = asyncio.Semaphore(self.max_concurrency)
+                    ready.set()
+                    loop.run_forever()
+
+                threading.Thread(target=run, name="pdf-renderer", daemon=True).start()
+                ready.wait()
+                self._loop = loop
+                self._pid = os.getpid()
+        return self._loop
+
+    def _submit(self, coro, timeout: Optional[float]):
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_started())
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise PdfRenderError(f"PDF render timed out after {timeout:g}s")
+
+    # -- browser lifecycle (render thread only) -----------------------------------
+
+    async def _launch(self):
+        if self._playwright is None:
+            from playwright.async_api import async_playwright
+            self._playwright = await async_playwright().start()
+        browser = await self._playwright.chromium.launch(headless=True, args=CHROMIUM_ARGS)
+        browser.on("disconnected", lambda b: self._on_disconnected(b))
+        self._browser, self._browser_renders = browser, 0
+        self._in_flight[browser] = 0
+        with self._stats_lock:
+            self.launches += 1
+        logger.info("Launched pooled Chromium for PDF export")
+        return browser
+
+    def _on_disconnected(self, browser) -> None:
+        self._in_flight.pop(browser, None)
+        if browser is self._browser:
+            # Not a recycle: Chromium crashed or was killed
+            self._browser = None
+            with self._stats_lock:
+                self.crashes += 1
+            logger.warning("Pooled Chromium disconnected; it will be relaunched on the next render")
+
+    def _recycle_reason(self) -> Optional[str]:
+        if self._browser_renders >= self.recycle_after:
+            return "renders"
+        # Walking /proc costs a few ms, so the memory check runs every RSS_CHECK_EVERY renders
+        if (self.max_rss_bytes and self._browser_renders % RSS_CHECK_EVERY == 0
+                and _process_tree_rss(os.getpid()) > self.max_rss_bytes):
+            return "rss"
+        return None
+
+    async def _acquire_browser(self):
+        async with self._launch_lock:
+            browser = self._browser
+            if browser is not None and browser.is_connected():
+                reason = self._recycle_reason()
+                if reason is None:
+                    self._in_flight[browser] += 1
+                    self._browser_renders += 1
+                    return browser
+                with self._stats_lock:
+                    self.recycles[reason] += 1
+                logger.info(f"Recycling pooled Chromium ({reason})")
+                self._browser = None
+                if not self._in_flight.get(browser):
+                    await self._close(browser)
+            browser = await self._launch()
+            self._in_flight[browser] += 1
+            self._browser_renders += 1
+            return browser
+
+    async def _release_browser(self, browser) -> None:
+        if browser in self._in_flight:
+            self._in_flight[browser] -= 1
+            if browser is not self._browser and not self._in_flight[browser]:
+                # Retired by a recycle: close once its last render is done
+                await self._close(browser)
+
+    async def _close(self, browser) -> None:
+        self._in_flight.pop(browser, None)
+        try:
+            await browser.close()
+        except Exception as e:
+            logger.debug(f"Closing retired Chromium failed: {e}")
+
+    # -- rendering ----------------------------------------------------------------
+
+    async def _route(self, route) -> None:
+        url = route.request.url
+        font = font_response(url)
+        if font is not None:
+            await route.fulfill(**font)
+        else:
+            # Upstream copy of a bundled font or font stylesheet
+            with self._stats_lock:
+                self.blocked_requests += 1
+            logger.debug(f"Blocked PDF page request to {url}")
+            await route.abort()
+
+    async def _wait_until_ready(self, page) -> None:
+        started = time.monotonic()
+        try:
+            frames = await asyncio.wait_for(page.evaluate(WAIT_FOR_LAYOUT_JS, LAYOUT_MAX_FRAMES),
+                                            PDF_READY_TIMEOUT_MS / 1000)
+        except asyncio.TimeoutError:
+            frames = -1
+        with self._stats_lock:
+            self.total_ready_seconds += time.monotonic() - started
+            if frames < 0:
+                self.ready_timeouts += 1
+        if frames < 0:
+            logger.warning("PDF page did not settle before the readiness timeout; printing anyway")
+
+    async def _render_once(self, html: str, pdf_options: Dict[str, Any]) -> bytes:
+        browser = await self._acquire_browser()
+        try:
+            context = await browser.new_context()
+            try:
+                # Only font requests are intercepted; everything else goes straight out
+                await context.route(is_font_request, self._route)
+                page = await context.new_page()
+                await page.set_content(html, wait_until='load')
+                await self._wait_until_ready(page)
+                return await page.pdf(**pdf_options)
+            finally:
+                await context.close()
+        finally:
+            await self._release_browser(browser)
+
+    async def _render(self, html: str, pdf_options: Dict[str, Any], submitted: float) -> bytes:
+        with self._stats_lock:
+            self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            with self._stats_lock:
+                self.queued -= 1
+        try:
+            started = time.monotonic()
+            with self._stats_lock:
+                self.active += 1
+                self.total_queue_seconds += started - submitted
+            try:
+                crashes_before = self.crashes
+                try:
+                    pdf_bytes = await self._render_once(html, pdf_options)
+                except Exception as e:
+                    if self.crashes == crashes_before:
+                        raise
+                    # The browser died under this render: retry once on a fresh one
+                    logger.warning(f"PDF render failed with the browser gone ({e}); retrying")
+                    pdf_bytes = await self._render_once(html, pdf_options)
+            except Exception:
+                with self._stats_lock:
+                    self.failures += 1
+                raise
+            finally:
+                with self._stats_lock:
+                    self.active -= 1
+            with self._stats_lock:
+                self.renders += 1
+                self.total_render_seconds += time.monotonic() - started
+            return pdf_bytes
+        finally:
+            self._slots.release()
+
+    def render_pdf(self, html: str, pdf_options: Dict[str, Any], timeout: float = PDF_RENDER_TIMEOUT) -> bytes:
+        """Render ``html`` to PDF bytes with page.pdf(**pdf_options); blocks the calling thread."""
+        return self._submit(self._render(html, pdf_options, time.monotonic()), timeout)
+
+    async def _warm(self) -> None:
+        browser = await self._acquire_browser()
+        try:
+            # Spin up a renderer process once so the first real export doesn't pay for it
+            page = await browser.new_page()
+            await page.close()
+        finally:
+            await self._release_browser(browser)
+
+    def prewarm(self) -> None:
+        """Launch the browser and load the bundled fonts in the background; failures are logged, not raised."""
+        def warm():
+            font_face_css()
+            try:
+                self._submit(self._warm(), PDF_RENDER_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"PDF renderer pre-warm failed: {e}")
+        threading.Thread(target=warm, name="pdf-prewarm", daemon=True).start()
+
+    async def _shutdown(self) -> None:
+        for browser in list(self._in_flight):
+            await self._close(browser)
+        self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def shutdown(self) -> None:
+        if self._loop is None or self._pid != os.getpid():
+            return
+        try:
+            self._submit(self._shutdown(), 10)
+        except Exception as e:
+            logger.debug(f"PDF renderer shutdown: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "active": self.active,
+                "queued": self.queued,
+                "renders": self.renders,
+                "failures": self.failures,
+                "launches": self.launches,
+                "crashes": self.crashes,
+                "recycles": dict(self.recycles),
+                "avg_render_ms": round(self.total_render_seconds / self.renders * 1000, 1) if self.renders else 0.0,
+                "avg_queue_ms": round(self.total_queue_seconds / self.renders * 1000, 1) if self.renders else 0.0,
+                "avg_ready_ms": round(self.total_ready_seconds / self.renders * 1000, 1) if self.renders else 0.0,
+                "ready_timeouts": self.ready_timeouts,
+                "blocked_requests": self.blocked_requests,
+            }
+
+
+pdf_pool = BrowserPool()
+atexit.register(pdf_pool.shutdown)
+
+
+def render_pdf(html: str, pdf_options: Dict[str, Any], timeout: float = PDF_RENDER_TIMEOUT) -> bytes:
+    return pdf_pool.render_pdf(html, pdf_options, timeout)
+
+
+def get_pdf_stats() -> Dict[str, Any]:
+    return pdf_pool.stats()
@@ -0,0 +1,1224 @@
+"""
+PyMuPDF Story engine for PDF export
+Renders the resume builder's single-column templates with MuPDF's HTML/CSS
+layout engine instead of Chromium: no browser and no page load, just a
+layout pass in this process. Story lays out one flow of blocks and has no
+flexbox, tables, floats or positioning, and its cascade differs from a
+browser's, so the document is prepared here first:
+
+- The stylesheet is cascaded in Python (specificity, order, !important,
+  custom properties, Chromium's defaults for the tags in use) and the
+  result is written inline on every element, so MuPDF only inherits.
+- CSS px become pt (1px = 0.75pt, as Chromium prints) and text-transform is
+  applied to the text.
+- A ``display:flex; justify-content:space-between`` row keeps its first
+  item in the flow with room reserved on the right; the last item is drawn
+  right-aligned over the row by a second Story. An absolutely positioned
+  ``left:0`` child (the bullets) and the ``min-width`` label of a
+  label/value row hang in the parent's left padding with a negative
+  text-indent. A gap-separated inline flex row becomes a nowrap line.
+- Story ignores horizontal margins and padding on inline boxes, so those
+  (and flex gaps) become transparent spacer images of the same width.
+- List items keep Story's own markers, which are counted as text for the
+  fidelity check below.
+
+- Text must be set in a font-family whose first name is a bundled face;
+  MuPDF would otherwise substitute its own fonts where Chromium uses the
+  installed ones.
+
+Anything else raises StoryUnsupported and the export goes to Chromium.
+After rendering, the words on the pages are compared with the document's
+text; any difference (missing glyphs, text pushed off the page) raises
+StoryFidelityError and the export also goes to Chromium. MuPDF is not
+thread-safe, so renders in one worker process are serialized.
+"""
+import hashlib
+import html as html_lib
+import io
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import fitz  # PyMuPDF
+
+from app.cache import LRUCache
+from app.pdf_fonts import font_archive, story_font_css, story_font_families, story_fonts_complete
+
+logger = logging.getLogger(__name__)
+
+# auto: Story for documents inside the supported subset (and only with the
+#       fonts bundled), Chromium otherwise
+# chromium: always Chromium
+PDF_ENGINE = os.environ.get("PDF_ENGINE", "auto").lower()
+
+PX_TO_PT = 0.75
+ROOT_FONT_PT = 12.0  # Chromium's default 16px
+
+BLOCK_TAGS = {"div", "p", "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "li",
+              "section", "header", "footer", "article", "main"}
+INLINE_TAGS = {"span", "a", "b", "strong", "i", "em", "u", "s", "small", "sup", "sub", "code", "br"}
+VOID_TAGS = {"br", "hr", "img", "input", "meta", "link", "wbr", "source", "col", "area", "base", "embed"}
+
+# Chromium's user-agent styles for the tags above, cascaded below every author rule
+UA_CSS = """
+body { margin: 8px; }
+p, ul, ol { margin-top: 1em; margin-bottom: 1em; }
+h1 { font-size: 2em; font-weight: bold; margin-top: 0.67em; margin-bottom: 0.67em; }
+h2 { font-size: 1.5em; font-weight: bold; margin-top: 0.83em; margin-bottom: 0.83em; }
+h3 { font-size: 1.17em; font-weight: bold; margin-top: 1em; margin-bottom: 1em; }
+h4 { font-weight: bold; margin-top: 1.33em; margin-bottom: 1.33em; }
+h5 { font-size: 0.83em; font-weight: bold; margin-top: 1.67em; margin-bottom: 1.67em; }
+h6 { font-size: 0.67em; font-weight: bold; margin-top: 2.33em; margin-bottom: 2.33em; }
+ul, ol { padding-left: 40px; }
+ul { list-style-type: disc; }
+ol { list-style-type: decimal; }
+li { display: list-item; }
+a { color: #0000ee; text-decoration: underline; }
+b, strong { font-weight: bold; }
+i, em { font-style: italic; }
+u { text-decoration: underline; }
+s { text-decoration: line-through; }
+small { font-size: smaller; }
+code { font-family: monospace; }
+"""
+
+# Written through to Story (lengths converted to pt)
+PASS_PROPERTIES = {
+    "color", "background-color", "font-family", "font-size", "font-weight", "font-style", "font-variant",
+    "line-height", "text-align", "text-decoration", "text-indent", "vertical-align", "white-space",
+    "list-style-type", "list-style-position", "margin-top", "margin-right", "margin-bottom",
+    "margin-left", "padding-top", "padding-right", "padding-bottom", "padding-left",
+    "border-top", "border-right", "border-bottom", "border-left", "border-width", "border-style",
+    "border-color", "border-top-width", "border-right-width", "border-bottom-width", "border-left-width",
+    "border-top-style", "border-right-style", "border-bottom-style", "border-left-style",
+    "border-top-color", "border-right-color", "border-bottom-color", "border-left-color",
+    "page-break-before", "page-break-after", "page-break-inside", "orphans", "widows", "direction",
+}
+INHERITED_PROPERTIES = {"color", "font-family", "font-size", "font-weight", "font-style", "font-variant",
+                        "line-height", "text-align", "white-space", "list-style-type", "direction"}
+# Nothing to draw on a static page, or too small to matter in print
+DROPPED_PROPERTIES = {
+    "box-sizing", "tab-size", "font-feature-settings", "font-variation-settings", "text-size-adjust",
+    "letter-spacing", "word-spacing", "text-rendering", "font-smoothing", "cursor", "pointer-events",
+    "user-select", "appearance", "resize", "z-index", "content", "quotes", "word-wrap",
+    "overflow-wrap", "word-break", "hyphens", "background", "text-decoration-color",
+    "text-decoration-style", "text-decoration-thickness", "text-underline-offset", "list-style-image",
+    "border-collapse", "border-spacing", "caret-color", "accent-color", "will-change", "contain",
+}
+DROPPED_PREFIXES = ("--", "-webkit-", "-moz-", "-ms-", "-o-", "transition", "animation", "outline", "scroll-")
+# Harmless at these values, unsupported at any other
+NEUTRAL_VALUES = {
+    "float": {"none"}, "clear": {"none", "both"}, "opacity": {"1"}, "transform": {"none"},
+    "visibility": {"visible"}, "overflow": {"visible", "hidden"}, "overflow-x": {"visible", "hidden"},
+    "overflow-y": {"visible", "hidden"}, "box-shadow": {"none"}, "text-shadow": {"none"},
+    "background-image": {"none"}, "filter": {"none"}, "width": {"auto", "100%"}, "height": {"auto"},
+    "min-width": {"0", "auto"}, "min-height": {"0", "auto"}, "max-width": {"none", "100%"},
+    "max-height": {"none"}, "top": {"auto"}, "right": {"auto"}, "bottom": {"auto"}, "left": {"auto"},
+}
+# Only meaningful on a flex container or item, where the row patterns handle them
+FLEX_PROPERTIES = {"flex", "flex-grow", "flex-shrink", "flex-basis", "flex-direction", "flex-wrap",
+                   "flex-flow", "justify-content", "align-items", "align-self", "align-content", "order",
+                   "gap", "row-gap", "column-gap"}
+SHORTHAND_SIDES = {"margin", "padding"}
+
+# States a printed page is never in (:host only matches inside a shadow tree)
+_DYNAMIC_PSEUDO = {"host", "hover", "focus", "focus-visible", "focus-within", "active", "visited", "target",
+                   "disabled", "enabled", "checked", "invalid", "valid", "required", "optional",
+                   "read-only", "read-write", "placeholder-shown", "autofill", "indeterminate", "default"}
+_EMPTY_CONTENT = {"none", "normal", '""', "''", "var(--tw-content)"}
+
+_OPEN_TAG = re.compile(r"<([a-z][a-z0-9]*)")
+# A length that depends on measured widths, see _StoryDocument._defer()
+_DEFERRED = re.compile("\x01(\\d+)\x02")
+_LENGTH = re.compile(r"(-?(?:\d+\.?\d*|\.\d+))(px|rem)\b")
+_VAR = re.compile(r"var\(\s*(--[\w-]+)\s*(?:,\s*([^()]*(?:\([^()]*\)[^()]*)*))?\)")
+_SPACE_RGB = re.compile(r"rgba?\(\s*([\d.]+)\s+([\d.]+)\s+([\d.]+)\s*(?:/\s*([\d.]+%?)\s*)?\)")
+_COMPOUND_TOKEN = re.compile(r"""
+    (?P<tag>\*|[a-zA-Z][\w-]*)
+  | \#(?P<id>(?:\\.|[\w-])+)
+  | \.(?P<cls>(?:\\.|[\w-])+)
+  | \[\s*(?P<attr>[\w-]+)\s*(?:(?P<op>[~^$*|]?=)\s*(?P<value>"[^"]*"|'[^']*'|[^\]\s]+)\s*[is]?\s*)?\]
+  | (?P<colons>::?)(?P<pseudo>[\w-]+)(?:\((?P<arg>(?:[^()]|\([^()]*\))*)\))?
+""", re.X)
+
+
+class StoryUnsupported(Exception):
+    """The document uses HTML or CSS outside what the Story engine reproduces."""
+
+
+class StoryFidelityError(Exception):
+    """The Story output lost or displaced text."""
+
+
+# -- document tree -------------------------------------------------------------
+
+
+class _Node:
+    __slots__ = ("tag", "attrs", "classes", "children", "parent", "style", "custom")
+
+    def __init__(self, tag: str, attrs: Dict[str, str], parent: Optional["_Node"]):
+        self.tag = tag
+        self.attrs = attrs
+        self.classes = set((attrs.get("class") or "").split())
+        self.children: List[Any] = []
+        self.parent = parent
+        self.style: Dict[str, str] = {}
+        self.custom: Dict[str, str] = {}
+
+    def elements(self) -> List["_Node"]:
+        return [child for child in self.children if isinstance(child, _Node)]
+
+    def walk(self):
+        yield self
+        for child in self.elements():
+            yield from child.walk()
+
+
+def _check_font(node: _Node) -> None:
+    """The text's font-family must name a bundled face first, or MuPDF substitutes its own."""
+    while node is not None and "font-family" not in node.style:
+        node = node.parent
+    if node is None:
+        raise StoryUnsupported("text without a font-family")
+    family = node.style["font-family"].split(",", 1)[0].strip().strip("'\"")
+    if family.lower() not in story_font_families():
+        raise StoryUnsupported(f"font-family {family!r} is not bundled")
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = _Node("html", {}, None)
+        self.body = _Node("body", {}, self.root)
+        self.root.children.append(self.body)
+        self.stack = [self.body]
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("html", "body", "head"):
+            return
+        if tag not in BLOCK_TAGS and tag not in INLINE_TAGS:
+            raise StoryUnsupported(f"<{tag}>")
+        node = _Node(tag, {name: value or "" for name, value in attrs}, self.stack[-1])
+        self.stack[-1].children.append(node)
+        if tag not in VOID_TAGS:
+            self.stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.stack[-1].tag == tag:
+            self.stack.pop()
+
+    def handle_endtag(self, tag):
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                return
+
+    def handle_data(self, data):
+        self.stack[-1].children.append(data)
+
+
+def _parse_html(body_html: str) -> _Node:
+    builder = _TreeBuilder()
+    builder.feed(body_html)
+    builder.close()
+    return builder.root
+
+
+# -- stylesheet ----------------------------------------------------------------
+
+
+class _Rule:
+    __slots__ = ("parts", "specificity", "order", "declarations", "pseudo_element", "conditional")
+
+    def __init__(self, parts, specificity, order, declarations, pseudo_element, conditional):
+        self.parts = parts
+        self.specificity = specificity
+        self.order = order
+        self.declarations = declarations
+        self.pseudo_element = pseudo_element
+        self.conditional = conditional
+
+
+def _split_top_level(text: str, separator: str) -> List[str]:
+    """Split on ``separator`` outside quotes, parentheses and brackets."""
+    parts, depth, quote, start = [], 0, None, 0
+    for i, c in enumerate(text):
+        if quote:
+            if c == quote:
+                quote = None
+        elif c in "\"'":
+            quote = c
+        elif c in "([":
+            depth += 1
+        elif c in ")]":
+            depth -= 1
+        elif c == separator and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def _parse_declarations(text: str) -> List[Tuple[str, str, bool]]:
+    declarations = []
+    for item in _split_top_level(text, ";"):
+        prop, sep, value = item.partition(":")
+        if not sep:
+            continue
+        prop, value = prop.strip().lower(), value.strip()
+        important = value.lower().endswith("!important")
+        if important:
+            value = value[:-len("!important")].rstrip()
+        if prop and value:
+            declarations.extend((name, part, important) for name, part in _expand_shorthand(prop, value))
+    return declarations
+
+
+def _expand_shorthand(prop: str, value: str) -> List[Tuple[str, str]]:
+    if prop in SHORTHAND_SIDES:
+        values = value.split()
+        if 1 <= len(values) <= 4 and "(" not in value:
+            top, right, bottom, left = {1: values * 4, 2: values * 2, 3: values + values[1:2],
+                                        4: values}[len(values)]
+            return [(f"{prop}-top", top), (f"{prop}-right", right),
+                    (f"{prop}-bottom", bottom), (f"{prop}-left", left)]
+    if prop == "border" and value.split()[0] in ("0", "none", "0px"):
+        return [(f"border-{side}-width", "0") for side in ("top", "right", "bottom", "left")]
+    if prop == "list-style":
+        return [("list-style-type", value.split()[0])]
+    return [(prop, value)]
+
+
+def _blocks(css: str):
+    """(prelude, body) of every top-level block; statements such as @import are skipped."""
+    i, n = 0, len(css)
+    while i < n:
+        brace = css.find("{", i)
+        if brace < 0:
+            return
+        semicolon = css.find(";", i, brace)
+        if semicolon >= 0 and css[i:semicolon].strip().startswith("@"):
+            i = semicolon + 1
+            continue
+        depth, j = 1, brace + 1
+        while j < n and depth:
+            if css[j] == "{":
+                depth += 1
+            elif css[j] == "}":
+                depth -= 1
+            j += 1
+        yield css[i:brace].strip(), css[brace + 1:j - 1]
+        i = j
+
+
+def _split_selector(selector: str) -> List[Tuple[str, str]]:
+    """[(combinator, compound)] with '' before the first compound."""
+    parts, buf, combinator, depth, quote = [], "", "", 0, None
+    for c in selector:
+        if quote:
+            buf += c
+            if c == quote:
+                quote = None
+        elif c in "\"'":
+            quote = c
+            buf += c
+        elif c in "([":
+            depth += 1
+            buf += c
+        elif c in ")]":
+            depth -= 1
+            buf += c
+        elif depth == 0 and (c.isspace() or c in ">+~"):
+            if buf:
+                parts.append((combinator, buf))
+                buf, combinator = "", " "
+            if c in ">+~":
+                combinator = c
+        else:
+            buf += c
+    if buf:
+        parts.append((combinator, buf))
+    return parts
+
+
+def _parse_compound(text: str) -> Optional[dict]:
+    compound = {"tag": None, "id": None, "classes": [], "attrs": [], "pseudos": [], "pseudo_element": None}
+    pos = 0
+    while pos < len(text):
+        match = _COMPOUND_TOKEN.match(text, pos)
+        if match is None:
+            return None
+        if match.group("tag") and pos == 0:
+            compound["tag"] = match.group("tag").lower()
+        elif match.group("tag"):
+            return None
+        elif match.group("id"):
+            compound["id"] = re.sub(r"\\(.)", r"\1", match.group("id"))
+        elif match.group("cls"):
+            compound["classes"].append(re.sub(r"\\(.)", r"\1", match.group("cls")))
+        elif match.group("attr"):
+            value = match.group("value")
+            if value and value[0] in "\"'":
+                value = value[1:-1]
+            compound["attrs"].append((match.group("attr").lower(), match.group("op"), value))
+        else:
+            name = match.group("pseudo").lower()
+            if match.group("colons") == "::" or name in ("before", "after", "first-line", "first-letter"):
+                compound["pseudo_element"] = name
+            else:
+                compound["pseudos"].append((name, match.group("arg")))
+        pos = match.end()
+    return compound
+
+
+def _specificity(parts) -> Tuple[int, int, int]:
+    ids = classes = tags = 0
+    for _, compound in parts:
+        ids += compound["id"] is not None
+        classes += len(compound["classes"]) + len(compound["attrs"])
+        classes += sum(name not in ("where", "not", "is") for name, _ in compound["pseudos"])
+        tags += compound["tag"] not in (None, "*")
+        tags += compound["pseudo_element"] is not None
+    return ids, classes, tags
+
+
+def _parse_stylesheet(css: str) -> List[_Rule]:
+    rules: List[_Rule] = []
+
+    def add(text: str, conditional: bool):
+        for prelude, body in _blocks(text):
+            if prelude.startswith("@"):
+                name = prelude[1:].split(None, 1)[0].lower() if len(prelude) > 1 else ""
+                if name in ("media", "supports", "container"):
+                    add(body, True)
+                elif name == "layer":
+                    add(body, conditional)
+                continue
+            declarations = _parse_declarations(body)
+            if not declarations:
+                continue
+            for selector in _split_top_level(prelude, ","):
+                parts = [(combinator, _parse_compound(text)) for combinator, text in _split_selector(selector.strip())]
+                if not parts or any(compound is None for _, compound in parts):
+                    continue
+                pseudo_element = parts[-1][1]["pseudo_element"]
+                rules.append(_Rule(parts, _specificity(parts), len(rules), declarations, pseudo_element,
+                                   conditional))
+
+    add(re.sub(r"/\*.*?\*/", "", css, flags=re.S), False)
+    return rules
+
+
+def _index_rules(rules: List[_Rule]) -> Dict[str, List[_Rule]]:
+    """Rules by a key their subject requires ('#id', '.class', tag or '*'), like a browser's rule hash."""
+    index: Dict[str, List[_Rule]] = {}
+    for rule in rules:
+        subject = rule.parts[-1][1]
+        if subject["id"] is not None:
+            key = "#" + subject["id"]
+        elif subject["classes"]:
+            key = "." + subject["classes"][0]
+        else:
+            key = subject["tag"] or "*"
+        index.setdefault(key, []).append(rule)
+    return index
+
+
+_UA_RULES = _index_rules(_parse_stylesheet(UA_CSS))
+# The builder sends the same app stylesheet with every export; parse it once
+_stylesheets = LRUCache(max_entries=8)
+_mupdf_lock = threading.Lock()
+
+
+def _stylesheet(css: str) -> Dict[str, List[_Rule]]:
+    key = hashlib.sha256(css.encode("utf-8")).hexdigest()
+    rules = _stylesheets.get(key)
+    if rules is None:
+        rules = _index_rules(_parse_stylesheet(css))
+        _stylesheets.set(key, rules)
+    return rules
+
+
+# -- selector matching and cascade ---------------------------------------------
+
+
+def _siblings_before(node: _Node) -> List[_Node]:
+    if node.parent is None:
+        return []
+    siblings = node.parent.elements()
+    return siblings[:siblings.index(node)]
+
+
+def _match_attr(node: _Node, name: str, op: Optional[str], value: Optional[str]) -> bool:
+    if name not in node.attrs:
+        return False
+    actual = node.attrs[name]
+    if op is None:
+        return True
+    return {
+        "=": actual == value,
+        "~=": value in actual.split(),
+        "^=": actual.startswith(value),
+        "$=": actual.endswith(value),
+        "*=": value in actual,
+        "|=": actual == value or actual.startswith(value + "-"),
+    }[op]
+
+
+def _match_compound(node: _Node, compound: dict) -> bool:
+    tag = compound["tag"]
+    if tag not in (None, "*") and tag != node.tag:
+        return False
+    if compound["id"] is not None and node.attrs.get("id") != compound["id"]:
+        return False
+    if any(cls not in node.classes for cls in compound["classes"]):
+        return False
+    if not all(_match_attr(node, *attr) for attr in compound["attrs"]):
+        return False
+    for name, arg in compound["pseudos"]:
+        if name in _DYNAMIC_PSEUDO or name.startswith(("-webkit-", "-moz-")):
+            return False
+        if name == "root":
+            if node.tag != "html":
+                return False
+        elif name in ("first-child", "last-child", "only-child"):
+            siblings = node.parent.elements() if node.parent else [node]
+            if name != "last-child" and siblings[0] is not node:
+                return False
+            if name != "first-child" and siblings[-1] is not node:
+                return False
+        elif name in ("not", "is", "where") and arg:
+            compounds = [_parse_compound(part.strip()) for part in _split_top_level(arg, ",")]
+            if any(c is None for c in compounds):
+                raise StoryUnsupported(f":{name}({arg})")
+            matched = any(_match_compound(node, c) for c in compounds)
+            if matched == (name == "not"):
+                return False
+        else:
+            raise StoryUnsupported(f":{name} selector")
+    return True
+
+
+def _matches(node: _Node, parts, index: int) -> bool:
+    combinator, compound = parts[index]
+    if not _match_compound(node, compound):
+        return False
+    if index == 0:
+        return True
+    if combinator == ">":
+        return node.parent is not None and _matches(node.parent, parts, index - 1)
+    if combinator == "+":
+        before = _siblings_before(node)
+        return bool(before) and _matches(before[-1], parts, index - 1)
+    if combinator == "~":
+        return any(_matches(sibling, parts, index - 1) for sibling in _siblings_before(node))
+    ancestor = node.parent
+    while ancestor is not None:
+        if _matches(ancestor, parts, index - 1):
+            return True
+        ancestor = ancestor.parent
+    return False
+
+
+def _resolve_vars(value: str, node: _Node) -> str:
+    for _ in range(8):
+        match = _VAR.search(value)
+        if match is None:
+            return value
+        name, fallback = match.group(1), match.group(2)
+        scope, resolved = node, None
+        while scope is not None and resolved is None:
+            resolved = scope.custom.get(name)
+            scope = scope.parent
+        if resolved is None:
+            if fallback is None:
+                raise StoryUnsupported(f"undefined {name}")
+            resolved = fallback.strip()
+        value = value[:match.start()] + resolved + value[match.end():]
+    raise StoryUnsupported("nested var()")
+
+
+def _candidates(node: _Node, index: Dict[str, List[_Rule]]) -> List[_Rule]:
+    keys = ["*", node.tag] + ["." + cls for cls in node.classes]
+    if "id" in node.attrs:
+        keys.append("#" + node.attrs["id"])
+    return [rule for key in keys for rule in index.get(key, ())]
+
+
+def _cascade(root: _Node, rules: Dict[str, List[_Rule]]) -> None:
+    """Declared (not inherited) values for every element, from UA rules, author rules and style attributes."""
+    for node in root.walk():
+        winners: Dict[str, Tuple[tuple, str]] = {}
+        candidates = [(0, rule) for rule in _candidates(node, _UA_RULES)] + \
+                     [(1, rule) for rule in _candidates(node, rules)]
+        for origin, rule in candidates:
+            if not _matches(node, rule.parts, len(rule.parts) - 1):
+                continue
+            if rule.conditional:
+                raise StoryUnsupported("@media or @supports rule applies to the document")
+            if rule.pseudo_element:
+                content = next((v for p, v, _ in rule.declarations if p == "content"), "none")
+                if rule.pseudo_element in ("before", "after") and content.strip() not in _EMPTY_CONTENT:
+                    raise StoryUnsupported(f"::{rule.pseudo_element} content")
+                if rule.pseudo_element in ("first-line", "first-letter", "marker"):
+                    raise StoryUnsupported(f"::{rule.pseudo_element}")
+                continue
+            for prop, value, important in rule.declarations:
+                rank = (origin, important, rule.specificity, rule.order)
+                if prop not in winners or rank >= winners[prop][0]:
+                    winners[prop] = (rank, value)
+        for prop, value, important in _parse_declarations(node.attrs.get("style", "")):
+            rank = (1, important, (1000, 0, 0), 0)
+            if prop not in winners or rank >= winners[prop][0]:
+                winners[prop] = (rank, value)
+        for prop, (_, value) in winners.items():
+            if prop.startswith("--"):
+                node.custom[prop] = value
+        for prop, (_, value) in winners.items():
+            if not prop.startswith("--"):
+                value = _resolve_vars(value, node) if "var(" in value else value
+                if value in ("initial", "unset", "revert"):
+                    continue
+                node.style[prop] = value
+
+
+# -- values --------------------------------------------------------------------
+
+
+def _to_story_value(value: str) -> str:
+    """CSS px and rem to pt; space-separated rgb() to the comma form MuPDF parses."""
+    def length(match):
+        number, unit = float(match.group(1)), match.group(2)
+        return f"{number * (PX_TO_PT if unit == 'px' else ROOT_FONT_PT):g}pt"
+
+    def rgb(match):
+        alpha = match.group(4)
+        if alpha not in (None, "1", "100%"):
+            raise StoryUnsupported("translucent color")
+        return f"rgb({match.group(1)}, {match.group(2)}, {match.group(3)})"
+
+    return _SPACE_RGB.sub(rgb, _LENGTH.sub(length, value))
+
+
+def _length_pt(value: str, font_pt: float) -> float:
+    match = re.fullmatch(r"\s*(-?(?:\d+\.?\d*|\.\d+))(px|pt|em|rem|in)?\s*", value or "")
+    if match is None:
+        raise StoryUnsupported(f"length {value!r}")
+    number, unit = float(match.group(1)), match.group(2)
+    if unit is None and number != 0:
+        raise StoryUnsupported(f"length {value!r}")
+    return number * {None: 0, "px": PX_TO_PT, "pt": 1, "em": font_pt, "rem": ROOT_FONT_PT, "in": 72}[unit]
+
+
+def _font_size_pt(value: Optional[str], parent_pt: float) -> float:
+    if value is None or value == "inherit":
+        return parent_pt
+    keywords = {"smaller": parent_pt / 1.2, "larger": parent_pt * 1.2, "medium": ROOT_FONT_PT}
+    if value in keywords:
+        return keywords[value]
+    if value.endswith("%"):
+        return parent_pt * float(value[:-1]) / 100
+    return _length_pt(value, parent_pt)
+
+
+def _transform_text(text: str, transform: Optional[str]) -> str:
+    if transform == "uppercase":
+        return text.upper()
+    if transform == "lowercase":
+        return text.lower()
+    if transform == "capitalize":
+        return re.sub(r"\b(\w)", lambda m: m.group(1).upper(), text)
+    return text
+
+
+_BULLETS = {"disc": "\u2022", "circle": "\u25cb", "square": "\u25a0"}
+_ROMAN = [(1000, "m"), (900, "cm"), (500, "d"), (400, "cd"), (100, "c"), (90, "xc"),
+          (50, "l"), (40, "xl"), (10, "x"), (9, "ix"), (5, "v"), (4, "iv"), (1, "i")]
+
+
+def _list_marker(node: _Node) -> str:
+    """The marker Story draws before a list item, as it comes out of the page's text."""
+    owner = node
+    while owner is not None and "list-style-type" not in owner.style:
+        owner = owner.parent
+    kind = owner.style["list-style-type"] if owner is not None else "disc"
+    if kind == "none":
+        return ""
+    if kind in _BULLETS:
+        return _BULLETS[kind]
+    if node.parent is not None and ({"start", "reversed"} & set(node.parent.attrs) or "value" in node.attrs):
+        raise StoryUnsupported("numbered list with start/reversed/value")
+    number = 1 + sum(1 for sibling in _siblings_before(node) if sibling.style.get("display") == "list-item")
+    if kind == "decimal":
+        return f"{number}."
+    if kind in ("lower-alpha", "upper-alpha", "lower-latin", "upper-latin") and number <= 26:
+        letter = chr(ord("a") + number - 1)
+        return (letter.upper() if kind.startswith("upper") else letter) + "."
+    if kind in ("lower-roman", "upper-roman"):
+        numeral = ""
+        for value, digits in _ROMAN:
+            count, number = divmod(number, value)
+            numeral += digits * count
+        return (numeral.upper() if kind == "upper-roman" else numeral) + "."
+    raise StoryUnsupported(f"list-style-type: {kind}")
+
+
+def _words(text: str) -> List[str]:
+    return unicodedata.normalize("NFKC", text).split()
+
+
+def _characters(words: Counter) -> Counter:
+    return Counter("".join(word * count for word, count in words.items()))
+
+
+# 1x1 GIF with a transparent index (Story draws a PNG's alpha channel as black)
+_CLEAR_PIXEL = "data:image/gif;base64,R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7"
+
+
+def _spacer(width_pt: Union[float, str]) -> str:
+    """Horizontal space inside a line: Story ignores inline margins and padding, but sizes images."""
+    if not isinstance(width_pt, str):
+        if width_pt <= 0:
+            return ""
+        width_pt = f"{width_pt:.2f}"
+    return f'<img src="{_CLEAR_PIXEL}" style="width: {width_pt}pt; height: 0.01pt">'
+
+
+# -- layout --------------------------------------------------------------------
+
+
+def _is_inline(node: _Node) -> bool:
+    """Only inline boxes in the subtree, so it can share a line with hung content."""
+    return all(n.tag in INLINE_TAGS and n.style.get("display", "inline") in ("inline", "inline-block", "flex")
+               and n.style.get("position", "static") != "absolute" for n in node.walk())
+
+
+class _Overlay:
+    """Inline content drawn beside an anchor element: in its left padding, or right-aligned over it."""
+    __slots__ = ("anchor", "side", "width", "html")
+
+    def __init__(self, anchor: str, side: str, width: Union[float, str], html: str):
+        self.anchor = anchor
+        self.side = side
+        self.width = width
+        self.html = html
+
+
+class _StoryDocument:
+    """Cascaded tree serialized to Story HTML, with the overlays and the text it should render."""
+
+    def __init__(self, body_html: str, css: str):
+        self.font_css = story_font_css()
+        # Overlays are their own documents: no UA body margin
+        self.overlay_css = self.font_css + "\nbody { margin: 0; padding: 0; }"
+        self.archive = font_archive()
+        self.root = _parse_html(body_html)
+        _cascade(self.root, _stylesheet(css))
+        self.overlays: List[_Overlay] = []
+        self.text: List[str] = []
+        self._ids = 0
+        self._measures: Dict[Tuple[Tuple[str, ...], str], int] = {}
+        self._deferred: List[Callable[[List[float]], float]] = []
+        self.html = self._element(self.root, [], ROOT_FONT_PT, None)
+        self._resolve()
+
+    # Inline wrappers replaying the inherited styles of an element's ancestors
+    def _context(self, chain: List[str], inner: str) -> str:
+        for style in reversed(chain):
+            inner = f'<div style="{style}">{inner}</div>'
+        return inner
+
+    def _anchor_id(self) -> str:
+        self._ids += 1
+        return f"story-anchor-{self._ids}"
+
+    # Every Story loads its own fonts (~1.5ms), so all widths are measured in one
+    # Story once the document is built and the lengths depending on them filled in
+    def _measure(self, chain: List[str], inline_html: str) -> int:
+        """Index in the widths passed to deferred lengths of inline content laid out on one line."""
+        return self._measures.setdefault((tuple(chain), inline_html), len(self._measures))
+
+    def _defer(self, length: Callable[[List[float]], float]) -> str:
+        """Placeholder for a length in pt computed from the measured widths."""
+        self._deferred.append(length)
+        return f"\x01{len(self._deferred) - 1}\x02"
+
+    def _resolve(self) -> None:
+        widths = [0.0] * len(self._measures)
+        if self._measures:
+            lines = []
+            for (chain, inline_html), index in self._measures.items():
+                # Story reports the text fragments of an element with an id, not of its descendants
+                tagged = _OPEN_TAG.sub(rf'<\1 id="m{index}"', inline_html)
+                lines.append(self._context(list(chain), f'<div style="white-space: nowrap">'
+                                                        f'<span id="m{index}">{tagged}</span></div>'))
+            story = fitz.Story("".join(lines), user_css=self.overlay_css, archive=self.archive)
+            story.place(fitz.Rect(0, 0, 10000, 1000000))
+            extents: Dict[int, List[float]] = {}
+
+            def collect(position):
+                if position.id.startswith("m"):
+                    extents.setdefault(int(position.id[1:]), []).extend((position.rect[0], position.rect[2]))
+
+            story.element_positions(collect, {})
+            for index, xs in extents.items():
+                widths[index] = max(xs) - min(xs)
+        values = [f"{length(widths):.2f}" for length in self._deferred]
+
+        def fill(text: str) -> str:
+            return _DEFERRED.sub(lambda m: values[int(m.group(1))], text)
+
+        self.html = fill(self.html)
+        for overlay in self.overlays:
+            overlay.html = fill(overlay.html)
+            overlay.width = float(fill(overlay.width)) if isinstance(overlay.width, str) else overlay.width
+
+    def _story_style(self, node: _Node, style: Dict[str, str], font_pt: float) -> str:
+        declarations = []
+        for prop, value in style.items():
+            value = value.strip()
+            if prop in PASS_PROPERTIES:
+                declarations.append(f"{prop}: {_to_story_value(value)}")
+            elif prop in ("display",):
+                if value not in ("block", "inline", "list-item"):
+                    raise StoryUnsupported(f"display: {value}")
+                declarations.append(f"display: {value}")
+            elif prop == "position":
+                if value not in ("static", "relative"):
+                    raise StoryUnsupported(f"position: {value}")
+                if value == "relative" and any(style.get(side, "auto") not in ("auto", "0", "0px")
+                                               for side in ("top", "right", "bottom", "left")):
+                    raise StoryUnsupported("relative offsets")
+            elif prop in ("top", "right", "bottom", "left") and style.get("position", "static") != "absolute":
+                continue
+            elif prop == "height" and node.parent is not None and node.parent.tag == "body":
+                # The builder sizes its preview page; it doesn't clip or shift the content
+                continue
+            elif prop in NEUTRAL_VALUES:
+                if value not in NEUTRAL_VALUES[prop]:
+                    raise StoryUnsupported(f"{prop}: {value}")
+            elif prop in FLEX_PROPERTIES or prop == "text-transform":
+                continue
+            elif prop in DROPPED_PROPERTIES or prop.startswith(DROPPED_PREFIXES):
+                continue
+            else:
+                raise StoryUnsupported(f"CSS property {prop}")
+        # Written into a double-quoted style attribute
+        return "; ".join(declarations).replace('"', "'")
+
+    def _inherited(self, story_style: str) -> str:
+        kept = [d for d in story_style.split("; ") if d.split(":", 1)[0] in INHERITED_PROPERTIES]
+        return "; ".join(kept + ["margin: 0", "padding: 0"])
+
+    def _children(self, node: _Node, chain: List[str], font_pt: float, transform: Optional[str],
+                  skip=()) -> str:
+        out = []
+        for child in node.children:
+            if isinstance(child, str):
+                if child.strip():
+                    _check_font(node)
+                text = _transform_text(child, transform)
+                self.text.append(text)
+                out.append(html_lib.escape(text, quote=False))
+            elif child not in skip:
+                out.append(self._element(child, chain, font_pt, transform))
+        return "".join(out)
+
+    def _inline(self, node: _Node, chain: List[str], font_pt: float, transform: Optional[str]) -> str:
+        """A flex item rendered as inline content for an overlay or a nowrap line."""
+        text_mark = len(self.text)
+        style = dict(node.style)
+        style.pop("display", None)
+        style.pop("min-width", None)
+        if style.get("position") == "absolute":
+            if style.get("left", "0") not in ("0", "0px") or style.get("top", "auto") not in ("auto", "0", "0px"):
+                raise StoryUnsupported("absolute position other than left: 0")
+            for prop in ("position", "left", "top"):
+                style.pop(prop, None)
+        for prop in ("margin-top", "margin-bottom", "padding-top", "padding-bottom"):
+            if _length_pt(style.pop(prop, "0"), font_pt):
+                raise StoryUnsupported(f"vertical {prop} on a flex item")
+        font_pt = _font_size_pt(style.get("font-size"), font_pt)
+        space_before, space_after = self._inline_spacing(style, font_pt)
+        transform = style.get("text-transform", transform)
+        if node.style.get("display") == "flex":
+            inner = self._gap_row(node, chain, font_pt, transform)
+        else:
+            inner = self._children(node, chain, font_pt, transform)
+        if any(isinstance(c, _Node) and c.tag in BLOCK_TAGS for c in node.children):
+            raise StoryUnsupported("block content in a flex item")
+        tag = node.tag if node.tag in INLINE_TAGS else "span"
+        attrs = f' href="{html_lib.escape(node.attrs["href"])}"' if tag == "a" and node.attrs.get("href") else ""
+        self._inline_gap(text_mark)
+        return (f'{_spacer(space_before)}<{tag}{attrs} style="{self._story_style(node, style, font_pt)}">'
+                f'{inner}</{tag}>{_spacer(space_after)}')
+
+    @staticmethod
+    def _inline_spacing(style: Dict[str, str], font_pt: float) -> Tuple[float, float]:
+        """Pop an inline box's horizontal margins and padding, as pt before and after its content."""
+        return tuple(sum(_length_pt(style.pop(f"{box}-{side}", "0"), font_pt) for box in ("margin", "padding"))
+                     for side in ("left", "right"))
+
+    def _inline_gap(self, mark: int) -> None:
+        # Flex items are separate boxes: their text never joins the neighbour's words
+        if mark < len(self.text):
+            self.text.insert(mark, "\n")
+            self.text.append("\n")
+
+    def _gap_row(self, node: _Node, chain: List[str], font_pt: float, transform: Optional[str]) -> str:
+        """``display: flex`` with inline items and a gap, as one nowrap line."""
+        items = self._flex_items(node)
+        if node.style.get("justify-content", "normal") not in ("normal", "flex-start", "start"):
+            raise StoryUnsupported(f"justify-content: {node.style['justify-content']}")
+        gap = _length_pt(node.style.get("gap", node.style.get("column-gap", "0")), font_pt)
+        return _spacer(gap).join(self._inline(item, chain, font_pt, transform) for item in items)
+
+    def _flex_items(self, node: _Node) -> List[_Node]:
+        if any(isinstance(c, str) and c.strip() for c in node.children):
+            raise StoryUnsupported("text directly inside a flex container")
+        if node.style.get("flex-direction", "row") != "row" or node.style.get("flex-wrap", "nowrap") != "nowrap":
+            raise StoryUnsupported("flex-direction/flex-wrap")
+        if node.style.get("align-items", "normal") not in ("normal", "baseline", "flex-start", "start", "stretch"):
+            raise StoryUnsupported(f"align-items: {node.style['align-items']}")
+        return [c for c in node.elements() if c.style.get("position") != "absolute"
+                and c.style.get("display") != "none"]
+
+    def _element(self, node: _Node, chain: List[str], parent_pt: float, transform: Optional[str]) -> str:
+        style = dict(node.style)
+        if style.get("display") == "none":
+            return ""
+        font_pt = _font_size_pt(style.get("font-size"), parent_pt)
+        transform = style.get("text-transform", transform)
+        if transform not in (None, "none", "uppercase", "lowercase", "capitalize"):
+            raise StoryUnsupported(f"text-transform: {transform}")
+        if node.tag == "br":
+            self.text.append("\n")
+            return "<br>"
+
+        display = style.get("display", "inline" if node.tag in INLINE_TAGS else "block")
+        absolute = [c for c in node.elements() if c.style.get("position") == "absolute"
+                    and c.style.get("display") != "none"]
+        skip = set(absolute)
+        before: List[Tuple[str, Union[float, str], str]] = []  # (side, width, inline html) overlays
+        body_html = None
+        lead_html = ""  # inline content hung in the left padding by a negative text-indent
+
+        if display == "inline-block":
+            if node.elements():
+                raise StoryUnsupported("display: inline-block")
+            style["display"] = display = "inline"
+        if display in ("inline-flex", "grid", "inline-grid", "table", "table-cell", "table-row"):
+            raise StoryUnsupported(f"display: {display}")
+
+        story_style_probe = self._inherited(self._story_style(node, {k: v for k, v in style.items()
+                                                                     if k in PASS_PROPERTIES}, font_pt))
+        inner_chain = chain + [story_style_probe]
+
+        if absolute:
+            # Bullets: absolutely positioned at the left edge of a relative parent's padding
+            if style.get("position") != "relative":
+                raise StoryUnsupported("absolute child without a relative parent")
+            padding = _length_pt(style.get("padding-left", "0"), font_pt)
+            hang = (display != "flex" and len(absolute) == 1 and not _length_pt(style.get("text-indent", "0"), font_pt)
+                    and all(_is_inline(child) for child in node.elements() if child not in skip))
+            for child in absolute:
+                mark = len(self.text)
+                bullet_html = self._inline(child, inner_chain, font_pt, transform)
+                self._inline_gap(mark)
+                if hang:
+                    index = self._measure(inner_chain, bullet_html)
+                    style["text-indent"] = f"{-padding:.2f}pt"
+                    lead_html = bullet_html + _spacer(self._defer(lambda w, i=index, p=padding: max(0.0, p - w[i])))
+                else:
+                    before.append(("left", padding, bullet_html))
+
+        if display == "flex":
+            items = self._flex_items(node)
+            justify = style.get("justify-content", "normal")
+            style["display"] = "block"
+            if len(items) == 2 and justify == "space-between":
+                left, right = items
+                mark = len(self.text)
+                right_html = self._inline(right, inner_chain, font_pt, transform)
+                self._inline_gap(mark)
+                index = self._measure(inner_chain, right_html)
+                if _length_pt(style.get("padding-right", "0"), font_pt):
+                    raise StoryUnsupported("padding-right on a split row")
+                width = self._defer(lambda w, i=index: w[i])
+                style["padding-right"] = f"{width}pt"
+                before.append(("right", width, right_html))
+                skip |= {right}
+                body_html = self._flex_child(left, inner_chain, font_pt, transform)
+            elif len(items) == 2 and items[0].style.get("min-width") and justify in ("normal", "flex-start", "start"):
+                label, value = items
+                if value.style.get("flex", "1") not in ("1", "1 1 0%", "1 1 0", "auto") and "flex" in value.style:
+                    raise StoryUnsupported(f"flex: {value.style['flex']}")
+                mark = len(self.text)
+                label_html = self._inline(label, inner_chain, font_pt, transform)
+                self._inline_gap(mark)
+                minimum = _length_pt(label.style["min-width"], font_pt)
+                padding = _length_pt(style.get("padding-left", "0"), font_pt)
+                index = self._measure(inner_chain, label_html)
+                style["padding-left"] = self._defer(lambda w, i=index, m=minimum, p=padding: max(m, w[i]) + p) + "pt"
+                skip |= {label}
+                if _is_inline(value) and not _length_pt(style.get("text-indent", "0"), font_pt):
+                    # The label hangs in the padding on the value's first line
+                    style["text-indent"] = self._defer(lambda w, i=index, m=minimum: -max(m, w[i])) + "pt"
+                    mark = len(self.text)
+                    value_html = self._inline(value, inner_chain, font_pt, transform)
+                    self._inline_gap(mark)
+                    body_html = (label_html + _spacer(self._defer(lambda w, i=index, m=minimum: max(m, w[i]) - w[i]))
+                                 + value_html)
+                else:
+                    before.append(("left", self._defer(lambda w, i=index, m=minimum: max(m, w[i])), label_html))
+                    body_html = self._flex_child(value, inner_chain, font_pt, transform)
+            elif len(items) <= 1 and justify in ("normal", "flex-start", "start", "space-between"):
+                body_html = "".join(self._flex_child(item, inner_chain, font_pt, transform) for item in items)
+            elif all(item.tag in INLINE_TAGS and not any(c.tag in BLOCK_TAGS for c in item.walk()) for item in items):
+                style["white-space"] = "nowrap"
+                mark = len(self.text)
+                body_html = self._gap_row(node, inner_chain, font_pt, transform)
+                self._inline_gap(mark)
+            else:
+                raise StoryUnsupported(f"flex layout with {len(items)} items ({justify})")
+            for prop in FLEX_PROPERTIES:
+                style.pop(prop, None)
+
+        if style.get("position") == "relative" and absolute:
+            style.pop("position")
+        if style.get("position") == "absolute":
+            raise StoryUnsupported("absolute position outside a bullet")
+        is_block = display in ("block", "list-item", "flex") or node.tag in BLOCK_TAGS and display != "inline"
+        space_before = space_after = 0.0
+        if not is_block and node.tag not in ("html", "body"):
+            space_before, space_after = self._inline_spacing(style, font_pt)
+        story_style = self._story_style(node, style, font_pt)
+
+        anchor = None
+        if before:
+            anchor = self._anchor_id()
+            for side, width, html in before:
+                self.overlays.append(_Overlay(anchor, side, width, self._context(inner_chain, html)))
+
+        if is_block or space_before:
+            self.text.append("\n")
+        if display == "list-item":
+            self.text.append(_list_marker(node) + " ")
+        if body_html is None:
+            body_html = lead_html + self._children(node, inner_chain, font_pt, transform, skip)
+        if is_block or space_after:
+            self.text.append("\n")
+
+        if node.tag in ("html", "body"):
+            return f'<{node.tag} style="{story_style}">{body_html}</{node.tag}>'
+        tag = node.tag if not (display == "block" and node.tag in INLINE_TAGS) else "div"
+        attrs = f' id="{anchor}"' if anchor else ""
+        if node.tag == "a" and node.attrs.get("href"):
+            attrs += f' href="{html_lib.escape(node.attrs["href"])}"'
+        return f'{_spacer(space_before)}<{tag}{attrs} style="{story_style}">{body_html}</{tag}>{_spacer(space_after)}'
+
+    def _flex_child(self, item: _Node, chain: List[str], font_pt: float, transform: Optional[str]) -> str:
+        """A flex item kept in the flow: blockified like the browser does."""
+        item.style.pop("flex", None)
+        if item.style.get("display", "inline") in ("inline", "inline-block"):
+            item.style["display"] = "block"
+        return self._element(item, chain, font_pt, transform)
+
+
+# -- rendering -----------------------------------------------------------------
+
+
+def _page_geometry(pdf_options: Dict[str, Any]) -> Tuple[fitz.Rect, fitz.Rect]:
+    unknown = set(pdf_options) - {"format", "print_background", "margin", "prefer_css_page_size"}
+    if unknown:
+        raise StoryUnsupported(f"pdf options {sorted(unknown)}")
+    try:
+        page = fitz.paper_rect(str(pdf_options.get("format", "Letter")).lower())
+    except Exception:
+        raise StoryUnsupported(f"page format {pdf_options.get('format')!r}")
+    if page.is_empty:
+        raise StoryUnsupported(f"page format {pdf_options.get('format')!r}")
+    margin = pdf_options.get("margin") or {}
+    sides = [_length_pt(str(margin.get(side, "0")), ROOT_FONT_PT) for side in ("left", "top", "right", "bottom")]
+    return page, fitz.Rect(sides[0], sides[1], page.width - sides[2], page.height - sides[3])
+
+
+def _check_fidelity(document: fitz.Document, expected: Counter, content: fitz.Rect) -> None:
+    found: Counter = Counter()
+    for page in document:
+        for x0, y0, x1, y1, word, *_ in page.get_text("words"):
+            if x0 < content.x0 - 1 or x1 > content.x1 + 1 or y1 > content.y1 + 1:
+                raise StoryFidelityError(f"text outside the page area on page {page.number + 1}: {word!r}")
+            found.update(_words(word))
+    if found != expected:
+        # A gap narrower than ~0.15em may or may not split a word when extracted;
+        # only characters that went missing or appeared count as lost text
+        if _characters(found) == _characters(expected):
+            return
+        missing, extra = expected - found, found - expected
+        raise StoryFidelityError(f"{sum(missing.values())} words missing, {sum(extra.values())} unexpected "
+                                 f"(e.g. {list((missing or extra).keys())[:3]})")
+
+
+def render_story_pdf(body_html: str, css: str, pdf_options: Dict[str, Any]) -> bytes:
+    """
+    Render the builder's resume HTML (the fragment, not a full page) and its
+    stylesheet with PyMuPDF Story. Raises StoryUnsupported before any layout
+    when the document is outside the subset, StoryFidelityError when the
+    result lost text.
+    """
+    if not story_fonts_complete():
+        raise StoryUnsupported("bundled fonts without a TrueType/OpenType copy")
+    # MuPDF contexts are not thread-safe; renders in one process take turns
+    with _mupdf_lock:
+        return _render_story_pdf(body_html, css, pdf_options)
+
+
+def _render_story_pdf(body_html: str, css: str, pdf_options: Dict[str, Any]) -> bytes:
+    page_rect, content = _page_geometry(pdf_options)
+    document = _StoryDocument(body_html, css)
+    story = fitz.Story(document.html, user_css=document.font_css, archive=document.archive)
+    overlays: Dict[str, List[_Overlay]] = {}
+    for overlay in document.overlays:
+        overlays.setdefault(overlay.anchor, []).append(overlay)
+
+    buffer = io.BytesIO()
+    writer = fitz.DocumentWriter(buffer)
+    links = []
+    page_number, more = 0, 1
+    while more:
+        device = writer.begin_page(page_rect)
+        more, _ = story.place(content)
+        anchors = []
+
+        def collect(position):
+            if position.href:
+                links.append((position.page, fitz.Rect(position.rect), position.href))
+            if position.id in overlays and position.open_close & 1:
+                anchors.append((position.id, fitz.Rect(position.rect)))
+
+        story.element_positions(collect, {"page": page_number})
+        story.draw(device)
+        for anchor, rect in anchors:
+            for overlay in overlays.pop(anchor):
+                if overlay.side == "right":
+                    box = fitz.Rect(rect.x0, rect.y0, rect.x1 + overlay.width, content.y1)
+                    html = f'<div style="text-align: right; white-space: nowrap">{overlay.html}</div>'
+                else:
+                    box = fitz.Rect(rect.x0 - overlay.width - 0.01, rect.y0, rect.x0, content.y1)
+                    html = f'<div style="text-align: left; white-space: nowrap">{overlay.html}</div>'
+                side_story = fitz.Story(html, user_css=document.overlay_css, archive=document.archive)
+                side_story.place(box)
+                side_story.element_positions(
+                    lambda position: links.append((position.page, fitz.Rect(position.rect), position.href))
+                    if position.href else None, {"page": page_number})
+                side_story.draw(device)
+        writer.end_page()
+        page_number += 1
+        if page_number > 50:
+            raise StoryFidelityError("layout did not terminate")
+    writer.close()
+
+    result = fitz.open("pdf", buffer.getvalue())
+    # Story reports a link once per word; one clickable area per line of it
+    areas: Dict[Tuple[int, str, float], fitz.Rect] = {}
+    for page, rect, href in links:
+        if href.startswith(("http://", "https://", "mailto:", "tel:")):
+            key = (page, href, round(rect.y1))
+            areas[key] = areas[key] | rect if key in areas else rect
+    for (page, href, _), rect in areas.items():
+        result[page].insert_link({"kind": fitz.LINK_URI, "from": rect, "uri": href})
+    _check_fidelity(result, Counter(_words("".join(document.text))), content)
+    # Every Story embeds its own copy of each font it uses; keep one subset of each
+    result.subset_fonts()
+    return result.tobytes(garbage=4, deflate=True)
+
+
+class StoryStats:
+    """How /generate-pdf renders were routed between the engines."""
+
+    MAX_REASONS = 50
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.story_renders = 0
+        # Chromium because Story couldn't take the document / because PDF_ENGINE says so
+        self.fallbacks = 0
+        self.disabled = 0
+        self.fidelity_failures = 0
+        self.errors = 0
+        self.unsupported: Counter = Counter()
+        self.story_seconds = 0.0
+
+    def record_story(self, seconds: float) -> None:
+        with self._lock:
+            self.story_renders += 1
+            self.story_seconds += seconds
+
+    def record_fallback(self, kind: str, reason: str = "") -> None:
+        with self._lock:
+            self.fallbacks += 1
+            if kind == "unsupported" and (reason in self.unsupported or len(self.unsupported) < self.MAX_REASONS):
+                self.unsupported[reason] += 1
+            elif kind == "fidelity":
+                self.fidelity_failures += 1
+            elif kind == "error":
+                self.errors += 1
+
+    def record_disabled(self) -> None:
+        with self._lock:
+            self.disabled += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "engine": PDF_ENGINE,
+                "story_renders": self.story_renders,
+                "chromium_renders": self.fallbacks + self.disabled,
+                "fallbacks": self.fallbacks,
+                "disabled": self.disabled,
+                "fidelity_failures": self.fidelity_failures,
+                "errors": self.errors,
+                "unsupported": dict(self.unsupported.most_common(10)),
+                "avg_story_ms": round(self.story_seconds / self.story_renders * 1000, 1) if self.story_renders else 0.0,
+            }
+
+
+story_stats = StoryStats()
+
+
+def render_resume_pdf(body_html: str, css: str, page_html: str, pdf_options: Dict[str, Any]) -> bytes:
+    """
+    Export engine selection: Story when PDF_ENGINE allows it and the document
+    fits the subset, otherwise the pooled Chromium on ``page_html``.
+    """
+    if PDF_ENGINE == "auto":
+        started = time.perf_counter()
+        try:
+            pdf_bytes = render_story_pdf(body_html, css, pdf_options)
+            story_stats.record_story(time.perf_counter() - started)
+            return pdf_bytes
+        except StoryUnsupported as e:
+            logger.info(f"Story engine can't render this document ({e}); using Chromium")
+            story_stats.record_fallback("unsupported", str(e))
+        except StoryFidelityError as e:
+            logger.warning(f"Story render failed the fidelity check ({e}); using Chromium")
+            story_stats.record_fallback("fidelity")
+        except Exception as e:
+            logger.warning(f"Story render failed ({e}); using Chromium")
+            story_stats.record_fallback("error")
+    else:
+        story_stats.record_disabled()
+    from app.pdf_renderer import render_pdf
+    return render_pdf(page_html, pdf_options)
+
+
+def get_story_stats() -> Dict[str, Any]:
+    return story_stats.snapshot()
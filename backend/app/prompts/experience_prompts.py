@@ -3,9 +3,13 @@ Prompts for Experience section AI assistance
 """
 import json
 from typing import Dict, Optional
+from app.prompts.json_extraction import extract_suggestion
 
 class ExperiencePrompts:
     
+    # List field whose items are streamed one by one as they complete
+    ITEM_KEY = 'experiences'
+    
     @staticmethod
     def get_system_prompt(context: Dict) -> str:
         target_job = context.get('target_job', 'Software Engineer')
@@ -126,77 +130,39 @@ When you have enough information, respond with VALID JSON (NO text before or aft
 Start by warmly greeting the user and asking about their role details!"""
 
     @staticmethod
-    def extract_json_from_text(content: str) -> Optional[str]:
-        """Extract JSON from text"""
-        brace_depth = 0
-        start_idx = -1
-        
-        for i, char in enumerate(content):
-            if char == '{':
-                if brace_depth == 0:
-                    start_idx = i
-                brace_depth += 1
-            elif char == '}':
-                brace_depth -= 1
-                if brace_depth == 0 and start_idx != -1:
-                    potential_json = content[start_idx:i+1]
-                    try:
-                        parsed = json.loads(potential_json)
-                        if parsed.get('type') == 'suggestion' and 'experiences' in parsed:
-                            return potential_json
-                    except:
-                        continue
-        return None
+    def extract_json_from_text(content: str) -> Optional[Dict]:
+        """
+        Find the suggestion JSON in text that might have surrounding content.
+        Handles cases like "Here's a suggestion: {json}", markdown fences and
+        code snippets; returns the decoded object.
+        """
+        return extract_suggestion(content, 'experiences')
     
     @staticmethod
     def is_json_response(content: str) -> bool:
         """Check if response is JSON suggestion format"""
-        try:
-            parsed = json.loads(content.strip())
-            return parsed.get('type') == 'suggestion' and 'experiences' in parsed
-        except:
-            extracted = ExperiencePrompts.extract_json_from_text(content)
-            if extracted:
-                try:
-                    parsed = json.loads(extracted)
-                    return parsed.get('type') == 'suggestion' and 'experiences' in parsed
-                except:
-                    pass
-            return False
+        return ExperiencePrompts.extract_json_from_text(content) is not None
     
     @staticmethod
     def parse_json_suggestion(content: str) -> Optional[Dict]:
-        """Parse JSON suggestion response"""
+        """
+        Parse JSON suggestion response.
+        Handles both pure JSON and JSON embedded in text.
+        """
         try:
-            content_stripped = content.strip()
-            
-            if content_stripped.startswith('```json'):
-                content_stripped = content_stripped[7:]
-            if content_stripped.startswith('```'):
-                content_stripped = content_stripped[3:]
-            if content_stripped.endswith('```'):
-                content_stripped = content_stripped[:-3]
-            
-            content_stripped = content_stripped.strip()
-            
-            try:
-                parsed = json.loads(content_stripped)
-                if parsed.get('type') == 'suggestion' and 'experiences' in parsed:
-                    return ExperiencePrompts._validate_suggestion(parsed)
-            except json.JSONDecodeError:
-                pass
-            
-            extracted_json = ExperiencePrompts.extract_json_from_text(content)
-            if extracted_json:
-                parsed = json.loads(extracted_json)
-                if parsed.get('type') == 'suggestion' and 'experiences' in parsed:
-                    return ExperiencePrompts._validate_suggestion(parsed)
-            
-            return None
+            parsed = ExperiencePrompts.extract_json_from_text(content)
+            if parsed is None:
+                return None
+            return ExperiencePrompts._validate_suggestion(parsed)
         except Exception as e:
             print(f"JSON parse error: {e}")
             return None
     
+    @staticmethod
+    def validate_item(item: Dict) -> bool:
+        """Check one streamed experience with the same rules as a full suggestion"""
+        return isinstance(item, dict) and ExperiencePrompts._validate_suggestion({'experiences': [item]}) is not None
+    
     @staticmethod
     def _validate_suggestion(parsed: Dict) -> Optional[Dict]:
         """Validate suggestion structure"""
@@ -0,0 +1,59 @@
+"""
+Shared JSON extraction for the assistant prompt classes
+Finds the suggestion object in a model response that may wrap it in prose,
+markdown fences or code snippets. Candidates are decoded in place with
+JSONDecoder.raw_decode, so strings containing braces are handled by the JSON
+grammar itself, each candidate is decoded at most once, and a decoded
+non-matching object is skipped as a whole. A suggestion cut off by the
+token limit is salvaged through the JSON repair layer.
+"""
+import json
+import re
+from typing import Any, Callable, Dict, Optional
+
+from app.json_repair import repair_json, repair_stats
+
+_decoder = json.JSONDecoder()
+# A JSON object opens with a key or closes immediately. Skipping other braces
+# (code blocks, prose) up front matters: every failed decode builds a
+# JSONDecodeError whose line/column computation is linear in the offset.
+_OBJECT_START = re.compile(r'\{\s*["}]')
+_SUGGESTION_START = re.compile(r'\{\s*"type"\s*:\s*"suggestion"')
+
+
+def find_json_object(content: str, predicate: Callable[[Dict], bool] = None) -> Optional[Dict[str, Any]]:
+    """First top-level JSON object in ``content`` accepted by ``predicate``, already decoded."""
+    match = _OBJECT_START.search(content)
+    while match:
+        pos = match.start()
+        try:
+            obj, end = _decoder.raw_decode(content, pos)
+        except json.JSONDecodeError:
+            # Not JSON at this brace; an object may still start inside it
+            match = _OBJECT_START.search(content, pos + 1)
+            continue
+        if isinstance(obj, dict) and (predicate is None or predicate(obj)):
+            return obj
+        match = _OBJECT_START.search(content, end)
+    return None
+
+
+def extract_suggestion(content: str, required_key: str = None) -> Optional[Dict[str, Any]]:
+    """The first {"type": "suggestion", ...} object in ``content`` that has ``required_key``."""
+    def is_suggestion(obj):
+        return obj.get('type') == 'suggestion' and (required_key is None or required_key in obj)
+
+    suggestion = find_json_object(content, is_suggestion)
+    if suggestion is not None:
+        return suggestion
+
+    # No complete suggestion: the reply may have hit max_tokens mid-object
+    match = _SUGGESTION_START.search(content)
+    if match is None:
+        return None
+    repaired, _ = repair_json(content[match.start():])
+    if isinstance(repaired, dict) and is_suggestion(repaired):
+        repair_stats.record("repaired")
+        return repaired
+    repair_stats.record("unrecoverable")
+    return None
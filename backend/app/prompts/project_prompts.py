@@ -5,9 +5,13 @@ Enforces formatting standards and best practices
 import json
 import re
 from typing import Dict, List, Optional
+from app.prompts.json_extraction import extract_suggestion
 
 class ProjectPrompts:
     
+    # List field whose items are streamed one by one as they complete
+    ITEM_KEY = 'projects'
+    
     @staticmethod
     def get_system_prompt(context: Dict) -> str:
         target_job = context.get('target_job', 'Software Engineer')
@@ -156,56 +160,18 @@ When information is missing, ask specific questions:
 Begin by warmly greeting the user and asking about their project!"""
 
     @staticmethod
-    def extract_json_from_text(content: str) -> Optional[str]:
+    def extract_json_from_text(content: str) -> Optional[Dict]:
         """
-        Extract JSON from text that might have surrounding content.
-        Handles cases like "Here's a suggestion: {json}" or "text {json} more text"
+        Find the suggestion JSON in text that might have surrounding content.
+        Handles cases like "Here's a suggestion: {json}", markdown fences and
+        code snippets; returns the decoded object.
         """
-        # Try to find JSON object boundaries
-        # Look for outermost { ... } that contains "type": "suggestion"
-        
-        # Find all potential JSON objects
-        brace_depth = 0
-        start_idx = -1
-        
-        for i, char in enumerate(content):
-            if char == '{':
-                if brace_depth == 0:
-                    start_idx = i
-                brace_depth += 1
-            elif char == '}':
-                brace_depth -= 1
-                if brace_depth == 0 and start_idx != -1:
-                    # Found a complete JSON object
-                    potential_json = content[start_idx:i+1]
-                    
-                    # Check if it's a suggestion JSON
-                    try:
-                        parsed = json.loads(potential_json)
-                        if parsed.get('type') == 'suggestion':
-                            return potential_json
-                    except:
-                        continue
-        
-        return None
+        return extract_suggestion(content, 'projects')
     
     @staticmethod
     def is_json_response(content: str) -> bool:
         """Check if response is JSON suggestion format"""
-        try:
-            # First try direct parse
-            parsed = json.loads(content.strip())
-            return parsed.get('type') == 'suggestion' and 'projects' in parsed
-        except:
-            # Try extracting JSON from text
-            extracted = ProjectPrompts.extract_json_from_text(content)
-            if extracted:
-                try:
-                    parsed = json.loads(extracted)
-                    return parsed.get('type') == 'suggestion' and 'projects' in parsed
-                except:
-                    pass
-            return False
+        return ProjectPrompts.extract_json_from_text(content) is not None
     
     @staticmethod
     def parse_json_suggestion(content: str) -> Optional[Dict]:
@@ -214,41 +180,19 @@ Begin by warmly greeting the user and asking about their project!"""
         Handles both pure JSON and JSON embedded in text.
         """
         try:
-            # First, try direct parse (for pure JSON responses)
-            content_stripped = content.strip()
-            
-            # Remove markdown code blocks if present
-            if content_stripped.startswith('```json'):
-                content_stripped = content_stripped[7:]
-            if content_stripped.startswith('```'):
-                content_stripped = content_stripped[3:]
-            if content_stripped.endswith('```'):
-                content_stripped = content_stripped[:-3]
-            
-            content_stripped = content_stripped.strip()
-            
-            # Try parsing directly
-            try:
-                parsed = json.loads(content_stripped)
-                if parsed.get('type') == 'suggestion' and 'projects' in parsed:
-                    # Validate structure
-                    return ProjectPrompts._validate_suggestion(parsed)
-            except json.JSONDecodeError:
-                pass
-            
-            # If direct parse failed, try extracting JSON from surrounding text
-            extracted_json = ProjectPrompts.extract_json_from_text(content)
-            if extracted_json:
-                parsed = json.loads(extracted_json)
-                if parsed.get('type') == 'suggestion' and 'projects' in parsed:
-                    return ProjectPrompts._validate_suggestion(parsed)
-            
-            return None
-            
+            parsed = ProjectPrompts.extract_json_from_text(content)
+            if parsed is None:
+                return None
+            return ProjectPrompts._validate_suggestion(parsed)
         except Exception as e:
             print(f"JSON parse error: {e}")
             return None
     
+    @staticmethod
+    def validate_item(item: Dict) -> bool:
+        """Check one streamed project with the same rules as a full suggestion"""
+        return isinstance(item, dict) and ProjectPrompts._validate_suggestion({'projects': [item]}) is not None
+    
     @staticmethod
     def _validate_suggestion(parsed: Dict) -> Optional[Dict]:
         """Validate suggestion structure"""
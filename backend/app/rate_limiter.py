@@ -0,0 +1,330 @@
+"""
+Cross-worker rate limiting
+Token buckets for Groq's requests-per-minute and tokens-per-minute budgets,
+and sliding-window request counters for per-user quotas. State lives in
+local SQLite files, so every gunicorn worker and every caller on the host
+draws from the same budget.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when budget could not be acquired before the caller's deadline."""
+
+
+class TokenBucketLimiter:
+    """
+    Two token buckets per key: one refilled at ``requests_per_minute``
+    and one at ``tokens_per_minute``. Each bucket holds at most one
+    minute of budget. A request needs 1 request token plus its
+    estimated LLM tokens. ``limits`` overrides both rates for given keys
+    as {key: (requests_per_minute, tokens_per_minute)}.
+    """
+
+    def __init__(self, path: str, requests_per_minute: int, tokens_per_minute: int,
+                 limits: Optional[Dict[str, Tuple[int, int]]] = None):
+        self.path = path
+        self.requests_per_minute = max(1, requests_per_minute)
+        self.tokens_per_minute = max(1, tokens_per_minute)
+        self.limits = {key: (max(1, rpm), max(1, tpm)) for key, (rpm, tpm) in (limits or {}).items()}
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.acquired = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " name TEXT PRIMARY KEY, level REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def limits_for(self, key: str) -> Tuple[int, int]:
+        """(requests_per_minute, tokens_per_minute) for ``key``."""
+        return self.limits.get(key, (self.requests_per_minute, self.tokens_per_minute))
+
+    def _buckets(self, key: str):
+        rpm, tpm = self.limits_for(key)
+        return (
+            (f"{key}:requests", float(rpm), rpm / 60.0),
+            (f"{key}:tokens", float(tpm), tpm / 60.0),
+        )
+
+    def _take(self, key: str, tokens: int) -> float:
+        """
+        Atomically take budget if both buckets have it.
+        Returns 0 on success, otherwise the seconds until it would be available.
+        """
+        conn = self._connect()
+        now = time.time()
+        needs = (1.0, float(min(tokens, self.limits_for(key)[1])))
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            levels = []
+            for (name, capacity, rate), need in zip(self._buckets(key), needs):
+                row = conn.execute(
+                    "SELECT level, updated_at FROM buckets WHERE name = ?", (name,)
+                ).fetchone()
+                level = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+                levels.append((name, level, rate, need))
+
+            wait = max((need - level) / rate if level < need else 0.0
+                       for _, level, rate, need in levels)
+            for name, level, _, need in levels:
+                new_level = level - need if wait <= 0 else level
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets (name, level, updated_at) VALUES (?, ?, ?)",
+                    (name, new_level, now),
+                )
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def try_acquire(self, tokens: int = 0, deadline: Optional[float] = None, key: str = "default") -> bool:
+        """
+        Acquire one request plus ``tokens`` of budget for ``key``.
+        Without a deadline this makes a single non-blocking attempt. With an
+        absolute ``deadline`` (time.time() based) it waits only while the
+        budget will be available before the deadline.
+        """
+        start = time.time()
+        while True:
+            wait = self._take(key, tokens)
+            now = time.time()
+            if wait <= 0:
+                with self._stats_lock:
+                    self.acquired += 1
+                    self.total_wait_seconds += now - start
+                return True
+            if deadline is None or now + wait > deadline:
+                with self._stats_lock:
+                    self.rejected += 1
+                return False
+            time.sleep(min(wait, max(deadline - now, 0)))
+
+    async def try_acquire_async(self, tokens: int = 0, deadline: Optional[float] = None,
+                                key: str = "default") -> bool:
+        """try_acquire for asyncio callers: the SQLite step runs in a thread and waits don't block the loop."""
+        start = time.time()
+        while True:
+            wait = await asyncio.to_thread(self._take, key, tokens)
+            now = time.time()
+            if wait <= 0:
+                with self._stats_lock:
+                    self.acquired += 1
+                    self.total_wait_seconds += now - start
+                return True
+            if deadline is None or now + wait > deadline:
+                with self._stats_lock:
+                    self.rejected += 1
+                return False
+            await asyncio.sleep(min(wait, max(deadline - now, 0)))
+
+    def acquire(self, tokens: int = 0, timeout: float = 0, key: str = "default") -> None:
+        """Like try_acquire with a relative timeout, raising RateLimitExceeded on failure."""
+        if not self.try_acquire(tokens, time.time() + timeout, key):
+            raise RateLimitExceeded(
+                f"Rate limit budget for {key} not available within {timeout:.1f}s"
+            )
+
+    def adjust_tokens(self, delta: int, key: str = "default") -> None:
+        """
+        Return (positive) or charge (negative) tokens after the real usage is
+        known. Charging may push the bucket below zero, which delays later callers.
+        """
+        if not delta:
+            return
+        name, capacity, rate = self._buckets(key)[1]
+        conn = self._connect()
+        now = time.time()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.Error as e:
+            logger.warning(f"Token bucket adjustment skipped for {key}: {e}")
+            return
+        try:
+            row = conn.execute(
+                "SELECT level, updated_at FROM buckets WHERE name = ?", (name,)
+            ).fetchone()
+            level = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (name, level, updated_at) VALUES (?, ?, ?)",
+                (name, min(capacity, level + delta), now),
+            )
+            conn.execute("COMMIT")
+        except Exception as e:
+            conn.execute("ROLLBACK")
+            logger.warning(f"Token bucket adjustment failed for {key}: {e}")
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            return {
+                "requests_per_minute": self.requests_per_minute,
+                "tokens_per_minute": self.tokens_per_minute,
+                "limits": {key: {"requests_per_minute": rpm, "tokens_per_minute": tpm}
+                           for key, (rpm, tpm) in self.limits.items()},
+                "acquired": self.acquired,
+                "rejected": self.rejected,
+                "total_wait_seconds": round(self.total_wait_seconds, 3),
+            }
+
+
+class SlidingWindowLimiter:
+    """
+    Request counters over a sliding ``window_seconds`` window, using the
+    sliding-window-counter approximation: each key keeps the count of the
+    current fixed window and the previous one, and the previous count is
+    weighted by how much of it still overlaps the sliding window. A key is
+    one compact row (hashed key, window index, two counts). Rows that haven't
+    been touched for two windows are expired by a periodic prune.
+    """
+
+    def __init__(self, path: str, window_seconds: float, prune_interval: float = 600):
+        self.path = path
+        self.window_seconds = max(1.0, window_seconds)
+        self.prune_interval = prune_interval
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._last_prune = 0.0
+        self.allowed = 0
+        self.rejected = 0
+        self.expired = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS windows ("
+            " key BLOB PRIMARY KEY, window INTEGER NOT NULL,"
+            " current INTEGER NOT NULL, previous INTEGER NOT NULL) WITHOUT ROWID"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS windows_by_window ON windows (window)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _key(key: str) -> bytes:
+        # Fixed 12 bytes however long the client-supplied session id is
+        return hashlib.blake2b(key.encode("utf-8"), digest_size=12).digest()
+
+    def _counts(self, conn: sqlite3.Connection, key: bytes, window: int) -> Tuple[int, int]:
+        """(current, previous) counts for ``key`` as of ``window``."""
+        row = conn.execute(
+            "SELECT window, current, previous FROM windows WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[0] < window - 1:
+            return 0, 0
+        if row[0] == window - 1:
+            return 0, row[1]
+        return row[1], row[2]
+
+    def hit(self, limits: Sequence[Tuple[str, int]]) -> Tuple[Optional[int], List[float]]:
+        """
+        Count one request against every (key, limit) pair, atomically: either
+        all counters are incremented or none are. Returns the index of the
+        first limit that is exhausted (None when allowed) and the sliding
+        count for each key, including this request when it was allowed.
+        """
+        now = time.time()
+        window, offset = divmod(now, self.window_seconds)
+        window = int(window)
+        overlap = 1.0 - offset / self.window_seconds
+        keys = [self._key(key) for key, _ in limits]
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            counts = [self._counts(conn, key, window) for key in keys]
+            used = [current + previous * overlap for current, previous in counts]
+            blocked = next((i for i, (_, limit) in enumerate(limits) if used[i] + 1 > limit), None)
+            if blocked is None:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO windows (key, window, current, previous) VALUES (?, ?, ?, ?)",
+                    [(key, window, current + 1, previous) for key, (current, previous) in zip(keys, counts)],
+                )
+                used = [count + 1 for count in used]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        with self._stats_lock:
+            if blocked is None:
+                self.allowed += 1
+            else:
+                self.rejected += 1
+            prune = now - self._last_prune >= self.prune_interval
+            if prune:
+                self._last_prune = now
+        if prune:
+            self.prune(window)
+        return blocked, used
+
+    def used(self, keys: Sequence[str]) -> List[float]:
+        """Sliding count for each key, without counting a request."""
+        now = time.time()
+        window, offset = divmod(now, self.window_seconds)
+        overlap = 1.0 - offset / self.window_seconds
+        conn = self._connect()
+        return [current + previous * overlap
+                for current, previous in (self._counts(conn, self._key(key), int(window)) for key in keys)]
+
+    def reset(self, keys: Sequence[str]) -> None:
+        conn = self._connect()
+        conn.executemany("DELETE FROM windows WHERE key = ?", [(self._key(key),) for key in keys])
+
+    def prune(self, window: Optional[int] = None) -> int:
+        """Delete keys whose counts no longer reach into the sliding window."""
+        if window is None:
+            window = int(time.time() // self.window_seconds)
+        try:
+            cursor = self._connect().execute("DELETE FROM windows WHERE window < ?", (window - 1,))
+        except sqlite3.Error as e:
+            logger.warning(f"Sliding window prune failed: {e}")
+            return 0
+        removed = max(cursor.rowcount, 0)
+        with self._stats_lock:
+            self.expired += removed
+        return removed
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            return {
+                "window_seconds": self.window_seconds,
+                "allowed": self.allowed,
+                "rejected": self.rejected,
+                "expired_keys": self.expired,
+            }
+
+
+def default_limiter_path(filename: str) -> str:
+    """Location for limiter state shared by all workers on this host."""
+    return os.path.join(tempfile.gettempdir(), filename)
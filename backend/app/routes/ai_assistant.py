@@ -7,142 +7,189 @@ from app.prompts.project_prompts import ProjectPrompts
 from app.prompts.summary_prompts import SummaryPrompts
 from app.prompts.skills_prompts import SkillsPrompts
 from app.prompts.experience_prompts import ExperiencePrompts
+from app.stream_scanner import SuggestionScanner
+from app.rate_limiter import SlidingWindowLimiter, default_limiter_path
+from app.conversation_sessions import (
+    SessionResyncRequired, build_session_messages, conversation_sessions,
+)
 import json
-from datetime import datetime, timedelta
+import math
+import os
 
 ai_bp = Blueprint('ai_assistant', __name__, url_prefix='/api/ai-assist')
 
 # Initialize AI service
 ai_service = AIService()
 
-# Rate limiting storage
-user_request_counts = {}
+# Prompt class per assistant section (route name -> prompts)
+SECTION_PROMPTS = {
+    'projects': ProjectPrompts,
+    'summary': SummaryPrompts,
+    'skills': SkillsPrompts,
+    'experience': ExperiencePrompts,
+}
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
 
 # Rate limit constants
 SECTION_LIMIT = 15
 SESSION_LIMIT = 50
 RESET_HOURS = 24
 
+# Sliding 24h window per session+section and per session (across sections),
+# shared by every worker on the host
+assistant_limiter = SlidingWindowLimiter(
+    os.environ.get("ASSISTANT_LIMITER_DB") or default_limiter_path("resumeai-assistant-limiter.db"),
+    window_seconds=RESET_HOURS * 3600,
+)
+
+def _limit_keys(session_id: str, section: str) -> list:
+    return [f"section:{session_id}:{section}", f"session:{session_id}"]
+
 def check_rate_limit(session_id: str, section: str) -> tuple[bool, dict]:
     """Check rate limits"""
-    key = f"{session_id}:{section}"
-    current_time = datetime.now()
-    
-    if key not in user_request_counts:
-        user_request_counts[key] = {
-            'section': 0,
-            'session': 0,
-            'last_reset': current_time
-        }
-    
-    counts = user_request_counts[key]
-    
-    # Reset after 24 hours
-    time_since_reset = current_time - counts['last_reset']
-    if time_since_reset > timedelta(hours=RESET_HOURS):
-        counts['section'] = 0
-        counts['session'] = 0
-        counts['last_reset'] = current_time
+    section_key, session_key = _limit_keys(session_id, section)
+    blocked, (section_used, session_used) = assistant_limiter.hit(
+        [(section_key, SECTION_LIMIT), (session_key, SESSION_LIMIT)]
+    )
+    remaining = {
+        'remaining_section': max(0, SECTION_LIMIT - math.ceil(section_used)),
+        'remaining_session': max(0, SESSION_LIMIT - math.ceil(session_used))
+    }
     
-    # Check limits
-    if counts['section'] >= SECTION_LIMIT:
+    if blocked == 0:
         return False, {
             'error': f'Section limit reached ({SECTION_LIMIT} requests)',
             'limit_type': 'section',
-            'remaining_section': 0,
-            'remaining_session': max(0, SESSION_LIMIT - counts['session'])
+            **remaining,
+            'remaining_section': 0
         }
     
-    if counts['session'] >= SESSION_LIMIT:
+    if blocked == 1:
         return False, {
             'error': f'Session limit reached ({SESSION_LIMIT} requests)',
             'limit_type': 'session',
-            'remaining_section': max(0, SECTION_LIMIT - counts['section']),
+            **remaining,
             'remaining_session': 0
         }
     
-    # Increment
-    counts['section'] += 1
-    counts['session'] += 1
+    return True, remaining
+
+def sse_event(event_type: str, data=None) -> str:
+    """Format one server-sent event"""
+    payload = {'type': event_type} if data is None else {'type': event_type, 'data': data}
+    return f"data: {json.dumps(payload)}\n\n"
+
+def build_messages(data: dict, section: str) -> tuple:
+    """
+    (session, messages): the system prompt, recent history and the new user
+    message, taken from the server-side session where the client's
+    session_turn/context_version still match it. Raises
+    SessionResyncRequired when the client has to resend its full state.
+    """
+    session = conversation_sessions.prepare(data, section, SECTION_PROMPTS[section])
+    return session, build_session_messages(session, data.get('user_message', '').strip())
+
+def resync_response():
+    """Ask the client to resend conversation_history and resume_context"""
+    return {'error': 'Session expired, resend conversation_history and resume_context', 'code': 'session_resync'}, 409
+
+def record_session_turn(session: dict, messages: list, suggestion_stream) -> str:
+    """Store the finished exchange and tell the client which turn to echo next"""
+    reply = suggestion_stream.scanner.full_text
+    return sse_event('session', conversation_sessions.record_turn(session, messages[-1]['content'], reply))
+
+class SuggestionStream:
+    """
+    Turns streamed model text into SSE events. Conversational text is
+    forwarded as it arrives. Inside a JSON suggestion, each element of the
+    section's list field (projects, experiences, skills) is sent as a
+    'suggestion_item' event as soon as it closes and passes the section's
+    validator; the whole suggestion still follows as one 'suggestion' event
+    once the response is complete. Shared by the Flask and ASGI streaming
+    paths.
+    """
+    
+    def __init__(self, prompt_class):
+        self.prompt_class = prompt_class
+        self.item_key = getattr(prompt_class, 'ITEM_KEY', None)
+        # Single pass over the stream; no re-scanning of the accumulated text
+        self.scanner = SuggestionScanner(item_keys=[self.item_key] if self.item_key else ())
     
-    return True, {
-        'remaining_section': max(0, SECTION_LIMIT - counts['section']),
-        'remaining_session': max(0, SESSION_LIMIT - counts['session'])
-    }
+    def feed(self, chunk: str) -> list:
+        """Events to send for the next chunk"""
+        text = self.scanner.feed(chunk)
+        events = [sse_event('content', text)] if text else []
+        for key, index, raw_item in self.scanner.completed_items():
+            item = self._parse_item(raw_item)
+            if item is not None:
+                events.append(sse_event('suggestion_item', {'section': key, 'index': index, 'item': item}))
+        return events
+    
+    def _parse_item(self, raw_item: str):
+        try:
+            item = json.loads(raw_item)
+        except json.JSONDecodeError:
+            return None
+        return item if self.prompt_class.validate_item(item) else None
+    
+    def finish(self) -> list:
+        """Events to send once the model is done"""
+        events = []
+        tail = self.scanner.flush()
+        if tail:
+            events.append(sse_event('content', tail))
+        
+        full_response = self.scanner.full_text
+        # Check if JSON suggestion
+        json_suggestion = self.prompt_class.parse_json_suggestion(full_response)
+        
+        if json_suggestion:
+            # Any conversational text before the JSON was already streamed
+            # Extract just the data fields
+            data_payload = {}
+            for field in ('projects', 'message', 'experiences', 'summary', 'skills'):
+                if field in json_suggestion:
+                    data_payload[field] = json_suggestion[field]
+            
+            events.append(sse_event('suggestion', data_payload))
+        elif self.scanner.leading_json:
+            # If it looks like JSON but didn't parse, send it as content
+            events.append(sse_event('content', full_response))
+        
+        events.append(sse_event('done'))
+        return events
 
-def stream_ai_response(messages, prompt_class, section):
+def stream_ai_response(messages, prompt_class, section, session):
     """Generic streaming handler"""
+    session_id = request.json.get('session_id', 'default')
+    
     def generate():
         try:
             # Send rate limit first
-            allowed, limit_info = check_rate_limit(
-                request.json.get('session_id', 'default'),
-                section
-            )
+            allowed, limit_info = check_rate_limit(session_id, section)
             
             if not allowed:
-                yield f"data: {json.dumps({'type': 'error', 'data': limit_info['error']})}\n\n"
+                yield sse_event('error', limit_info['error'])
                 return
             
-            yield f"data: {json.dumps({'type': 'rate_limit', 'data': limit_info})}\n\n"
+            yield sse_event('rate_limit', limit_info)
             
             # Stream AI response
-            full_response = ""
-            pre_json_content = ""
-            json_detected = False
-            
+            suggestion_stream = SuggestionStream(prompt_class)
             for chunk in ai_service.stream_completion(messages):
-                if chunk:
-                    full_response += chunk
-                    
-                    # Check if JSON is starting
-                    if not json_detected and '{"type": "suggestion"' in full_response:
-                        json_detected = True
-                        # Extract text before JSON
-                        json_start = full_response.index('{"type": "suggestion"')
-                        pre_json_content = full_response[:json_start].strip()
-                    
-                    # Only stream as content if no JSON detected yet
-                    if not json_detected and not full_response.strip().startswith('{'):
-                        yield f"data: {json.dumps({'type': 'content', 'data': chunk})}\n\n"
-            
-            # Check if JSON suggestion
-            json_suggestion = prompt_class.parse_json_suggestion(full_response)
-            
-            if json_suggestion:
-                # Send the pre-JSON conversational text as a message if it exists
-                if pre_json_content:
-                    yield f"data: {json.dumps({'type': 'content', 'data': pre_json_content})}\n\n"
-                
-                # Extract just the data fields
-                data_payload = {}
-                
-                if 'projects' in json_suggestion:
-                    data_payload['projects'] = json_suggestion['projects']
-                if 'message' in json_suggestion:
-                    data_payload['message'] = json_suggestion['message']
-                if 'experiences' in json_suggestion:
-                    data_payload['experiences'] = json_suggestion['experiences']
-                if 'summary' in json_suggestion:
-                    data_payload['summary'] = json_suggestion['summary']
-                if 'skills' in json_suggestion:
-                    data_payload['skills'] = json_suggestion['skills']
-                
-                yield f"data: {json.dumps({'type': 'suggestion', 'data': data_payload})}\n\n"
-            else:
-                # If it looks like JSON but didn't parse, send it as content
-                if full_response.strip().startswith('{'):
-                    yield f"data: {json.dumps({'type': 'content', 'data': full_response})}\n\n"
-            
-            yield f"data: {json.dumps({'type': 'done'})}\n\n"
+                yield from suggestion_stream.feed(chunk)
+            final_events = suggestion_stream.finish()
+            yield record_session_turn(session, messages, suggestion_stream)
+            yield from final_events
             
         except Exception as e:
-            yield f"data: {json.dumps({'type': 'error', 'data': str(e)})}\n\n"
+            yield sse_event('error', str(e))
     
     return Response(
         stream_with_context(generate()),
         mimetype='text/event-stream',
-        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        headers=SSE_HEADERS
     )
 
 # ============= PROJECTS SECTION =============
@@ -152,21 +199,17 @@ def assist_projects():
     try:
         data = request.get_json()
         user_message = data.get('user_message', '').strip()
-        conversation_history = data.get('conversation_history', [])
-        resume_context = data.get('resume_context', {})
         
         if not user_message:
             return jsonify({'error': 'user_message is required'}), 400
         
-        system_prompt = ProjectPrompts.get_system_prompt(resume_context)
+        session, messages = build_messages(data, 'projects')
         
-        messages = [{"role": "system", "content": system_prompt}]
-        for msg in conversation_history[-8:]:
-            messages.append({"role": msg.get('role', 'user'), "content": msg.get('content', '')})
-        messages.append({"role": "user", "content": user_message})
-        
-        return stream_ai_response(messages, ProjectPrompts, 'projects')
+        return stream_ai_response(messages, ProjectPrompts, 'projects', session)
     
+    except SessionResyncRequired:
+        body, status = resync_response()
+        return jsonify(body), status
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -177,21 +220,17 @@ def assist_summary():
     try:
         data = request.get_json()
         user_message = data.get('user_message', '').strip()
-        conversation_history = data.get('conversation_history', [])
-        resume_context = data.get('resume_context', {})
         
         if not user_message:
             return jsonify({'error': 'user_message is required'}), 400
         
-        system_prompt = SummaryPrompts.get_system_prompt(resume_context)
-        
-        messages = [{"role": "system", "content": system_prompt}]
-        for msg in conversation_history[-8:]:
-            messages.append({"role": msg.get('role', 'user'), "content": msg.get('content', '')})
-        messages.append({"role": "user", "content": user_message})
+        session, messages = build_messages(data, 'summary')
         
-        return stream_ai_response(messages, SummaryPrompts, 'summary')
+        return stream_ai_response(messages, SummaryPrompts, 'summary', session)
     
+    except SessionResyncRequired:
+        body, status = resync_response()
+        return jsonify(body), status
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -202,21 +241,17 @@ def assist_skills():
     try:
         data = request.get_json()
         user_message = data.get('user_message', '').strip()
-        conversation_history = data.get('conversation_history', [])
-        resume_context = data.get('resume_context', {})
         
         if not user_message:
             return jsonify({'error': 'user_message is required'}), 400
         
-        system_prompt = SkillsPrompts.get_system_prompt(resume_context)
+        session, messages = build_messages(data, 'skills')
         
-        messages = [{"role": "system", "content": system_prompt}]
-        for msg in conversation_history[-8:]:
-            messages.append({"role": msg.get('role', 'user'), "content": msg.get('content', '')})
-        messages.append({"role": "user", "content": user_message})
-        
-        return stream_ai_response(messages, SkillsPrompts, 'skills')
+        return stream_ai_response(messages, SkillsPrompts, 'skills', session)
     
+    except SessionResyncRequired:
+        body, status = resync_response()
+        return jsonify(body), status
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -227,21 +262,17 @@ def assist_experience():
     try:
         data = request.get_json()
         user_message = data.get('user_message', '').strip()
-        conversation_history = data.get('conversation_history', [])
-        resume_context = data.get('resume_context', {})
         
         if not user_message:
             return jsonify({'error': 'user_message is required'}), 400
         
-        system_prompt = ExperiencePrompts.get_system_prompt(resume_context)
-        
-        messages = [{"role": "system", "content": system_prompt}]
-        for msg in conversation_history[-8:]:
-            messages.append({"role": msg.get('role', 'user'), "content": msg.get('content', '')})
-        messages.append({"role": "user", "content": user_message})
+        session, messages = build_messages(data, 'experience')
         
-        return stream_ai_response(messages, ExperiencePrompts, 'experience')
+        return stream_ai_response(messages, ExperiencePrompts, 'experience', session)
     
+    except SessionResyncRequired:
+        body, status = resync_response()
+        return jsonify(body), status
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -254,15 +285,16 @@ def reset_limits():
         session_id = data.get('session_id', 'default')
         section = data.get('section', 'projects')
         
-        key = f"{session_id}:{section}"
-        if key in user_request_counts:
-            del user_request_counts[key]
+        # Only this section's budget; the session-wide limit keeps counting
+        section_key, session_key = _limit_keys(session_id, section)
+        assistant_limiter.reset([section_key])
+        session_used, = assistant_limiter.used([session_key])
         
         return jsonify({
             'success': True,
             'new_limits': {
                 'remaining_section': SECTION_LIMIT,
-                'remaining_session': SESSION_LIMIT
+                'remaining_session': max(0, SESSION_LIMIT - math.ceil(session_used))
             }
         })
     except Exception as e:
@@ -278,6 +310,7 @@ def health():
         'rate_limits': {
             'section_limit': SECTION_LIMIT,
             'session_limit': SESSION_LIMIT,
-            'reset_hours': RESET_HOURS
+            'reset_hours': RESET_HOURS,
+            'usage': assistant_limiter.stats()
         }
     })
\ No newline at end of file
@@ -4,8 +4,9 @@ Handles Groq API integration with streaming support
 Updated: December 2024 - Current Groq models
 """
 import os
-from groq import Groq
-from typing import Generator, List, Dict
+from typing import AsyncGenerator, Generator, List, Dict
+from app.llm_gateway import async_chat_completion, chat_completion, hedged_completion
+from app.tokens import count_tokens
 
 class AIService:
     def __init__(self):
@@ -13,8 +14,6 @@ class AIService:
         if not self.api_key:
             raise ValueError("GROQ_API_KEY environment variable not set")
         
-        self.client = Groq(api_key=self.api_key)
-        
         # Model configuration (Updated December 2024)
         # Primary: Best overall performance & speed (276 tokens/sec)
         self.primary_model = "llama-3.3-70b-versatile"
@@ -43,7 +42,7 @@ class AIService:
             model = self.primary_model
         
         try:
-            stream = self.client.chat.completions.create(
+            stream = chat_completion(
                 model=model,
                 messages=messages,
                 temperature=self.temperature,
@@ -64,81 +63,79 @@ class AIService:
             else:
                 raise Exception(f"AI service error: {str(e)}")
     
-    def get_completion(self, messages: List[Dict[str, str]], 
-                      model: str = None) -> str:
+    async def astream_completion(self, messages: List[Dict[str, str]],
+                                 model: str = None) -> AsyncGenerator[str, None]:
         """
-        Get complete response (non-streaming)
+        Async version of stream_completion (AsyncGroq) for the ASGI app
         
         Args:
             messages: List of message dicts with 'role' and 'content'
             model: Model to use (defaults to primary_model)
             
-        Returns:
-            Complete response as string
+        Yields:
+            Content chunks as they arrive
         """
         if model is None:
             model = self.primary_model
         
         try:
-            response = self.client.chat.completions.create(
+            stream = await async_chat_completion(
                 model=model,
                 messages=messages,
                 temperature=self.temperature,
                 max_tokens=self.max_tokens,
                 top_p=self.top_p,
-                stream=False
+                stream=True
             )
             
-            return response.choices[0].message.content
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
         
         except Exception as e:
             # Try fallback model
             if model == self.primary_model:
                 print(f"Primary model failed, trying fallback: {e}")
-                return self.get_completion(messages, model=self.fallback_model)
+                async for chunk in self.astream_completion(messages, model=self.fallback_model):
+                    yield chunk
             else:
                 raise Exception(f"AI service error: {str(e)}")
     
+    def get_completion(self, messages: List[Dict[str, str]], 
+                      model: str = None) -> str:
+        """
+        Get complete response (non-streaming)
+        
+        Args:
+            messages: List of message dicts with 'role' and 'content'
+            model: Model to use (defaults to primary_model)
+            
+        Returns:
+            Complete response as string
+        """
+        if model is None:
+            model = self.primary_model
+        
+        try:
+            # The gateway hedges a slow or failing primary with the fallback model
+            result = hedged_completion(
+                messages,
+                primary=model,
+                fallback=self.fallback_model if model == self.primary_model else None,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                top_p=self.top_p,
+            )
+            
+            return result.content
+        
+        except Exception as e:
+            raise Exception(f"AI service error: {str(e)}")
+    
     def get_available_models(self) -> List[str]:
         """Return list of available models"""
         return [self.primary_model, self.fallback_model]
     
     def estimate_tokens(self, text: str) -> int:
-        """Rough token estimation (4 chars ≈ 1 token)"""
-        return len(text) // 4
-    
-    def truncate_history(self, messages: List[Dict[str, str]], 
-                        max_tokens: int = 8000) -> List[Dict[str, str]]:
-        """
-        Truncate conversation history to fit within token limit
-        Keeps system message and most recent messages
-        """
-        if not messages:
-            return messages
-        
-        # Always keep system message
-        system_msg = messages[0] if messages[0]['role'] == 'system' else None
-        other_msgs = messages[1:] if system_msg else messages
-        
-        # Calculate tokens
-        total_tokens = sum(self.estimate_tokens(msg['content']) for msg in messages)
-        
-        if total_tokens <= max_tokens:
-            return messages
-        
-        # Keep most recent messages
-        truncated = []
-        current_tokens = self.estimate_tokens(system_msg['content']) if system_msg else 0
-        
-        for msg in reversed(other_msgs):
-            msg_tokens = self.estimate_tokens(msg['content'])
-            if current_tokens + msg_tokens <= max_tokens:
-                truncated.insert(0, msg)
-                current_tokens += msg_tokens
-            else:
-                break
-        
-        if system_msg:
-            truncated.insert(0, system_msg)
-        
-        return truncated
\ No newline at end of file
+        """Token count (tiktoken when available, otherwise a BPE-shaped estimate)"""
+        return count_tokens(text)
@@ -1,12 +1,26 @@
 import io
 import traceback
 import logging
-import tempfile
-import os
-from flask import Blueprint, request, jsonify, send_file
-from playwright.sync_api import sync_playwright
+from functools import wraps
+from flask import Blueprint, Response, request, jsonify, send_file, make_response, stream_with_context
 from werkzeug.exceptions import RequestEntityTooLarge
-from app.groq_analyzer import analyze_resume_with_groq, extract_text_from_pdf, extract_text_from_docx, test_groq_connection
+from app.groq_analyzer import (
+    analyze_resume_with_groq, analyze_resume_for_jobs, analyze_resume_for_jobs_batched,
+    load_resume_document, create_error_analysis, test_groq_connection, analysis_flights,
+    MULTI_JOB_MODE
+)
+from app.document_ingestion import is_supported_file, read_upload
+from app.cache import get_cache_stats
+from app.llm_gateway import get_breaker_stats, get_continuation_stats, get_hedge_stats, get_limiter_stats
+from app.json_repair import get_repair_stats
+from app.conversation_sessions import get_session_stats
+from app.pdf_cache import cached_pdf, get_pdf_cache_stats, normalize_text, pdf_cache_stats, pdf_key
+from app.pdf_fonts import font_face_css
+from app.pdf_jobs import PdfQueueFull, get_pdf_job_stats, pdf_jobs
+from app.pdf_renderer import get_pdf_stats
+from app.pdf_story import PDF_ENGINE, get_story_stats, render_resume_pdf
+from app.deadline import DeadlineExceeded, deadline_scope, get_deadline_stats
+from app.routes.ai_assistant import SSE_HEADERS, sse_event
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
@@ -14,6 +28,32 @@ logger = logging.getLogger(__name__)
 
 routes = Blueprint('routes', __name__)
 
+def with_request_deadline(name: str):
+    """Run the view inside an end-to-end deadline scope with the endpoint's budget."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method == "OPTIONS":
+                return view(*args, **kwargs)
+            with deadline_scope(name):
+                return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _deadline_response(error: DeadlineExceeded):
+    """504 with an empty analysis, the stage that ran out and whatever was done before it."""
+    logger.warning(f"Deadline exceeded during {error.stage} on {request.path}")
+    body = create_error_analysis(str(error))
+    body["deadline_exceeded"] = True
+    body["stage"] = error.stage
+    body["partial"] = error.partial
+    return jsonify(body), 504
+
+def _cache_bypass_requested() -> bool:
+    """True when the client asks for a fresh analysis (no_cache form field or Cache-Control: no-cache)."""
+    flag = request.form.get("no_cache", "").strip().lower()
+    return flag in ("1", "true", "yes") or "no-cache" in request.headers.get("Cache-Control", "")
+
 @routes.route("/", methods=["GET"])
 def home():
     """Health check endpoint"""
@@ -40,6 +80,7 @@ def health_check():
         }), 500
 
 @routes.route("/analyze", methods=["POST", "OPTIONS"])
+@with_request_deadline("analyze")
 def analyze_resume_api():
     """Analyze resume against a target job using Gemini AI."""
     if request.method == "OPTIONS":
@@ -54,42 +95,42 @@ def analyze_resume_api():
         job_description = request.form.get("job_description", "").strip()
 
         # Validate file type
-        if not file.filename.lower().endswith(('.pdf', '.docx')):
+        if not is_supported_file(file.filename):
             return jsonify({"error": "Only PDF and DOCX files are supported"}), 400
 
-        # Save file to a temporary location
-        suffix = os.path.splitext(file.filename)[-1].lower()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            file.save(tmp.name)
-            tmp_path = tmp.name
+        # Read the upload into memory (no temp file)
+        file_bytes = read_upload(file)
 
-        logger.info(f"Saved uploaded file to {tmp_path}")
+        logger.info(f"Received {file.filename} ({len(file_bytes)} bytes)")
         logger.info(f"Analyzing for job: {job_title}")
         if job_description:
             logger.info(f"Job description provided: {job_description[:100]}...")
 
         # Run Groq-powered analysis with job description
         result = analyze_resume_with_groq(
-            file_path=tmp_path, 
+            file_bytes=file_bytes,
+            filename=file.filename,
             job_title=job_title, 
             job_skills=None,  # Always None - let Gemini decide
-            job_description=job_description if job_description else None
+            job_description=job_description if job_description else None,
+            use_cache=not _cache_bypass_requested(),
+            allow_degraded=True
         )
 
-        # Clean up temp file
-        os.remove(tmp_path)
-        logger.info("Analysis completed successfully")
+        if result.get("degraded"):
+            logger.warning("Served degraded local analysis for /analyze (Groq circuit open)")
+        else:
+            logger.info("Analysis completed successfully")
 
         return jsonify(result)
 
     except RequestEntityTooLarge:
         return jsonify({"error": "File too large. Maximum allowed size is 10MB."}), 413
 
+    except DeadlineExceeded as e:
+        return _deadline_response(e)
+
     except Exception as e:
-        # Clean up temp file if it exists
-        if 'tmp_path' in locals() and os.path.exists(tmp_path):
-            os.remove(tmp_path)
-        
         logger.error(f"Unexpected error in /analyze: {str(e)}")
         logger.error(traceback.format_exc())
         return jsonify({
@@ -110,6 +151,7 @@ def analyze_resume_api():
         }), 500
 
 @routes.route("/analyze-multiple-jobs", methods=["POST"])
+@with_request_deadline("analyze_multiple_jobs")
 def analyze_multiple_jobs():
     """Analyze resume against multiple job roles using Gemini AI."""
     try:
@@ -128,67 +170,51 @@ def analyze_multiple_jobs():
             return jsonify({"error": "At least one target job is required"}), 400
 
         # Validate file type
-        if not file.filename.lower().endswith(('.pdf', '.docx')):
+        if not is_supported_file(file.filename):
             return jsonify({"error": "Only PDF and DOCX files are supported"}), 400
 
-        # Save file temporarily
-        suffix = os.path.splitext(file.filename)[-1].lower()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            file.save(tmp.name)
-            tmp_path = tmp.name
+        file_bytes = read_upload(file)
 
         logger.info(f"Analyzing resume against multiple jobs: {target_jobs}")
 
-        results = {}
-        for job in target_jobs:
-            try:
-                # Get job description if provided
-                job_description = request.form.get(f"{job}_description", "").strip()
-                
-                # Analyze with Groq - let it determine required skills
-                result = analyze_resume_with_groq(
-                    file_path=tmp_path, 
-                    job_title=job, 
-                    job_skills=None,  # Let Gemini decide
-                    job_description=job_description if job_description else None
-                )
-                results[job] = result
-                logger.info(f"Completed analysis for {job}")
-                
-            except Exception as job_error:
-                logger.error(f"Error analyzing for job {job}: {str(job_error)}")
-                results[job] = {
-                    "error": f"Failed to analyze for {job}: {str(job_error)}",
-                    "skills": [],
-                    "projects": [],
-                    "projects_with_skills": {},
-                    "quantifiable_impacts": {},
-                    "relevant_projects": [],
-                    "analysis": {
-                        "total_skills_found": 0,
-                        "total_projects": 0,
-                        "relevant_projects": 0,
-                        "skills_with_metrics": 0,
-                        "achieved_score": 0,
-                        "max_possible_score": 100
-                    }
-                }
-
-        # Clean up
-        os.remove(tmp_path)
+        # Job descriptions are read up front; the analyses run off the request thread
+        jobs = {
+            job: request.form.get(f"{job}_description", "").strip() or None
+            for job in target_jobs
+        }
+
+        try:
+            # Extract once, then fan the per-job Groq calls out concurrently
+            document = load_resume_document(file_bytes=file_bytes, filename=file.filename)
+        except Exception as extract_error:
+            logger.error(f"Error extracting resume: {str(extract_error)}")
+            return jsonify({
+                job: create_error_analysis(f"Failed to analyze for {job}: {str(extract_error)}")
+                for job in target_jobs
+            })
+
+        # "batched" sends the resume once for all jobs; falls back to per-job on bad output
+        mode = request.form.get("mode", MULTI_JOB_MODE).strip().lower()
+        analyze_jobs = analyze_resume_for_jobs_batched if mode == "batched" else analyze_resume_for_jobs
+        results = analyze_jobs(
+            document["text"],
+            jobs,
+            use_cache=not _cache_bypass_requested(),
+            document=document
+        )
 
         return jsonify(results)
 
+    except DeadlineExceeded as e:
+        return _deadline_response(e)
+
     except Exception as e:
-        # Clean up temp file if it exists
-        if 'tmp_path' in locals() and os.path.exists(tmp_path):
-            os.remove(tmp_path)
-            
         logger.error(f"Error in /analyze-multiple-jobs: {str(e)}")
         logger.error(traceback.format_exc())
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 @routes.route("/project-highlights", methods=["POST"])
+@with_request_deadline("project_highlights")
 def get_project_highlights():
     """Return only project-related insights from the resume using Gemini AI."""
     try:
@@ -200,26 +226,21 @@ def get_project_highlights():
         job_description = request.form.get("job_description", "").strip()
 
         # Validate file type
-        if not file.filename.lower().endswith(('.pdf', '.docx')):
+        if not is_supported_file(file.filename):
             return jsonify({"error": "Only PDF and DOCX files are supported"}), 400
 
-        # Save temporarily
-        suffix = os.path.splitext(file.filename)[-1].lower()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            file.save(tmp.name)
-            tmp_path = tmp.name
+        file_bytes = read_upload(file)
 
         # Run analysis with Groq - let it determine skills based on job
         result = analyze_resume_with_groq(
-            file_path=tmp_path, 
+            file_bytes=file_bytes,
+            filename=file.filename,
             job_title=job_title if job_title else None, 
             job_skills=None,  # Let Gemini decide
-            job_description=job_description if job_description else None
+            job_description=job_description if job_description else None,
+            use_cache=not _cache_bypass_requested()
         )
 
-        # Clean up
-        os.remove(tmp_path)
-
         # Extract just the project highlights
         highlights = result.get("projects_with_skills", {})
         impacts = result.get("quantifiable_impacts", {})
@@ -231,16 +252,16 @@ def get_project_highlights():
             "projects_with_metrics": len(impacts)
         })
 
+    except DeadlineExceeded as e:
+        return _deadline_response(e)
+
     except Exception as e:
-        # Clean up temp file if it exists
-        if 'tmp_path' in locals() and os.path.exists(tmp_path):
-            os.remove(tmp_path)
-            
         logger.error(f"Error in /project-highlights: {str(e)}")
         logger.error(traceback.format_exc())
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 @routes.route("/skills-only", methods=["POST"])
+@with_request_deadline("skills_only")
 def extract_skills_only():
     """Extract only skills from resume using Gemini AI."""
     try:
@@ -250,31 +271,29 @@ def extract_skills_only():
         file = request.files["file"]
 
         # Validate file type
-        if not file.filename.lower().endswith(('.pdf', '.docx')):
+        if not is_supported_file(file.filename):
             return jsonify({"error": "Only PDF and DOCX files are supported"}), 400
 
-        # Save temporarily
-        suffix = os.path.splitext(file.filename)[-1].lower()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            file.save(tmp.name)
-            tmp_path = tmp.name
+        file_bytes = read_upload(file)
 
         # Run basic analysis with Groq (no job matching)
-        result = analyze_resume_with_groq(file_path=tmp_path)
-
-        # Clean up
-        os.remove(tmp_path)
+        result = analyze_resume_with_groq(
+            file_bytes=file_bytes,
+            filename=file.filename,
+            use_cache=not _cache_bypass_requested(),
+            allow_degraded=True
+        )
 
         return jsonify({
             "skills": result.get("skills", []),
-            "total_skills": len(result.get("skills", []))
+            "total_skills": len(result.get("skills", [])),
+            "degraded": result.get("degraded", False)
         })
 
+    except DeadlineExceeded as e:
+        return _deadline_response(e)
+
     except Exception as e:
-        # Clean up temp file if it exists
-        if 'tmp_path' in locals() and os.path.exists(tmp_path):
-            os.remove(tmp_path)
-            
         logger.error(f"Error in /skills-only: {str(e)}")
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
@@ -295,45 +314,33 @@ def test_analyzer():
             "traceback": traceback.format_exc()
         }), 500
 
-@routes.route("/generate-pdf", methods=["POST", "OPTIONS"])
-def generate_pdf():
-    """Generate PDF from HTML content using Playwright"""
-    if request.method == "OPTIONS":
-        return "", 200
-    
-    try:
-        data = request.get_json()
-        html_content = data.get('html')
-        css_content = data.get('css', '')
-        layout_settings = data.get('layoutSettings', {})
-        
-        if not html_content:
-            return jsonify({'error': 'HTML content is required'}), 400
+@routes.route("/debug/cache-stats", methods=["GET"])
+def cache_stats():
+    """Hit/miss/eviction counters for this worker's caches (used for sizing)."""
+    return jsonify(get_cache_stats())
 
-        logger.info("Starting PDF generation")
-        logger.info(f"HTML content length: {len(html_content)}")
-        logger.info(f"CSS content length: {len(css_content)}")
-
-        # Extract layout settings with defaults
-        margins = layout_settings.get('margins', {})
-        margin_top = f"{margins.get('top', 20)}px"
-        margin_right = f"{margins.get('right', 20)}px"
-        margin_bottom = f"{margins.get('bottom', 20)}px"
-        margin_left = f"{margins.get('left', 20)}px"
-        
-        page_size = layout_settings.get('pageSize', 'A4')
-        font_family = layout_settings.get('fontFamily', '"CMU Serif", "Computer Modern Serif", Georgia, serif')
-
-        # Construct full HTML document with embedded styles
-        full_html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <style>
-                @import url('https://cdn.jsdelivr.net/gh/vsalvino/computer-modern@main/fonts/serif.css');
-                
+@routes.route("/debug/stats", methods=["GET"])
+def runtime_stats():
+    """Per-worker counters for caches, LLM call coalescing, the Groq budget, deadlines, hedging, the circuit breaker, PDF export and its cache."""
+    return jsonify({
+        "caches": get_cache_stats(),
+        "analysis_coalescing": analysis_flights.stats(),
+        "groq_rate_limiter": get_limiter_stats(),
+        "deadlines": get_deadline_stats(),
+        "hedging": get_hedge_stats(),
+        "continuations": get_continuation_stats(),
+        "circuit_breaker": get_breaker_stats(),
+        "json_repair": get_repair_stats(),
+        "assistant_sessions": get_session_stats(),
+        "pdf_renderer": get_pdf_stats(),
+        "pdf_cache": get_pdf_cache_stats(),
+        "pdf_story": get_story_stats(),
+        "pdf_jobs": get_pdf_job_stats(),
+    })
+
+def export_base_css(font_family):
+    """Page styles the export template puts ahead of the builder's stylesheet"""
+    return f"""
                 * {{
                     margin: 0;
                     padding: 0;
@@ -378,7 +385,44 @@ def generate_pdf():
                 [style*="text-align: center"] {{
                     text-align: center !important;
                 }}
-                
+    """
+
+def prepare_pdf_export(data):
+    """
+    Content hash and render callable for a /generate-pdf request body,
+    or None when it has no HTML
+    """
+    html_content = normalize_text(data.get('html'))
+    css_content = normalize_text(data.get('css', ''))
+    layout_settings = data.get('layoutSettings') or {}
+
+    if not html_content:
+        return None
+
+    logger.info(f"HTML content length: {len(html_content)}")
+    logger.info(f"CSS content length: {len(css_content)}")
+
+    # Extract layout settings with defaults
+    margins = layout_settings.get('margins', {})
+    margin_top = f"{margins.get('top', 20)}px"
+    margin_right = f"{margins.get('right', 20)}px"
+    margin_bottom = f"{margins.get('bottom', 20)}px"
+    margin_left = f"{margins.get('left', 20)}px"
+
+    page_size = layout_settings.get('pageSize', 'A4')
+    font_family = layout_settings.get('fontFamily', '"CMU Serif", "Computer Modern Serif", Georgia, serif')
+
+    # Construct full HTML document with embedded styles
+    base_css = export_base_css(font_family)
+    full_html = f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <style>
+                {font_face_css()}
+                {base_css}
                 {css_content}
             </style>
         </head>
@@ -388,56 +432,169 @@ def generate_pdf():
         </html>
         """
 
-        # Log a sample of the HTML for debugging
-        logger.info(f"Full HTML preview (first 500 chars): {full_html[:500]}")
-
-        # Generate PDF using Playwright
-        logger.info("Launching Playwright browser")
-        with sync_playwright() as p:
-            browser = p.chromium.launch(
-                headless=True,
-                args=['--no-sandbox', '--disable-setuid-sandbox']  # Important for Docker
-            )
-            page = browser.new_page()
-            
-            # Set content and wait for it to load
-            page.set_content(full_html, wait_until='networkidle')
-            
-            # Wait for fonts to load
-            page.wait_for_timeout(3000)
-            
-            # Take a screenshot for debugging (optional)
-            # screenshot = page.screenshot()
-            # logger.info(f"Screenshot size: {len(screenshot)} bytes")
-            
-            logger.info("Generating PDF")
-            pdf_bytes = page.pdf(
-                format=page_size,
-                print_background=True,
-                margin={
-                    'top': margin_top,
-                    'right': margin_right,
-                    'bottom': margin_bottom,
-                    'left': margin_left
-                },
-                prefer_css_page_size=False
-            )
-            
-            browser.close()
-            logger.info(f"PDF generated successfully, size: {len(pdf_bytes)} bytes")
-
-        # Create in-memory file
-        pdf_buffer = io.BytesIO(pdf_bytes)
-        pdf_buffer.seek(0)
-
-        return send_file(
-            pdf_buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name='resume.pdf'
-        )
+    pdf_options = {
+        'format': page_size,
+        'print_background': True,
+        'margin': {
+            'top': margin_top,
+            'right': margin_right,
+            'bottom': margin_bottom,
+            'left': margin_left
+        },
+        'prefer_css_page_size': False
+    }
+
+    # Same page and options, same PDF: the content hash is the ETag
+    key = pdf_key(full_html, {**pdf_options, 'engine': PDF_ENGINE})
+
+    # Render with the Story engine when the document allows it, else on the
+    # worker's pooled Chromium
+    def render():
+        return render_resume_pdf(html_content, base_css + css_content, full_html, pdf_options)
+
+    return key, render
+
+def pdf_response(pdf, key, source):
+    """Download response for PDF bytes or a file path, with the content hash as ETag"""
+    response = send_file(
+        io.BytesIO(pdf) if isinstance(pdf, bytes) else pdf,
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name='resume.pdf',
+        etag=key,
+        conditional=False
+    )
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['X-PDF-Cache'] = source
+    return response
+
+def not_modified(key):
+    """304 for a client that already has the PDF with this content hash"""
+    pdf_cache_stats.record("not_modified")
+    logger.info(f"PDF unchanged ({key[:12]}), returning 304")
+    response = make_response("", 304)
+    response.set_etag(key)
+    return response
+
+@routes.route("/generate-pdf", methods=["POST", "OPTIONS"])
+def generate_pdf():
+    """Generate PDF from HTML content with the Story engine or Playwright"""
+    if request.method == "OPTIONS":
+        return "", 200
+    
+    try:
+        logger.info("Starting PDF generation")
+        export = prepare_pdf_export(request.get_json())
+        if export is None:
+            return jsonify({'error': 'HTML content is required'}), 400
+        key, render = export
+
+        if request.if_none_match.contains(key):
+            return not_modified(key)
+
+        # Unless this exact document was rendered recently
+        logger.info("Generating PDF")
+        pdf_bytes, source = cached_pdf(key, render)
+        logger.info(f"PDF ready ({source}), size: {len(pdf_bytes)} bytes")
+
+        return pdf_response(pdf_bytes, key, source)
 
     except Exception as e:
         logger.error(f"PDF generation error: {str(e)}")
         logger.error(traceback.format_exc())
-        return jsonify({'error': f'Failed to generate PDF: {str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'error': f'Failed to generate PDF: {str(e)}'}), 500
+
+PDF_JOBS_PATH = "/generate-pdf/jobs"
+
+def job_response(status):
+    """Job status plus the URLs to follow it"""
+    status_url = f"{PDF_JOBS_PATH}/{status['job_id']}"
+    return {
+        **status,
+        'status_url': status_url,
+        'events_url': f"{status_url}/events",
+        'result_url': f"{status_url}/result",
+    }
+
+def job_event(status):
+    """SSE event for a job status, and whether the stream should end with it"""
+    if status is None:
+        return sse_event('error', 'Unknown or expired PDF job'), True
+    if status['state'] == 'failed':
+        return sse_event('error', status['error']), True
+    if status['state'] == 'done':
+        return sse_event('done', job_response(status)), True
+    return sse_event('status', job_response(status)), False
+
+@routes.route(PDF_JOBS_PATH, methods=["POST", "OPTIONS"])
+def create_pdf_job():
+    """Queue a PDF export and answer with a job id right away"""
+    if request.method == "OPTIONS":
+        return "", 200
+
+    try:
+        export = prepare_pdf_export(request.get_json())
+        if export is None:
+            return jsonify({'error': 'HTML content is required'}), 400
+        key, render = export
+
+        try:
+            status = pdf_jobs.submit(key, render)
+        except PdfQueueFull as e:
+            logger.warning(f"PDF export queue full, retry after {e.retry_after}s")
+            response = jsonify({'error': 'Too many PDF exports in progress, please retry shortly',
+                                'retry_after': e.retry_after})
+            response.status_code = 429
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+
+        logger.info(f"PDF job {status['job_id']} {status['state']}")
+        body = job_response(status)
+        response = jsonify(body)
+        response.status_code = 202
+        response.headers['Location'] = body['status_url']
+        return response
+
+    except Exception as e:
+        logger.error(f"PDF job error: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': f'Failed to queue PDF: {str(e)}'}), 500
+
+@routes.route(PDF_JOBS_PATH + "/<job_id>", methods=["GET"])
+def pdf_job_status(job_id):
+    """Poll a PDF export job"""
+    status = pdf_jobs.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Unknown or expired PDF job'}), 404
+    return jsonify(job_response(status))
+
+@routes.route(PDF_JOBS_PATH + "/<job_id>/events", methods=["GET"])
+def pdf_job_events(job_id):
+    """Server-sent events with the job's status until it finishes"""
+    def generate():
+        for status in pdf_jobs.watch(job_id):
+            event, finished = job_event(status)
+            yield event
+            if finished:
+                return
+        # Still queued or rendering; the client can reconnect or poll
+        yield sse_event('timeout')
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+@routes.route(PDF_JOBS_PATH + "/<job_id>/result", methods=["GET"])
+def pdf_job_result(job_id):
+    """Download a finished job's PDF"""
+    status = pdf_jobs.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Unknown or expired PDF job'}), 404
+    if status['state'] == 'failed':
+        return jsonify({'error': f"Failed to generate PDF: {status['error']}"}), 500
+    result = pdf_jobs.result(job_id)
+    if result is None:
+        return jsonify({'error': 'PDF is not ready yet', **job_response(status)}), 409
+
+    path, status = result
+    if request.if_none_match.contains(status['key']):
+        return not_modified(status['key'])
+    return pdf_response(path, status['key'], status['source'])
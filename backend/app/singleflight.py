@@ -0,0 +1,87 @@
+"""
+Single-flight request coalescing
+Concurrent callers with the same key share one execution of the work
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    The first caller for a key (the leader) runs ``fn``; callers arriving
+    while it runs block until it finishes and receive the same result, or
+    the same exception re-raised. Exceptions of a ``retry_on`` type belong
+    to the leader alone (its own deadline running out, say): waiters then
+    try again, and one of them becomes the new leader.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.retried = 0
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None,
+           retry_on: Tuple[type, ...] = ()) -> Tuple[Any, bool]:
+        """
+        Run ``fn`` once per in-flight ``key``. Returns (result, shared).
+        A waiter gives up with TimeoutError after ``timeout`` seconds.
+        """
+        give_up_at = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                if call is not None:
+                    call.waiters += 1
+                    self.coalesced += 1
+                    leader = False
+                else:
+                    call = _Call()
+                    self._calls[key] = call
+                    self.executions += 1
+                    leader = True
+
+            if leader:
+                break
+            remaining = None if give_up_at is None else max(0.0, give_up_at - time.monotonic())
+            if not call.done.wait(remaining):
+                raise TimeoutError(f"Timed out waiting for in-flight call {key}")
+            if call.error is None:
+                return call.result, True
+            if not isinstance(call.error, retry_on):
+                raise call.error
+            with self._lock:
+                self.retried += 1
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "retried": self.retried,
+            "in_flight": self.in_flight(),
+        }
@@ -0,0 +1,207 @@
+"""
+Incremental scanner for assistant streams
+Splits streamed model output into conversational text and the JSON
+suggestion in one pass: every chunk is scanned once, and only a short
+lookbehind window is held back while a '{' might still turn out to be the
+start of the suggestion object. Inside the suggestion, the raw text of each
+object in a list field (e.g. "projects") is cut out as soon as it closes.
+"""
+import re
+from typing import Iterable, List, Tuple
+
+# The suggestion object's opening, with whitespace removed
+SUGGESTION_MARKER = '{"type":"suggestion"'
+# Held-back text is capped at this many characters (room for odd spacing)
+MARKER_WINDOW = 64
+
+# A markdown fence opening the suggestion (```json) isn't conversational
+# text: a possible fence at the end of a chunk is held back like a '{'
+_FENCE_TAIL = re.compile(r"`{1,3}[A-Za-z]*\s*$")
+_FENCE = re.compile(r"```[A-Za-z]*\s*$")
+_STRUCTURAL = re.compile(r'[{}\[\]"]')
+_IN_STRING = re.compile(r'["\\]')
+
+_MATCH, _PARTIAL, _NO_MATCH = range(3)
+
+
+def _marker_verdict(window: str) -> int:
+    compact = "".join(window.split())
+    if compact.startswith(SUGGESTION_MARKER):
+        return _MATCH
+    if SUGGESTION_MARKER.startswith(compact) and len(window) < MARKER_WINDOW:
+        return _PARTIAL
+    return _NO_MATCH
+
+
+class SuggestionScanner:
+    """
+    Two states: TEXT until the suggestion marker is seen, then JSON, where
+    the container stack and string/escape state are tracked so the end of
+    the suggestion object, and of every item in the ``item_keys`` lists, is
+    known without re-reading earlier chunks.
+    """
+
+    TEXT = "text"
+    JSON = "json"
+
+    def __init__(self, item_keys: Iterable[str] = ()):
+        self.state = self.TEXT
+        # True when the response opens with '{' (pure JSON, nothing to stream)
+        self.leading_json = None
+        self.in_string = False
+        self.json_closed = False
+        self.item_keys = frozenset(item_keys)
+        self._stack: List[str] = []
+        self._escape = False
+        self._candidate = ""
+        self._parts: List[str] = []
+        self._text_parts: List[str] = []
+        # Top-level key currently being read / last one read
+        self._key_parts: List[str] = None
+        self._key_start = 0
+        self._last_key = None
+        # List field whose items are being cut out, and the open item
+        self._item_key = None
+        self._item_index = -1
+        self._item_parts: List[str] = None
+        self._item_start = 0
+        self._completed: List[Tuple[str, int, str]] = []
+
+    @property
+    def depth(self) -> int:
+        return len(self._stack)
+
+    def completed_items(self) -> List[Tuple[str, int, str]]:
+        """(key, index, raw JSON) for list items that closed since the last call."""
+        items, self._completed = self._completed, []
+        return items
+
+    def feed(self, chunk: str) -> str:
+        """Scan the next chunk; returns the conversational text safe to stream now."""
+        if not chunk:
+            return ""
+        self._parts.append(chunk)
+        if self.leading_json is None:
+            stripped = chunk.lstrip()
+            if stripped:
+                self.leading_json = stripped[0] == "{"
+
+        if self.state == self.JSON:
+            self._scan_json(chunk)
+            return ""
+
+        text = self._scan_text(chunk)
+        if text:
+            self._text_parts.append(text)
+        return "" if self.leading_json else text
+
+    def flush(self) -> str:
+        """End of stream: release held-back text that never became the marker."""
+        text, self._candidate = self._candidate, ""
+        if text and self.state == self.TEXT:
+            self._text_parts.append(text)
+            return "" if self.leading_json else text
+        return ""
+
+    @property
+    def full_text(self) -> str:
+        return "".join(self._parts)
+
+    @property
+    def pre_json_text(self) -> str:
+        """Conversational text seen before the suggestion started."""
+        return "".join(self._text_parts)
+
+    def _scan_text(self, chunk: str) -> str:
+        data = self._candidate + chunk
+        self._candidate = ""
+        out = []
+        pos = 0
+        while True:
+            brace = data.find("{", pos)
+            if brace == -1:
+                tail = data[pos:]
+                fence = _FENCE_TAIL.search(tail)
+                if fence and len(tail) - fence.start() < MARKER_WINDOW:
+                    self._candidate, tail = tail[fence.start():], tail[:fence.start()]
+                out.append(tail)
+                break
+            segment = data[pos:brace]
+            fence = _FENCE.search(segment)
+            verdict = _marker_verdict(data[brace:brace + MARKER_WINDOW])
+            if verdict == _MATCH:
+                out.append(segment[:fence.start()] if fence else segment)
+                self.state = self.JSON
+                self._scan_json(data[brace:])
+                break
+            if verdict == _PARTIAL:
+                start = pos + fence.start() if fence else brace
+                out.append(data[pos:start])
+                self._candidate = data[start:]
+                break
+            out.append(segment + "{")
+            pos = brace + 1
+        return "".join(out)
+
+    def _scan_json(self, text: str) -> None:
+        pos, end = 0, len(text)
+        if self._escape:
+            # The previous chunk ended on a backslash inside a string
+            self._escape = False
+            pos = 1
+        while pos < end and not self.json_closed:
+            if self.in_string:
+                match = _IN_STRING.search(text, pos)
+                if match is None:
+                    break
+                if match.group() == "\\":
+                    if match.end() >= end:
+                        self._escape = True
+                        break
+                    pos = match.end() + 1
+                    continue
+                self.in_string = False
+                pos = match.end()
+                if self._key_parts is not None:
+                    self._key_parts.append(text[self._key_start:pos - 1])
+                    self._last_key = "".join(self._key_parts)
+                    self._key_parts = None
+                continue
+
+            match = _STRUCTURAL.search(text, pos)
+            if match is None:
+                break
+            pos = match.end()
+            char = match.group()
+            if char == '"':
+                self.in_string = True
+                if len(self._stack) == 1:
+                    # A string directly in the suggestion object: a key or a scalar value
+                    self._key_parts, self._key_start = [], pos
+            elif char in "{[":
+                if char == "[" and len(self._stack) == 1 and self._last_key in self.item_keys:
+                    self._item_key, self._item_index = self._last_key, -1
+                elif (char == "{" and len(self._stack) == 2 and self._item_key
+                      and self._stack[1] == "["):
+                    self._item_index += 1
+                    self._item_parts, self._item_start = [], pos - 1
+                self._stack.append(char)
+            elif self._stack:
+                self._stack.pop()
+                depth = len(self._stack)
+                if depth == 2 and self._item_parts is not None:
+                    self._item_parts.append(text[self._item_start:pos])
+                    self._completed.append((self._item_key, self._item_index, "".join(self._item_parts)))
+                    self._item_parts = None
+                elif depth == 1:
+                    self._item_key = None
+                elif depth == 0:
+                    self.json_closed = True
+
+        # Carry partial key / item text over to the next chunk
+        if self._key_parts is not None:
+            self._key_parts.append(text[self._key_start:])
+            self._key_start = 0
+        if self._item_parts is not None:
+            self._item_parts.append(text[self._item_start:])
+            self._item_start = 0
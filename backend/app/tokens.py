@@ -0,0 +1,87 @@
+"""
+Token counting for prompt budgets
+Uses tiktoken's cl100k_base encoding when it is installed and its vocabulary
+can be loaded (Llama 3's tokenizer is built on the same BPE scheme). Otherwise
+text is split with Llama 3's pre-tokenizer pattern and each piece is costed
+the way BPE merges it: common words are one token, long or non-ASCII words
+several, digits in groups of three, punctuation runs about two characters
+per token. That stays far closer to the real count than len // 4 on
+JSON-heavy and non-English text.
+"""
+import logging
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TOKENIZER_ENCODING = os.environ.get("TOKENIZER_ENCODING", "cl100k_base")
+# Chat template overhead per message (header ids, role, end-of-turn)
+MESSAGE_OVERHEAD_TOKENS = 5
+
+# Llama 3 pre-tokenizer, with \p{L} spelled as [^\W\d_] for the re module
+_PRETOKEN = re.compile(
+    r"'(?:[sdmt]|ll|ve|re)"
+    r"|[^\r\n\w]?[^\W\d_]+"
+    r"|\d{1,3}"
+    r"| ?(?:[^\s\w]|_)+[\r\n]*"
+    r"|\s*[\r\n]+"
+    r"|\s+(?!\S)"
+    r"|\s+",
+    re.IGNORECASE,
+)
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if _encoding_loaded:
+        return _encoding
+    with _encoding_lock:
+        if not _encoding_loaded:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+            except Exception as e:
+                logger.info(f"tiktoken unavailable ({e.__class__.__name__}), using the BPE estimate")
+                _encoding = None
+            _encoding_loaded = True
+    return _encoding
+
+
+def _estimate_piece(piece: str) -> int:
+    word = piece.lstrip()
+    if not word:
+        return 1
+    if word[0].isalpha():
+        if not word.isascii():
+            # Accented / non-Latin scripts merge far less
+            return 1 + len(word) // 3
+        return 1 if len(word) <= 7 else 1 + (len(word) - 4) // 4
+    if word[0].isdigit():
+        return 1
+    return max(1, (len(word.rstrip("\r\n")) + 1) // 2)
+
+
+def estimate_tokens(text: str) -> int:
+    """Pre-tokenizer based estimate, used when tiktoken isn't available."""
+    return sum(_estimate_piece(piece) for piece in _PRETOKEN.findall(text))
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """Tokens in ``text``."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
+
+
+def count_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """Prompt tokens for a chat request, including the per-message template."""
+    return sum(count_tokens(m.get("content")) + MESSAGE_OVERHEAD_TOKENS for m in messages)
@@ -0,0 +1,119 @@
+"""
+Benchmark: assistant rate limiter memory with many distinct sessions
+
+Sends one request for each of N distinct sessions (each request touches a
+section counter and a session counter) through:
+
+  dict     the old per-process `user_request_counts` dict (one dict with a
+           datetime per session:section key, never expired)
+  sqlite   SlidingWindowLimiter, shared by all workers through a SQLite file
+
+Reports Python heap growth (tracemalloc), process RSS growth, the SQLite file
+size and per-request latency. Run each mode in its own process so RSS
+numbers don't mix. Afterwards the SQLite run also ages every key past the
+window and prunes, to show that expired sessions are actually dropped.
+
+Usage (from backend/):
+    python benchmarks/bench_assistant_limiter.py --mode dict   [--sessions 1000000]
+    python benchmarks/bench_assistant_limiter.py --mode sqlite [--sessions 1000000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.rate_limiter import SlidingWindowLimiter
+
+SECTION_LIMIT = 15
+SESSION_LIMIT = 50
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def legacy_check(counts: dict, session_id: str, section: str) -> bool:
+    """The old check_rate_limit bookkeeping."""
+    key = f"{session_id}:{section}"
+    now = datetime.now()
+    if key not in counts:
+        counts[key] = {'section': 0, 'session': 0, 'last_reset': now}
+    entry = counts[key]
+    if now - entry['last_reset'] > timedelta(hours=24):
+        entry['section'] = entry['session'] = 0
+        entry['last_reset'] = now
+    if entry['section'] >= SECTION_LIMIT or entry['session'] >= SESSION_LIMIT:
+        return False
+    entry['section'] += 1
+    entry['session'] += 1
+    return True
+
+
+def session_ids(n: int):
+    # Same shape as the frontend's ids
+    return (f"session_{1700000000000 + i}_{i * 2654435761 % 10 ** 9:09d}" for i in range(n))
+
+
+def run_dict(n: int):
+    counts = {}
+    tracemalloc.start()
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    for session_id in session_ids(n):
+        legacy_check(counts, session_id, "projects")
+    elapsed = time.perf_counter() - start
+    heap, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"dict    {n:>9} sessions  heap {heap / 2**20:8.1f} MiB  "
+          f"RSS +{(rss_bytes() - rss_before) / 2**20:8.1f} MiB  "
+          f"{elapsed / n * 1e6:6.2f} us/request  (never freed)")
+
+
+def run_sqlite(n: int, batch_report: int):
+    directory = tempfile.mkdtemp(prefix="limiter-bench-")
+    path = os.path.join(directory, "limiter.db")
+    limiter = SlidingWindowLimiter(path, window_seconds=24 * 3600, prune_interval=float("inf"))
+    tracemalloc.start()
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    for i, session_id in enumerate(session_ids(n), 1):
+        limiter.hit([(f"section:{session_id}:projects", SECTION_LIMIT), (f"session:{session_id}", SESSION_LIMIT)])
+        if batch_report and i % batch_report == 0:
+            print(f"  {i:>9} sessions  RSS +{(rss_bytes() - rss_before) / 2**20:7.1f} MiB", flush=True)
+    elapsed = time.perf_counter() - start
+    heap, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    print(f"sqlite  {n:>9} sessions  heap {heap / 2**20:8.1f} MiB  "
+          f"RSS +{(rss_bytes() - rss_before) / 2**20:8.1f} MiB  file {size / 2**20:7.1f} MiB  "
+          f"{elapsed / n * 1e6:6.2f} us/request")
+
+    # Two windows later every key has expired
+    start = time.perf_counter()
+    removed = limiter.prune(int(time.time() // limiter.window_seconds) + 2)
+    print(f"sqlite  prune after expiry removed {removed} keys in {time.perf_counter() - start:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["dict", "sqlite"], required=True)
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    parser.add_argument("--report-every", type=int, default=250_000)
+    args = parser.parse_args()
+    if args.mode == "dict":
+        run_dict(args.sessions)
+    else:
+        run_sqlite(args.sessions, args.report_every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark: assistant prompt size, last-8-messages vs token-budgeted context
+
+Replays long project-assistant sessions (chatty user turns, replies carrying
+JSON suggestions) and compares, per turn, the prompt the old routes built
+(system prompt plus conversation_history[-8:]) with the one built by
+context_budget.fit_context. Reports prompt tokens (mean / p95 / max, using
+app.tokens), how many early facts the prompt still mentions, and the time
+spent building the prompt. Prompt tokens are what time-to-first-token scales
+with, so the spread matters as much as the mean.
+
+Usage (from backend/):
+    python benchmarks/bench_context_budget.py [--turns 30] [--sessions 20]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.context_budget import fit_context
+from app.prompts.project_prompts import ProjectPrompts
+from app.tokens import count_message_tokens
+
+CONTEXT = {
+    "target_job": "Senior Backend Engineer",
+    "skills": ["Python", "Go", "Kubernetes", "PostgreSQL", "Redis", "Kafka"],
+    "existing_projects": [
+        {"title": f"Project {i}", "description": ["Built a service handling 10k rps"] * 3} for i in range(3)
+    ],
+}
+
+
+JOB_POSTING = (
+    "We are hiring a backend engineer to own our event pipeline. You will design APIs, "
+    "operate Kafka and PostgreSQL at scale, mentor engineers and drive reliability work. "
+    "Requirements: 5+ years with Python or Go, distributed systems, observability, CI/CD. "
+)
+
+
+def make_project(turn: int, n: int, rng: random.Random):
+    return {
+        "title": f"Pipeline {turn}-{n}",
+        "technologies": ["Kafka", "Python", "PostgreSQL", "Docker"],
+        "description": [
+            f"Led a team of {rng.randint(2, 9)} building a Kafka pipeline ingesting {rng.randint(1, 90)}k events/sec",
+            f"Cut infrastructure costs by {rng.randint(10, 60)}% by right-sizing consumers and batching writes",
+            "Introduced contract tests and canary deploys, halving incident rate quarter over quarter",
+            "Built dashboards and alerting with Prometheus and Grafana for end-to-end lag",
+        ],
+    }
+
+
+def make_session(turns: int, rng: random.Random):
+    """(user_message, reply) pairs; every user turn states one checkable fact."""
+    exchanges = []
+    for turn in range(turns):
+        user = (f"For Fact{turn}: I led a team of {rng.randint(2, 9)} on a Kafka pipeline that cut costs by "
+                f"{rng.randint(10, 60)}%. ")
+        if rng.random() < 0.25:
+            # Pasted job posting
+            user += "Here is the posting I'm targeting: " + JOB_POSTING * rng.randint(2, 6)
+        else:
+            user += "It also needed lots of on-call work and migrations. " * rng.randint(1, 4)
+        if rng.random() < 0.6:
+            reply = ("Nice, that's strong material. " * rng.randint(1, 3)) + json.dumps({
+                "type": "suggestion",
+                "message": "Here are project entries",
+                "projects": [make_project(turn, n, rng) for n in range(rng.randint(1, 3))],
+            })
+        else:
+            reply = "Could you tell me more about the scale and your role? " * rng.randint(1, 4)
+        exchanges.append((user, reply))
+    return exchanges
+
+
+def run(turns: int, sessions: int):
+    system_prompt = ProjectPrompts.get_system_prompt(CONTEXT)
+    results = {"last_8": ([], [], 0.0), "budgeted": ([], [], 0.0)}
+    rng = random.Random(7)
+    for _ in range(sessions):
+        exchanges = make_session(turns, rng)
+        history, summary, budget_history = [], [], []
+        for turn, (user, reply) in enumerate(exchanges):
+            start = time.perf_counter()
+            legacy = ([{"role": "system", "content": system_prompt}] + history[-8:]
+                      + [{"role": "user", "content": user}])
+            legacy_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            window = fit_context(system_prompt, budget_history, user, summary)
+            budget_time = time.perf_counter() - start
+            budget_history, summary = window.history, window.summary
+
+            for label, messages, elapsed in (("last_8", legacy, legacy_time),
+                                             ("budgeted", window.messages, budget_time)):
+                tokens, recalled, total = results[label]
+                tokens.append(count_message_tokens(messages))
+                text = "".join(m["content"] for m in messages)
+                recalled.append(sum(f"Fact{i}" in text for i in range(turn)) / turn if turn else 1.0)
+                results[label] = (tokens, recalled, total + elapsed)
+
+            exchange = [{"role": "user", "content": user}, {"role": "assistant", "content": reply}]
+            history += exchange
+            budget_history = budget_history + exchange
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--sessions", type=int, default=20)
+    args = parser.parse_args()
+
+    for label, (tokens, recalled, elapsed) in run(args.turns, args.sessions).items():
+        tokens.sort()
+        print(f"{label:<9} prompt tokens mean {statistics.mean(tokens):7.0f}  "
+              f"p95 {tokens[int(len(tokens) * 0.95)]:6d}  max {tokens[-1]:6d}  "
+              f"earlier facts in prompt {statistics.mean(recalled) * 100:5.1f}%  "
+              f"build {elapsed / len(tokens) * 1e3:6.3f} ms/turn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark: suggestion JSON extraction, legacy brace counting vs raw_decode
+
+Long chat responses mixing prose and code snippets (JS/Python with braces,
+JSON config samples) followed by a project suggestion are parsed by the old
+per-class logic (direct json.loads, character-by-character brace counting,
+json.loads per candidate, then a second json.loads of the match) and by the
+shared extractor in app/prompts/json_extraction.py.
+
+Usage (from backend/):
+    python benchmarks/bench_json_extraction.py [--sizes 2000 8000 32000] [--runs 200]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.prompts.project_prompts import ProjectPrompts
+
+
+def legacy_extract(content):
+    brace_depth = 0
+    start_idx = -1
+    for i, char in enumerate(content):
+        if char == '{':
+            if brace_depth == 0:
+                start_idx = i
+            brace_depth += 1
+        elif char == '}':
+            brace_depth -= 1
+            if brace_depth == 0 and start_idx != -1:
+                potential_json = content[start_idx:i + 1]
+                try:
+                    parsed = json.loads(potential_json)
+                    if parsed.get('type') == 'suggestion':
+                        return potential_json
+                except Exception:
+                    continue
+    return None
+
+
+def legacy_parse(content):
+    """The pre-refactor ProjectPrompts.parse_json_suggestion, minus validation."""
+    stripped = content.strip()
+    try:
+        parsed = json.loads(stripped)
+        if parsed.get('type') == 'suggestion' and 'projects' in parsed:
+            return parsed
+    except json.JSONDecodeError:
+        pass
+    extracted = legacy_extract(content)
+    if extracted:
+        parsed = json.loads(extracted)
+        if parsed.get('type') == 'suggestion' and 'projects' in parsed:
+            return parsed
+    return None
+
+
+SNIPPETS = [
+    "Here's how you might structure the caching layer:\n\n```javascript\n"
+    "function memoize(fn) {\n  const cache = {};\n  return (key) => {\n"
+    "    if (!(key in cache)) { cache[key] = fn(key); }\n    return cache[key];\n  };\n}\n```\n\n",
+    "A Python version using a dict comprehension:\n\n```python\n"
+    "counts = {word: text.count(word) for word in set(text.split())}\n"
+    "print(f\"{len(counts)} unique words\")\n```\n\n",
+    "Your config could look like this:\n\n```json\n"
+    "{\"cache\": {\"ttl\": 300, \"max_entries\": 512}, \"workers\": 4}\n```\n\n",
+    "For the bullet points, lead with the action and quantify the result, e.g. "
+    "\"Reduced p95 latency by 43%\". Avoid vague phrases like \"worked on\". ",
+]
+
+SUGGESTION = {
+    "type": "suggestion",
+    "message": "Here are your projects {formatted} for the resume!",
+    "projects": [
+        {
+            "title": "Realtime Chat {v2}",
+            "technologies": ["React", "Node.js", "Redis"],
+            "description": [
+                "Built WebSocket fan-out serving 5k concurrent users with sub-100ms delivery",
+                "Replaced polling with Redis pub/sub, cutting server load by 60%",
+                "Templated messages with {{placeholders}} rendered client-side",
+                "Fixed a parser bug where a stray '}' in user input broke message framing",
+            ],
+        }
+    ],
+}
+
+
+def make_response(size: int) -> str:
+    body, i = [], 0
+    while sum(map(len, body)) < size:
+        body.append(SNIPPETS[i % len(SNIPPETS)])
+        i += 1
+    return "".join(body) + json.dumps(SUGGESTION, indent=2) + "\n\nLet me know if you'd like changes!"
+
+
+def bench(fn, content, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = fn(content)
+    return (time.perf_counter() - start) / runs, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 8000, 32000])
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        content = make_response(size)
+        for label, fn in (("legacy", legacy_parse), ("raw_decode", ProjectPrompts.extract_json_from_text)):
+            per_call, result = bench(fn, content, args.runs)
+            print(f"{len(content):>6} chars  {label:<10} {per_call * 1e6:9.1f} us  "
+                  f"{'found' if result else 'MISSED'}")
+
+
+if __name__ == "__main__":
+    main()
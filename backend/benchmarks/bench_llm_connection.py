@@ -0,0 +1,62 @@
+"""
+Benchmark: cold (new Groq client per call) vs warm (shared gateway client)
+
+Each sample lists models, a cheap authenticated round trip that doesn't spend
+completion quota, so the difference is connection setup + TLS handshake.
+
+Usage (from backend/, GROQ_API_KEY set):
+    python benchmarks/bench_llm_connection.py [--samples 10]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from groq import Groq
+
+from app.llm_gateway import get_client
+
+
+def cold_call() -> float:
+    start = time.perf_counter()
+    client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+    client.models.list()
+    elapsed = time.perf_counter() - start
+    client.close()
+    return elapsed
+
+
+def warm_call() -> float:
+    start = time.perf_counter()
+    get_client().models.list()
+    return time.perf_counter() - start
+
+
+def summarize(label: str, samples):
+    samples = sorted(samples)
+    p95 = samples[max(0, int(len(samples) * 0.95) - 1)]
+    print(f"{label:<6} median={statistics.median(samples) * 1000:7.1f}ms "
+          f"p95={p95 * 1000:7.1f}ms  min={samples[0] * 1000:7.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=10)
+    args = parser.parse_args()
+
+    if not os.environ.get("GROQ_API_KEY"):
+        sys.exit("GROQ_API_KEY must be set")
+
+    warm_call()  # open the pooled connection once
+    cold = [cold_call() for _ in range(args.samples)]
+    warm = [warm_call() for _ in range(args.samples)]
+
+    summarize("cold", cold)
+    summarize("warm", warm)
+
+
+if __name__ == "__main__":
+    main()
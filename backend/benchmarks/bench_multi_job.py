@@ -0,0 +1,104 @@
+"""
+Benchmark: per-job vs batched prompts for /analyze-multiple-jobs
+
+Offline it compares prompt sizes (characters and estimated input tokens).
+With --live and GROQ_API_KEY set it also sends both variants to Groq and
+reports real prompt/completion token usage and wall-clock latency.
+
+Usage (from backend/):
+    python benchmarks/bench_multi_job.py [--jobs 3] [--live]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from groq import Groq
+
+from app.groq_analyzer import (
+    GROQ_MODELS, create_batched_prompt, create_optimized_prompt, preprocess_for_speed,
+)
+
+SAMPLE_RESUME = """Jane Doe - Software Engineering Student
+Skills: Python, JavaScript, TypeScript, React, Node.js, Express, Flask, Docker, AWS, PostgreSQL, MongoDB, Redis, Git
+Projects:
+Realtime Whiteboard - React, Node.js, WebSocket, MongoDB. Built collaborative canvas serving 50+ concurrent users
+with <100ms latency. Implemented optimistic UI updates and conflict resolution. Processed 10,000+ drawings.
+Resume Analyzer - Flask, PyMuPDF, Groq. Parsed 2,000+ resumes with 95% extraction accuracy. Cut analysis time by 60%.
+Expense Tracker - React Native, Firebase. 1,200 downloads, 4.6 star rating, offline sync.
+Experience: Backend Intern, Acme Corp (2023-2024). Reduced API latency by 40% through query optimization and caching.
+Migrated 12 services to Docker and GitHub Actions CI, cutting deploy time from 30 to 8 minutes.
+Education: B.Tech Computer Science, 2025, CGPA 8.7
+""" * 2
+
+SAMPLE_JOBS = [
+    "frontend developer", "backend developer", "full stack developer",
+    "devops engineer", "data engineer",
+]
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4
+
+
+def call(client, prompt: str, max_tokens: int):
+    start = time.perf_counter()
+    completion = client.chat.completions.create(
+        messages=[{"role": "user", "content": prompt}],
+        model=GROQ_MODELS[0],
+        temperature=0.0,
+        max_tokens=max_tokens,
+    )
+    return time.perf_counter() - start, completion.usage
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=3)
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+
+    jobs = {title: None for title in SAMPLE_JOBS[:args.jobs]}
+    resume_text = preprocess_for_speed(SAMPLE_RESUME, 2500)
+
+    per_job_prompts = [
+        create_optimized_prompt(resume_text, title, None, resume_preprocessed=True) for title in jobs
+    ]
+    batched_prompt = create_batched_prompt(resume_text, jobs, resume_preprocessed=True)
+
+    per_job_chars = sum(len(p) for p in per_job_prompts)
+    print(f"jobs: {len(jobs)}")
+    print(f"per-job: {len(per_job_prompts)} requests, {per_job_chars} chars, "
+          f"~{estimate_tokens(''.join(per_job_prompts))} input tokens")
+    print(f"batched: 1 request, {len(batched_prompt)} chars, "
+          f"~{estimate_tokens(batched_prompt)} input tokens "
+          f"({100 * (1 - len(batched_prompt) / per_job_chars):.0f}% fewer)")
+
+    if not args.live:
+        return
+    if not os.environ.get("GROQ_API_KEY"):
+        sys.exit("--live needs GROQ_API_KEY")
+
+    client = Groq(api_key=os.environ["GROQ_API_KEY"])
+
+    # Per-job requests are timed sequentially (their concurrent wall time is
+    # bounded below by the slowest single request plus rate-limit spacing)
+    per_job_latencies, per_job_in, per_job_out = [], 0, 0
+    for prompt in per_job_prompts:
+        latency, usage = call(client, prompt, 2000)
+        per_job_latencies.append(latency)
+        per_job_in += usage.prompt_tokens
+        per_job_out += usage.completion_tokens
+
+    batched_latency, usage = call(client, batched_prompt, min(2000 + 700 * (len(jobs) - 1), 8000))
+
+    print(f"per-job live: in={per_job_in} out={per_job_out} tokens, "
+          f"sum={sum(per_job_latencies):.2f}s max={max(per_job_latencies):.2f}s")
+    print(f"batched live: in={usage.prompt_tokens} out={usage.completion_tokens} tokens, "
+          f"{batched_latency:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
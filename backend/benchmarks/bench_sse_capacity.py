@@ -0,0 +1,186 @@
+"""
+Load test: concurrent assistant SSE streams, sync gunicorn vs ASGI mode
+
+Starts a fake Groq endpoint that streams tokens at a fixed pace, then runs
+the backend both ways (`gunicorn main:app` with sync workers and
+`gunicorn asgi:app -k uvicorn.workers.UvicornWorker`) with the same number
+of processes, and opens N concurrent /api/ai-assist/summary streams against
+each. While the streams run, GET / is probed to show whether the other
+routes are starved.
+
+No Groq quota is used. Usage (from backend/):
+    python benchmarks/bench_sse_capacity.py [--streams 200] [--workers 2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FAKE_GROQ = textwrap.dedent('''
+    import asyncio, json, os, sys
+    from starlette.applications import Starlette
+    from starlette.responses import StreamingResponse
+    from starlette.routing import Route
+    import uvicorn
+
+    TOKENS = int(os.environ["FAKE_TOKENS"])
+    DELAY = float(os.environ["FAKE_TOKEN_DELAY"])
+
+    def chunk(content, finish=None, usage=None):
+        body = {"id": "fake", "object": "chat.completion.chunk", "created": 0, "model": "fake",
+                "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": finish}]}
+        if usage:
+            body["x_groq"] = {"id": "fake", "usage": usage}
+        return f"data: {json.dumps(body)}\\n\\n"
+
+    async def completions(request):
+        async def stream():
+            for i in range(TOKENS):
+                await asyncio.sleep(DELAY)
+                yield chunk(f"word{i} ")
+            yield chunk(None, "stop", {"prompt_tokens": 100, "completion_tokens": TOKENS,
+                                       "total_tokens": 100 + TOKENS})
+            yield "data: [DONE]\\n\\n"
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    app = Starlette(routes=[Route("/openai/v1/chat/completions", completions, methods=["POST"])])
+    uvicorn.run(app, host="127.0.0.1", port=int(sys.argv[1]), log_level="error", backlog=4096)
+''')
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url: str, timeout: float = 30) -> None:
+    end = time.time() + timeout
+    while time.time() < end:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+async def one_stream(client: httpx.AsyncClient, base: str, index: int):
+    start = time.perf_counter()
+    first = None
+    payload = {"user_message": "Write my summary", "session_id": f"load-{index}", "resume_context": {}}
+    try:
+        async with client.stream("POST", f"{base}/api/ai-assist/summary", json=payload) as response:
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[6:])
+                if event["type"] == "content" and first is None:
+                    first = time.perf_counter() - start
+                if event["type"] in ("done", "error"):
+                    return event["type"] == "done", first, time.perf_counter() - start
+    except httpx.HTTPError:
+        pass
+    return False, first, time.perf_counter() - start
+
+
+async def probe(client: httpx.AsyncClient, base: str, stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            await client.get(f"{base}/", timeout=60)
+            samples.append(time.perf_counter() - start)
+        except httpx.HTTPError:
+            samples.append(float("inf"))
+        await asyncio.sleep(0.5)
+
+
+async def load(base: str, streams: int, timeout: float):
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        stop, probes = asyncio.Event(), []
+        probe_task = asyncio.create_task(probe(client, base, stop, probes))
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one_stream(client, base, i) for i in range(streams)))
+        wall = time.perf_counter() - start
+        stop.set()
+        await probe_task
+    return results, wall, probes
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else float("nan")
+
+
+def run_mode(mode: str, args, fake_port: int):
+    port = free_port()
+    app = "main:app" if mode == "sync" else "asgi:app"
+    command = [sys.executable, "-m", "gunicorn", app, "-w", str(args.workers),
+               "-b", f"127.0.0.1:{port}", "--timeout", "300", "--log-level", "warning"]
+    if mode == "async":
+        command += ["-k", "uvicorn.workers.UvicornWorker"]
+    env = {
+        **os.environ,
+        "GROQ_API_KEY": "fake",
+        "GROQ_BASE_URL": f"http://127.0.0.1:{fake_port}",
+        "GROQ_RPM": "1000000",
+        "GROQ_TPM": "1000000000",
+        "GROQ_LIMITER_DB": os.path.join(tempfile.mkdtemp(), "limiter.db"),
+    }
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(f"http://127.0.0.1:{port}/")
+        results, wall, probes = asyncio.run(load(f"http://127.0.0.1:{port}", args.streams, args.timeout))
+    finally:
+        server.terminate()
+        server.wait()
+
+    ok = [r for r in results if r[0]]
+    firsts = [r[1] for r in results if r[1] is not None]
+    print(f"{mode:<6} completed={len(ok)}/{len(results)}  wall={wall:6.1f}s  "
+          f"first-token p50={pct(firsts, 0.5):6.2f}s p95={pct(firsts, 0.95):6.2f}s  "
+          f"stream p50={statistics.median(r[2] for r in results):6.2f}s  "
+          f"GET / p95={pct(probes, 0.95):6.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streams", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--tokens", type=int, default=40)
+    parser.add_argument("--token-delay", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--modes", default="sync,async")
+    args = parser.parse_args()
+
+    fake_port = free_port()
+    fake = subprocess.Popen(
+        [sys.executable, "-c", FAKE_GROQ, str(fake_port)],
+        env={**os.environ, "FAKE_TOKENS": str(args.tokens), "FAKE_TOKEN_DELAY": str(args.token_delay)},
+    )
+    try:
+        time.sleep(1.5)
+        print(f"{args.streams} concurrent streams, {args.workers} workers, "
+              f"~{args.tokens * args.token_delay:.1f}s per generation")
+        for mode in args.modes.split(","):
+            run_mode(mode.strip(), args, fake_port)
+    finally:
+        fake.terminate()
+        fake.wait()
+
+
+if __name__ == "__main__":
+    main()
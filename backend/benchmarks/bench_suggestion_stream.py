@@ -0,0 +1,113 @@
+"""
+Microbenchmark: assistant stream handling, legacy loop vs SuggestionStream
+
+Replays realistic streams, cut into ~4-character Groq-sized tokens, through
+the old per-chunk logic (`full_response += chunk`, then a substring search
+and strip over the whole response every chunk) and through the incremental
+scanner. Both build the same SSE events. Stream shapes:
+
+  suggestion  a short lead-in followed by a JSON suggestion with projects
+  text        a purely conversational answer (no suggestion)
+  late        a long conversational answer with the suggestion at the end
+
+Usage (from backend/):
+    python benchmarks/bench_suggestion_stream.py [--tokens 1024 4096] [--runs 200]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.routes.ai_assistant import SuggestionStream, sse_event
+from app.prompts.project_prompts import ProjectPrompts
+
+
+def legacy_feed(chunks):
+    """The pre-scanner per-chunk loop from stream_ai_response (events only)."""
+    full_response = ""
+    json_detected = False
+    events = []
+    for chunk in chunks:
+        full_response += chunk
+        if not json_detected and '{"type": "suggestion"' in full_response:
+            json_detected = True
+            json_start = full_response.index('{"type": "suggestion"')
+            full_response[:json_start].strip()
+        if not json_detected and not full_response.strip().startswith('{'):
+            events.append(sse_event('content', chunk))
+    return full_response, len(events)
+
+
+def scanner_feed(chunks):
+    stream = SuggestionStream(ProjectPrompts)
+    events = 0
+    for chunk in chunks:
+        events += len(stream.feed(chunk))
+    return stream.scanner.full_text, events
+
+
+TALK = ("Great question! Based on your resume context, here are some stronger project "
+        "entries that emphasise measurable impact and the technologies recruiters scan for. ")
+
+
+def make_stream(tokens: int, shape: str):
+    """A stream of ``tokens`` ~4-character chunks in the given shape."""
+    if shape == "text":
+        text = (TALK * (tokens * 4 // len(TALK) + 1))[: tokens * 4]
+        return [text[i:i + 4] for i in range(0, len(text), 4)]
+    lead_in = TALK * (tokens * 3 // len(TALK)) if shape == "late" else TALK
+    projects = []
+    suggestion = {"type": "suggestion", "message": "Here are improved projects", "projects": projects}
+    text = lead_in
+    while len(text) < tokens * 4 or not projects:
+        n = len(projects) + 1
+        projects.append({
+            "title": f"Distributed Task Scheduler {n}",
+            "technologies": ["Python", "Redis", "Docker", "PostgreSQL"],
+            "description": [
+                f"Built a fault-tolerant scheduler processing {n * 12}k jobs/day with \"exactly-once\" semantics",
+                "Cut p95 queue latency by 43% by sharding work queues across 8 Redis nodes",
+                "Containerised workers with Docker and automated rollouts via GitHub Actions",
+            ],
+        })
+        text = lead_in + json.dumps(suggestion)
+    text = text[: tokens * 4]
+    return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+
+def bench(fn, chunks, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn(chunks)
+    per_stream = (time.perf_counter() - start) / runs
+
+    tracemalloc.start()
+    fn(chunks)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return per_stream, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, nargs="+", default=[1024, 4096])
+    parser.add_argument("--shapes", nargs="+", default=["suggestion", "text", "late"])
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    for shape in args.shapes:
+        for tokens in args.tokens:
+            chunks = make_stream(tokens, shape)
+            assert legacy_feed(chunks)[0] == scanner_feed(chunks)[0]
+            for label, fn in (("legacy", legacy_feed), ("scanner", scanner_feed)):
+                per_stream, peak = bench(fn, chunks, args.runs)
+                print(f"{shape:<10} {tokens:>5} tokens  {label:<8} {per_stream * 1e3:8.2f} ms/stream  "
+                      f"{per_stream / len(chunks) * 1e6:6.2f} us/chunk  peak alloc {peak / 1024:7.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Story engine: which documents it takes, the fidelity check on its output,
+and how /generate-pdf renders are routed between Story and Chromium.
+
+Run from backend/: python -m pytest -q tests
+"""
+from collections import Counter
+
+import fitz  # PyMuPDF
+import pytest
+
+from app import pdf_story
+from app.pdf_story import StoryFidelityError, StoryUnsupported
+
+PDF_OPTIONS = {"format": "Letter", "print_background": True,
+               "margin": {"top": "0.5in", "right": "0.5in", "bottom": "0.5in", "left": "0.5in"}}
+CSS = """
+body { font-family: Helvetica, Arial, sans-serif; font-size: 14px; }
+.name { font-size: 24px; font-weight: 700; text-transform: uppercase; }
+.row { display: flex; justify-content: space-between; }
+ul.plain { list-style: none; padding-left: 0; }
+"""
+RESUME = """
+<div class="resume">
+  <h1 class="name">Jane Doe</h1>
+  <div class="row"><span>Acme Corp</span><span>2019 - 2024</span></div>
+  <ul><li>Shipped the billing service</li><li>Cut p99 latency in half</li></ul>
+  <ol><li>First</li><li>Second</li></ol>
+  <ul class="plain"><li>Python, SQL</li></ul>
+</div>
+"""
+
+
+@pytest.fixture
+def bundled(monkeypatch):
+    """Pretend Helvetica is bundled: MuPDF draws it with its built-in face."""
+    monkeypatch.setattr(pdf_story, "story_fonts_complete", lambda: True)
+    monkeypatch.setattr(pdf_story, "story_font_families", lambda: {"helvetica"})
+    monkeypatch.setattr(pdf_story, "story_font_css", lambda: "")
+    monkeypatch.setattr(pdf_story, "font_archive", lambda: None)
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    fresh = pdf_story.StoryStats()
+    monkeypatch.setattr(pdf_story, "story_stats", fresh)
+    return fresh
+
+
+@pytest.fixture
+def chromium(monkeypatch):
+    """Stands in for the pooled Chromium renderer; records the pages it was given."""
+    import app.pdf_renderer
+    pages = []
+
+    def render_pdf(page_html, pdf_options):
+        pages.append(page_html)
+        return b"%PDF-chromium"
+
+    monkeypatch.setattr(app.pdf_renderer, "render_pdf", render_pdf)
+    return pages
+
+
+def page_words(pdf_bytes):
+    return [word[4] for page in fitz.open("pdf", pdf_bytes) for word in page.get_text("words")]
+
+
+def text_pdf(*placements):
+    """A Letter page with each (x, y, text) drawn in Helvetica."""
+    document = fitz.open()
+    page = document.new_page(width=612, height=792)
+    for x, y, text in placements:
+        page.insert_text((x, y), text, fontname="helv", fontsize=11)
+    return fitz.open("pdf", document.tobytes())
+
+
+# -- supported subset ----------------------------------------------------------
+
+
+def test_supported_document_renders_all_text(bundled):
+    words = page_words(pdf_story.render_story_pdf(RESUME, CSS, PDF_OPTIONS))
+    assert "JANE" in words and "DOE" in words
+    assert "2024" in words and "Acme" in words
+    assert words.count("•") == 2
+    assert "1." in words and "2." in words
+
+
+@pytest.mark.parametrize("html, css, reason", [
+    ("<table><tr><td>Jane</td></tr></table>", "", "<table>"),
+    ('<div class="grid"><span>Jane</span></div>', ".grid { display: grid; }", "display: grid"),
+    ('<div class="row"><p>A</p><p>B</p><p>C</p></div>',
+     ".row { display: flex; justify-content: center; }", "flex layout"),
+    ('<div class="side">Jane</div>', ".side { float: left; }", "float"),
+    ('<div class="wide">Jane</div>', ".wide { width: 50%; }", "width"),
+    ("<div>Jane</div>", "@media print { div { color: red; } }", "@media"),
+    ('<p class="x">Jane</p>', ".x::before { content: '*'; }", "::before"),
+    ('<ol start="3"><li>Jane</li></ol>', "", "numbered list"),
+])
+def test_unsupported_layout_is_rejected_before_rendering(bundled, html, css, reason):
+    with pytest.raises(StoryUnsupported, match=reason):
+        pdf_story.render_story_pdf(html, CSS + css, PDF_OPTIONS)
+
+
+def test_unbundled_font_is_rejected(bundled):
+    with pytest.raises(StoryUnsupported, match="'Georgia' is not bundled"):
+        pdf_story.render_story_pdf('<p class="serif">Jane</p>', CSS + ".serif { font-family: Georgia, serif; }",
+                                   PDF_OPTIONS)
+
+
+def test_text_without_a_font_family_is_rejected(bundled):
+    with pytest.raises(StoryUnsupported, match="without a font-family"):
+        pdf_story.render_story_pdf("<p>Jane</p>", "", PDF_OPTIONS)
+
+
+def test_unknown_pdf_options_are_rejected(bundled):
+    with pytest.raises(StoryUnsupported, match="pdf options"):
+        pdf_story.render_story_pdf(RESUME, CSS, {**PDF_OPTIONS, "scale": 0.9})
+
+
+def test_no_font_bundle_means_no_story(monkeypatch, tmp_path):
+    import app.pdf_fonts as pdf_fonts
+    monkeypatch.setattr(pdf_fonts, "PDF_FONT_DIR", str(tmp_path))
+    for name in ("_css", "_story_css", "_story_families"):
+        monkeypatch.setattr(pdf_fonts, name, getattr(pdf_fonts, name))
+    monkeypatch.setattr(pdf_fonts, "_faces", None)
+    assert not pdf_fonts.story_fonts_complete()
+    with pytest.raises(StoryUnsupported, match="bundled fonts"):
+        pdf_story.render_story_pdf(RESUME, CSS, PDF_OPTIONS)
+
+
+# -- fidelity check ------------------------------------------------------------
+
+
+CONTENT = fitz.Rect(36, 36, 576, 756)
+
+
+def test_fidelity_passes_when_the_words_match():
+    document = text_pdf((40, 60, "Jane Doe"), (40, 80, "Senior engineer"))
+    pdf_story._check_fidelity(document, Counter(["Jane", "Doe", "Senior", "engineer"]), CONTENT)
+
+
+def test_fidelity_fails_on_missing_words():
+    document = text_pdf((40, 60, "Jane Doe"))
+    with pytest.raises(StoryFidelityError, match="1 words missing"):
+        pdf_story._check_fidelity(document, Counter(["Jane", "Doe", "Senior"]), CONTENT)
+
+
+def test_fidelity_fails_on_text_outside_the_page_area():
+    document = text_pdf((40, 60, "Jane"), (560, 80, "overflowing"))
+    with pytest.raises(StoryFidelityError, match="outside the page area"):
+        pdf_story._check_fidelity(document, Counter(["Jane", "overflowing"]), CONTENT)
+
+
+def test_fidelity_ignores_word_boundaries():
+    # A narrow gap may split or join words when extracted; the characters are all there
+    document = text_pdf((40, 60, "2019 -2024"))
+    pdf_story._check_fidelity(document, Counter(["2019", "-", "2024"]), CONTENT)
+
+
+# -- engine routing ------------------------------------------------------------
+
+
+def test_auto_renders_supported_documents_with_story(bundled, stats, chromium, monkeypatch):
+    monkeypatch.setattr(pdf_story, "PDF_ENGINE", "auto")
+    pdf_bytes = pdf_story.render_resume_pdf(RESUME, CSS, "<html>page</html>", PDF_OPTIONS)
+    assert pdf_bytes.startswith(b"%PDF") and not chromium
+    snapshot = stats.snapshot()
+    assert snapshot["story_renders"] == 1 and snapshot["chromium_renders"] == 0
+
+
+def test_auto_falls_back_to_chromium(bundled, stats, chromium, monkeypatch):
+    monkeypatch.setattr(pdf_story, "PDF_ENGINE", "auto")
+    assert pdf_story.render_resume_pdf("<table></table>", CSS, "<html>page</html>", PDF_OPTIONS) == b"%PDF-chromium"
+    assert chromium == ["<html>page</html>"]
+    snapshot = stats.snapshot()
+    assert snapshot["fallbacks"] == 1 and snapshot["disabled"] == 0
+    assert snapshot["unsupported"] == {"<table>": 1}
+
+
+def test_fidelity_failure_falls_back_to_chromium(bundled, stats, chromium, monkeypatch):
+    monkeypatch.setattr(pdf_story, "PDF_ENGINE", "auto")
+
+    def lose_text(document, expected, content):
+        raise StoryFidelityError("1 words missing")
+
+    monkeypatch.setattr(pdf_story, "_check_fidelity", lose_text)
+    assert pdf_story.render_resume_pdf(RESUME, CSS, "<html>page</html>", PDF_OPTIONS) == b"%PDF-chromium"
+    snapshot = stats.snapshot()
+    assert snapshot["fallbacks"] == 1 and snapshot["fidelity_failures"] == 1
+
+
+def test_disabled_engine_is_not_counted_as_a_fallback(bundled, stats, chromium, monkeypatch):
+    monkeypatch.setattr(pdf_story, "PDF_ENGINE", "chromium")
+    assert pdf_story.render_resume_pdf(RESUME, CSS, "<html>page</html>", PDF_OPTIONS) == b"%PDF-chromium"
+    snapshot = stats.snapshot()
+    assert snapshot["disabled"] == 1 and snapshot["fallbacks"] == 0
+    assert snapshot["chromium_renders"] == 1 and snapshot["unsupported"] == {}
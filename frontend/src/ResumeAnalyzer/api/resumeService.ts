@@ -353,6 +353,63 @@ export const testAnalyzer = async () => {
   }
 };
 
+// Last exported PDF; the backend answers 304 when the document hasn't changed
+let lastPdf: { etag: string; blob: Blob } | null = null;
+
+// Export through the job queue every time instead of only when /generate-pdf is overloaded
+const PDF_EXPORT_JOBS = import.meta.env.VITE_PDF_EXPORT_JOBS === 'true';
+const PDF_SUBMIT_ATTEMPTS = 4;
+const PDF_POLL_TIMEOUT_MS = 120000;
+
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
+
+// Queue an export job, waiting out Retry-After while the backend's queue is full
+const submitPdfJob = async (body: string) => {
+  for (let attempt = 1; ; attempt++) {
+    const response = await fetch(`${API_URL}/generate-pdf/jobs`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body,
+    });
+    if (response.status === 429 && attempt < PDF_SUBMIT_ATTEMPTS) {
+      const retryAfter = Number(response.headers.get('Retry-After')) || 2;
+      await sleep(retryAfter * 1000);
+      continue;
+    }
+    const data = await response.json();
+    if (!response.ok) {
+      throw new Error(data.error || 'Failed to generate PDF');
+    }
+    return data;
+  }
+};
+
+// Poll the job until it finishes, backing off from 250ms to 2s
+const waitForPdfJob = async (job: any, onProgress?: (progress: number) => void) => {
+  const deadline = Date.now() + PDF_POLL_TIMEOUT_MS;
+  let delay = 250;
+  while (job.state === 'queued' || job.state === 'running') {
+    if (Date.now() > deadline) {
+      throw new Error('PDF generation timed out');
+    }
+    onProgress?.(job.state === 'queued' ? 20 : 40);
+    await sleep(delay);
+    delay = Math.min(delay * 2, 2000);
+    const response = await fetch(`${API_URL}${job.status_url}`, {
+      headers: { Accept: 'application/json' },
+    });
+    const data = await response.json();
+    if (!response.ok) {
+      throw new Error(data.error || 'Failed to generate PDF');
+    }
+    job = data;
+  }
+  if (job.state === 'failed') {
+    throw new Error(job.error || 'Failed to generate PDF');
+  }
+  return job;
+};
+
 export const generateResumePDF = async (
   htmlContent: string,
   cssContent: string,
@@ -363,32 +420,48 @@ export const generateResumePDF = async (
   try {
     onProgress?.(10); // Started
 
-    const response = await fetch(`${API_URL}/generate-pdf`, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({
-        html: htmlContent,
-        css: cssContent,
-        layoutSettings: {
-          margins: layoutSettings.margins,
-          pageSize: layoutSettings.pageSize,
-          fontFamily: layoutSettings.fontFamily,
-        }
-      })
+    const body = JSON.stringify({
+      html: htmlContent,
+      css: cssContent,
+      layoutSettings: {
+        margins: layoutSettings.margins,
+        pageSize: layoutSettings.pageSize,
+        fontFamily: layoutSettings.fontFamily,
+      }
     });
+    const conditional: Record<string, string> = lastPdf ? { 'If-None-Match': lastPdf.etag } : {};
+
+    let response: Response | null = null;
+    if (!PDF_EXPORT_JOBS) {
+      response = await fetch(`${API_URL}/generate-pdf`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', ...conditional },
+        body,
+      });
+    }
+    // Overloaded (or jobs opted into): queue the export and download it when done
+    if (!response || response.status === 429 || response.status === 503) {
+      const job = await waitForPdfJob(await submitPdfJob(body), onProgress);
+      response = await fetch(`${API_URL}${job.result_url}`, { headers: conditional });
+    }
 
     onProgress?.(50); // Response received
 
-    if (!response.ok) {
-      const errorData = await response.json();
-      throw new Error(errorData.error || 'Failed to generate PDF');
-    }
+    let blob: Blob;
+    if (response.status === 304 && lastPdf) {
+      blob = lastPdf.blob;
+    } else {
+      if (!response.ok) {
+        const errorData = await response.json();
+        throw new Error(errorData.error || 'Failed to generate PDF');
+      }
 
-    onProgress?.(70); // Processing blob
+      onProgress?.(70); // Processing blob
 
-    const blob = await response.blob();
+      blob = await response.blob();
+      const etag = response.headers.get('ETag');
+      lastPdf = etag ? { etag, blob } : null;
+    }
     
     onProgress?.(90); // Creating download
 
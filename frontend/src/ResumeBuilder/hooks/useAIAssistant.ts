@@ -17,6 +17,16 @@ interface UseAIAssistantProps {
   sessionId?: string;
 }
 
+// Cheap stable hash of the resume context; the server only needs to know when it changes
+const hashContext = (context: object): string => {
+  const text = JSON.stringify(context);
+  let hash = 5381;
+  for (let i = 0; i < text.length; i++) {
+    hash = ((hash << 5) + hash + text.charCodeAt(i)) | 0;
+  }
+  return (hash >>> 0).toString(16);
+};
+
 export const useAIAssistant = ({ section, resumeContext, sessionId = 'default' }: UseAIAssistantProps) => {
   const [state, setState] = useState<AIAssistantState>({
     messages: [],
@@ -31,6 +41,9 @@ export const useAIAssistant = ({ section, resumeContext, sessionId = 'default' }
 
   const abortControllerRef = useRef<AbortController | null>(null);
   const lastSuggestionIdRef = useRef<string | null>(null);
+  // Server-side session: the turn and context version the server last confirmed
+  const sessionTurnRef = useRef<number | null>(null);
+  const sessionContextRef = useRef<string | null>(null);
 
   // Send message to AI (streaming)
   const sendMessage = useCallback(async (userMessage: string) => {
@@ -61,30 +74,49 @@ export const useAIAssistant = ({ section, resumeContext, sessionId = 'default' }
     }));
 
     try {
-      const currentMessages = [...state.messages, userMsg];
-      
-      const conversationHistory = currentMessages
-        .filter(msg => msg.role === 'user' || msg.role === 'assistant')
-        .map(m => ({
-          role: m.role,
-          content: m.content
-        }));
-
-      const response = await fetch(`${API_URL}/api/ai-assist/${section}`, {
+      const contextVersion = hashContext(resumeContext);
+
+      // Only the new message normally; history and context when the server needs them
+      const buildBody = (fullSync: boolean) => {
+        const body: Record<string, any> = {
+          user_message: userMessage,
+          session_id: sessionId,
+          context_version: contextVersion,
+          stream: true
+        };
+        if (!fullSync && sessionTurnRef.current !== null) {
+          body.session_turn = sessionTurnRef.current;
+        } else {
+          body.conversation_history = state.messages
+            .filter(msg => msg.role === 'user' || msg.role === 'assistant')
+            .map(m => ({
+              role: m.role,
+              content: m.content
+            }));
+        }
+        if (fullSync || sessionContextRef.current !== contextVersion) {
+          body.resume_context = resumeContext;
+        }
+        return body;
+      };
+
+      const postMessage = (fullSync: boolean) => fetch(`${API_URL}/api/ai-assist/${section}`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify({
-          user_message: userMessage,
-          conversation_history: conversationHistory,
-          resume_context: resumeContext,
-          session_id: sessionId,
-          stream: true
-        }),
-        signal: abortControllerRef.current.signal
+        body: JSON.stringify(buildBody(fullSync)),
+        signal: abortControllerRef.current!.signal
       });
 
+      let response = await postMessage(false);
+      if (response.status === 409) {
+        // Server lost or has a stale copy of the session: resend everything once
+        sessionTurnRef.current = null;
+        sessionContextRef.current = null;
+        response = await postMessage(true);
+      }
+
       if (!response.ok) {
         const error = await response.json();
         throw new Error(error.error || 'Failed to get AI response');
@@ -101,13 +133,18 @@ export const useAIAssistant = ({ section, resumeContext, sessionId = 'default' }
       let assistantMessage = '';
       const assistantMsgId = (Date.now() + 1).toString();
       let isSuggestionResponse = false;
+      // Suggestion items streamed before the full suggestion arrives
+      const streamedItems: any[] = [];
+      let buffered = '';
 
       while (true) {
         const { done, value } = await reader.read();
         if (done) break;
 
-        const chunk = decoder.decode(value);
-        const lines = chunk.split('\n');
+        // An event can be split across reads; keep the partial last line
+        buffered += decoder.decode(value, { stream: true });
+        const lines = buffered.split('\n');
+        buffered = lines.pop() ?? '';
 
         for (const line of lines) {
           if (line.startsWith('data: ')) {
@@ -142,6 +179,25 @@ export const useAIAssistant = ({ section, resumeContext, sessionId = 'default' }
                   }
                 });
               }
+            } else if (data.type === 'suggestion_item') {
+              // Show items as soon as each one is complete
+              isSuggestionResponse = true;
+              const { index, item } = data.data;
+              streamedItems[index] = item;
+
+              let suggestion = null;
+              if (section === 'skills') {
+                suggestion = { skills: streamedItems.filter(Boolean) };
+              } else if (index === 0) {
+                suggestion = item;
+              }
+
+              if (suggestion) {
+                setState(prev => ({
+                  ...prev,
+                  currentSuggestion: suggestion
+                }));
+              }
             } else if (data.type === 'suggestion') {
               isSuggestionResponse = true;
               const suggestionData = data.data;
@@ -183,6 +239,9 @@ export const useAIAssistant = ({ section, resumeContext, sessionId = 'default' }
                   }));
                 }
               }
+            } else if (data.type === 'session') {
+              sessionTurnRef.current = data.data.session_turn;
+              sessionContextRef.current = data.data.context_version;
             } else if (data.type === 'rate_limit') {
               setState(prev => ({
                 ...prev,
@@ -229,6 +288,8 @@ export const useAIAssistant = ({ section, resumeContext, sessionId = 'default' }
       abortControllerRef.current.abort();
     }
     lastSuggestionIdRef.current = null;
+    sessionTurnRef.current = null;
+    sessionContextRef.current = null;
     setState({
       messages: [],
       isLoading: false,
@@ -252,7 +313,7 @@ export const useAIAssistant = ({ section, resumeContext, sessionId = 'default' }
   // Reset rate limits
   const resetRateLimits = useCallback(async () => {
     try {
-      await fetch(`${API_URL}/api/ai-assist/reset-limits`, {
+      const response = await fetch(`${API_URL}/api/ai-assist/reset-limits`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -262,12 +323,17 @@ export const useAIAssistant = ({ section, resumeContext, sessionId = 'default' }
           section
         })
       });
+      const data = await response.json();
+      if (!response.ok) {
+        throw new Error(data.error || 'Failed to reset limits');
+      }
 
+      // Only the section budget is reset; the session budget comes from the server
       setState(prev => ({
         ...prev,
         rateLimits: {
-          remaining_section: 15,
-          remaining_session: 50
+          remaining_section: data.new_limits.remaining_section,
+          remaining_session: data.new_limits.remaining_session
         }
       }));
     } catch (error) {